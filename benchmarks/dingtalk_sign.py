@@ -0,0 +1,66 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T16:45:00.000Z
+# 文件描述：测量钉钉发送器每条消息构建请求地址的开销，对比每次解析地址并重新签名与预解析加签名缓存。
+# 文件路径：benchmarks/dingtalk_sign.py
+#
+# 运行：python benchmarks/dingtalk_sign.py [--iterations 100000]
+
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xqcsendmessage.dingtalk.signing import SignedWebhook  # noqa: E402
+
+WEBHOOK = "https://oapi.dingtalk.com/robot/send?access_token=" + "a" * 64
+SECRET = "SEC" + "b" * 64
+
+
+def legacy_url(webhook: str, secret: str) -> str:
+    """
+    旧实现：每条消息都解析地址、重新签名并重建查询字符串。
+    """
+    from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+    timestamp = str(round(time.time() * 1000))
+    secret_enc = secret.encode("utf-8")
+    string_to_sign_enc = f"{timestamp}\n{secret}".encode("utf-8")
+    hmac_code = hmac.new(secret_enc, string_to_sign_enc, digestmod=hashlib.sha256).digest()
+    signed_params = {"timestamp": timestamp, "sign": base64.b64encode(hmac_code).decode("utf-8")}
+
+    parsed_url = urlparse(webhook)
+    query_params = parse_qs(parsed_url.query)
+    for k, v in signed_params.items():
+        query_params[k] = [v]
+    new_query_string = urlencode({k: v[0] if isinstance(v, list) else v for k, v in query_params.items()})
+    return urlunparse(parsed_url._replace(query=new_query_string))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="钉钉请求地址构建开销")
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    cached = SignedWebhook(WEBHOOK, SECRET)
+    uncached = SignedWebhook(WEBHOOK, SECRET, signature_ttl=0)
+    cases = [
+        ("before: parse + sign per message", lambda: legacy_url(WEBHOOK, SECRET)),
+        ("after: pre-parsed, sign per message", uncached.url),
+        ("after: pre-parsed, cached signature", cached.url),
+    ]
+
+    print(f"{'case':<40}{'per message':>14}")
+    for name, func in cases:
+        per_call = min(timeit.repeat(func, number=args.iterations, repeat=3)) / args.iterations
+        print(f"{name:<40}{per_call * 1e6:>11.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T21:00:00.000Z
+# 文件描述：用 `python -X importtime` 测量 `import xqcsendmessage` 的启动耗时，以及只使用钉钉、邮件时额外导入的耗时。
+# 文件路径：benchmarks/import_time.py
+#
+# 运行：python benchmarks/import_time.py [--repeat 7] [--top 10]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 场景名 -> 在子进程中执行的代码
+SCENARIOS = {
+    "import xqcsendmessage": "import xqcsendmessage",
+    "+ send_dingtalk": "import xqcsendmessage; xqcsendmessage.send_dingtalk; "
+                       "import xqcsendmessage.dingtalk.sender",
+    "+ send_email": "import xqcsendmessage; xqcsendmessage.send_email; import xqcsendmessage.email.sender",
+    "from xqcsendmessage import *": "from xqcsendmessage import *",
+}
+
+# 关注的第三方和标准库重型依赖
+HEAVY_MODULES = ("httpx", "aiosmtplib", "aiofiles", "smtplib", "email.mime.multipart", "sqlite3", "asyncio")
+
+
+def _importtime(code: str) -> List[Tuple[int, str, int]]:
+    """
+    在新的解释器中执行代码，解析 `-X importtime` 的输出。
+
+    :return: [(嵌套深度, 模块名, 累计耗时（微秒）)]，深度 0 为顶层导入。
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                            capture_output=True, text=True, check=True)
+    records = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append((depth, name.strip(), int(cumulative)))
+    return records
+
+
+def _total(code: str, startup: Set[str]) -> int:
+    """
+    执行代码时顶层导入的耗时之和（微秒），子模块已计入其顶层导入，不含解释器启动时导入的模块。
+    """
+    return sum(cumulative for depth, module, cumulative in _importtime(code) if depth == 0 and module not in startup)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="xqcsendmessage 导入耗时")
+    parser.add_argument("--repeat", type=int, default=7, help="每个场景运行的次数，取中位数")
+    parser.add_argument("--top", type=int, default=10, help="列出只发送钉钉消息时耗时最多的模块数")
+    args = parser.parse_args()
+
+    # 解释器自身启动时导入的模块（site 等），不计入各场景
+    startup = {module for _, module, _ in _importtime("pass")}
+
+    print(f"{'scenario':<32}{'import time':>14}   heavy modules loaded")
+    for name, code in SCENARIOS.items():
+        total = statistics.median(_total(code, startup) for _ in range(args.repeat))
+        loaded = {module for _, module, _ in _importtime(code)}
+        heavy = ", ".join(module for module in HEAVY_MODULES if module in loaded) or "-"
+        print(f"{name:<32}{total / 1000:>11.1f} ms   {heavy}")
+
+    # 只发送钉钉消息时耗时最多的模块
+    records = _importtime(SCENARIOS["+ send_dingtalk"])
+    ranked = sorted({(module, cumulative) for _, module, cumulative in records
+                     if module.startswith("xqcsendmessage") or module in HEAVY_MODULES},
+                    key=lambda item: item[1], reverse=True)
+    print(f"\n{'+ send_dingtalk, module (cumulative)':<48}{'time':>10}")
+    for module, cumulative in ranked[:args.top]:
+        print(f"{module:<48}{cumulative / 1000:>7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T15:00:00.000Z
+# 文件描述：测量 Webhook 限流器每次获取许可的开销，对比进程内存储和多进程共享的 SQLite 存储。
+# 文件路径：benchmarks/ratelimit_backend.py
+#
+# 运行：python benchmarks/ratelimit_backend.py [--iterations 5000] [--processes 4]
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xqcsendmessage.core.ratelimit import RateLimiter, MemoryRateLimitBackend, SQLiteRateLimitBackend  # noqa: E402
+
+# 速率足够大，测量的只是协调开销而不是等待时间
+RATE = 10 ** 9
+
+
+def _run(backend, iterations: int) -> float:
+    limiter = RateLimiter(rate=RATE, period=1, backend=backend)
+    limiter.acquire("bench")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        limiter.acquire("bench")
+    return (time.perf_counter() - start) / iterations
+
+
+def _worker(path: str, iterations: int, results) -> None:
+    results.put(_run(SQLiteRateLimitBackend(path), iterations))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Webhook 限流器获取许可的开销")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rate_limits.db")
+
+        memory = _run(MemoryRateLimitBackend(), args.iterations)
+        sqlite_single = _run(SQLiteRateLimitBackend(path), args.iterations)
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_worker, args=(path, args.iterations, results))
+                   for _ in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        sqlite_shared = sum(results.get() for _ in workers) / len(workers)
+
+    print(f"{'backend':<36}{'per acquire':>14}")
+    print(f"{'memory':<36}{memory * 1e6:>11.2f} us")
+    print(f"{'sqlite, 1 process':<36}{sqlite_single * 1e6:>11.2f} us")
+    print(f"{f'sqlite, {args.processes} processes contending':<36}{sqlite_shared * 1e6:>11.2f} us")
+
+
+if __name__ == "__main__":
+    main()
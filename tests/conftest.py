@@ -0,0 +1,116 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：测试公共夹具：用 httpx.MockTransport 代替真实的 Webhook，并在每个测试后恢复全局配置。
+# 文件路径：tests/conftest.py
+
+import asyncio
+import itertools
+import socket
+from typing import List
+
+import httpx
+import pytest
+
+import xqcsendmessage as X
+from xqcsendmessage.core import http as H
+from xqcsendmessage.core.circuit import circuit_breakers
+
+_webhook_ids = itertools.count()
+
+
+@pytest.fixture(autouse=True)
+def reset_globals():
+    """
+    默认关闭限流、重试和熔断，测试按需开启；结束后恢复默认配置。
+    """
+    X.configure_rate_limit(enabled=False)
+    X.configure_retry(max_attempts=1)
+    X.configure_circuit_breaker(enabled=False)
+    yield
+    X.disable_aggregation()
+    X.disable_dedup()
+    X.configure_rate_limit()
+    X.configure_retry()
+    X.configure_circuit_breaker()
+    circuit_breakers.reset()
+    H.close_http_clients()
+
+
+@pytest.fixture
+def webhook() -> str:
+    """
+    每个测试使用不同的 Webhook 地址，避免限流和熔断状态在测试之间共享。
+    """
+    return f"https://oapi.dingtalk.com/robot/send?access_token=test-token-{next(_webhook_ids)}"
+
+
+class MockWebhook:
+    """
+    按顺序返回预设的响应，并记录收到的请求。
+    """
+
+    def __init__(self):
+        self.requests: List[httpx.Request] = []
+        self.responses: List[httpx.Response] = []
+
+    def reply(self, *responses: httpx.Response) -> None:
+        self.responses.extend(responses)
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.responses:
+            return self.responses.pop(0)
+        return httpx.Response(200, json={"errcode": 0, "errmsg": "ok"})
+
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        在当前事件循环上安装模拟的异步客户端，需要在事件循环中调用。
+        """
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        H._async_clients[id(loop)] = (loop, client)
+        return client
+
+
+@pytest.fixture
+def mock_webhook() -> MockWebhook:
+    """
+    替换共享的同步 HTTP 客户端，未预设响应时返回 `{"errcode": 0}`。
+    """
+    mock = MockWebhook()
+    H.close_http_clients()
+    H._sync_client = httpx.Client(transport=httpx.MockTransport(mock.handler))
+    return mock
+
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    """
+    启动本地 SMTP 服务器（需要 aiosmtpd），接受任意账号登录，记录收到的邮件。
+    """
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    from aiosmtpd.smtp import AuthResult
+
+    class Handler:
+        def __init__(self):
+            self.messages = []
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(envelope.content)
+            return "250 OK"
+
+    handler = Handler()
+    controller = controller_module.Controller(
+        handler, hostname="127.0.0.1", port=free_port(), auth_require_tls=False,
+        authenticator=lambda *args: AuthResult(success=True))
+    controller.start()
+    yield controller, handler
+    controller.stop()
@@ -0,0 +1,116 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：消息合并测试：窗口结束和达到消息数上限时发送，重复消息标注次数，关闭合并与发送并发时消息不丢失。
+# 文件路径：tests/test_aggregator.py
+
+import json
+import threading
+import time
+
+import pytest
+
+import xqcsendmessage as X
+from xqcsendmessage import api
+from xqcsendmessage.core.exceptions import ValidationError
+from xqcsendmessage.dingtalk.sender import DingTalkSender
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.01)
+
+
+def contents(mock_webhook):
+    return [json.loads(request.content)["text"]["content"] for request in mock_webhook.requests]
+
+
+def test_window_flush(mock_webhook, webhook):
+    X.enable_aggregation(window=0.1)
+    assert X.send_dingtalk("磁盘告警", webhook) == {"status": "queued", "pending": 1}
+    assert X.send_dingtalk("内存告警", webhook) == {"status": "queued", "pending": 2}
+    assert mock_webhook.requests == []
+    wait_for(lambda: len(mock_webhook.requests) == 1)
+    assert contents(mock_webhook) == ["【共 2 条消息】\n\n磁盘告警\n\n内存告警"]
+
+
+def test_max_messages_flush(mock_webhook, webhook):
+    X.enable_aggregation(window=60, max_messages=3)
+    for i in range(4):
+        X.send_dingtalk(f"告警 {i}", webhook)
+    wait_for(lambda: len(mock_webhook.requests) == 1)
+    assert contents(mock_webhook)[0].startswith("【共 3 条消息】")
+    # 第 4 条等待下一个窗口
+    time.sleep(0.05)
+    assert len(mock_webhook.requests) == 1
+    X.flush_aggregated()
+    assert contents(mock_webhook)[1] == "告警 3"
+
+
+def test_duplicates_are_collapsed(mock_webhook, webhook):
+    X.enable_aggregation(window=60)
+    for message in ["磁盘告警", "磁盘告警", "内存告警", "磁盘告警"]:
+        X.send_dingtalk(message, webhook)
+    X.flush_aggregated()
+    assert contents(mock_webhook) == ["【共 4 条消息】\n\n磁盘告警\n（重复 3 次）\n\n内存告警"]
+
+
+def test_flush_aggregated_sends_each_webhook(mock_webhook, webhook):
+    X.enable_aggregation(window=60)
+    X.send_dingtalk("磁盘告警", f"{webhook}-a")
+    X.send_dingtalk("磁盘告警", f"{webhook}-b")
+    X.flush_aggregated()
+    assert len(mock_webhook.requests) == 2
+    X.flush_aggregated()
+    assert len(mock_webhook.requests) == 2
+
+
+def test_messages_with_at_are_sent_immediately(mock_webhook, webhook):
+    X.enable_aggregation(window=60)
+    result = X.send_dingtalk("磁盘告警", webhook, is_at_all=True)
+    assert result["errcode"] == 0
+    assert len(mock_webhook.requests) == 1
+
+
+def test_closed_aggregator_rejects_add(monkeypatch, mock_webhook, webhook):
+    aggregator = X.enable_aggregation(window=60)
+    X.disable_aggregation()
+    sender = DingTalkSender(webhook=webhook)
+    message = {"msgtype": "text", "text": {"content": "磁盘告警"}}
+    assert aggregator.offer(sender, message) is None
+    with pytest.raises(ValidationError):
+        aggregator.add(sender, message)
+    # 顶层函数取到合并器后、加入消息前合并器被关闭时，直接发送
+    monkeypatch.setattr(api, "get_aggregator", lambda: aggregator)
+    assert X.send_dingtalk("磁盘告警", webhook)["errcode"] == 0
+    assert len(mock_webhook.requests) == 1
+
+
+def test_disable_while_sending_loses_nothing(mock_webhook, webhook):
+    X.enable_aggregation(window=60)
+    errors = []
+    started = threading.Barrier(5)
+
+    def send(worker):
+        started.wait()
+        for i in range(50):
+            try:
+                X.send_dingtalk(f"告警 {worker}-{i}", webhook)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=send, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    X.disable_aggregation()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    delivered = "\n".join(contents(mock_webhook))
+    for worker in range(4):
+        for i in range(50):
+            assert f"告警 {worker}-{i}\n" in delivered + "\n"
@@ -0,0 +1,93 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：附件缓存测试：按 (路径, 修改时间, 大小) 复用编码结果，文件修改后失效，按总字节数淘汰。
+# 文件路径：tests/test_attachments.py
+
+import base64
+import os
+from email.mime.application import MIMEApplication
+
+import pytest
+
+from xqcsendmessage.core.exceptions import ValidationError
+from xqcsendmessage.email.attachments import AttachmentCache
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def encoded_size(data):
+    return len(base64.encodebytes(data))
+
+
+def test_same_file_is_encoded_once(tmp_path, monkeypatch):
+    cache = AttachmentCache()
+    path = write(tmp_path / "report.pdf", b"x" * 1000)
+    first = cache.get_encoded(path)
+    monkeypatch.chdir(tmp_path)
+    # 相对路径和绝对路径是同一个键，命中时返回同一个已编码的字符串
+    assert cache.get_encoded("report.pdf") is first
+    assert cache.size == len(first)
+
+
+def test_modified_file_is_reencoded(tmp_path):
+    cache = AttachmentCache()
+    path = write(tmp_path / "report.pdf", b"old")
+    first = cache.get_encoded(path)
+    write(tmp_path / "report.pdf", b"new content")
+    assert base64.b64decode(cache.get_encoded(path)) == b"new content"
+    # 修改时间相同但大小不同也会失效
+    stat = os.stat(path)
+    write(tmp_path / "report.pdf", b"newer content")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert base64.b64decode(cache.get_encoded(path)) == b"newer content"
+    assert cache.get_encoded(path) is not first
+
+
+def test_part_matches_mime_application(tmp_path):
+    data = os.urandom(500)
+    path = write(tmp_path / "data.bin", data)
+    part = AttachmentCache().get_part(path)
+    expected = MIMEApplication(data, Name="data.bin")
+    assert part.get_payload() == expected.get_payload()
+    assert part.get_payload(decode=True) == data
+    assert part["Content-Disposition"] == 'attachment; filename="data.bin"'
+
+
+def test_cache_is_bounded_by_encoded_bytes(tmp_path):
+    data = b"x" * 1000
+    cache = AttachmentCache(max_bytes=encoded_size(data) * 2)
+    paths = [write(tmp_path / f"{i}.bin", data) for i in range(3)]
+    first = cache.get_encoded(paths[0])
+    cache.get_encoded(paths[1])
+    # 访问第一个附件后，最久未使用的是第二个
+    assert cache.get_encoded(paths[0]) is first
+    cache.get_encoded(paths[2])
+    assert cache.size == encoded_size(data) * 2
+    assert [key[0] for key in cache._parts] == [paths[0], paths[2]]
+
+
+def test_oversize_file_is_not_cached(tmp_path):
+    cache = AttachmentCache(max_bytes=100)
+    path = write(tmp_path / "big.bin", b"x" * 1000)
+    assert base64.b64decode(cache.get_encoded(path)) == b"x" * 1000
+    assert cache.size == 0
+
+
+def test_resize_evicts_and_zero_disables(tmp_path):
+    cache = AttachmentCache()
+    for i in range(3):
+        cache.get_encoded(write(tmp_path / f"{i}.bin", b"x" * 1000))
+    cache.resize(encoded_size(b"x" * 1000))
+    assert cache.size == encoded_size(b"x" * 1000)
+    cache.resize(0)
+    assert cache.size == 0
+    cache.get_encoded(str(tmp_path / "0.bin"))
+    assert cache.size == 0
+    with pytest.raises(ValidationError):
+        cache.resize(-1)
+    with pytest.raises(ValidationError):
+        AttachmentCache(max_bytes=-1)
@@ -0,0 +1,53 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：多通道广播测试：未提供标题时邮件使用默认主题，Webhook 消息体按平台只构建一次。
+# 文件路径：tests/test_broadcast.py
+
+import asyncio
+import json
+
+import xqcsendmessage as X
+from xqcsendmessage import api
+
+
+def test_email_without_title_uses_default_subject(monkeypatch, mock_webhook, webhook):
+    calls = []
+    monkeypatch.setattr(api, "send_email", lambda **kwargs: calls.append(kwargs) or {"status": "success"})
+    results = X.broadcast("磁盘告警", [
+        {"platform": "email", "smtp_server": "smtp.example.com", "smtp_port": 465, "sender_email": "a@example.com",
+         "sender_password": "x", "email_recipients": ["b@example.com"]},
+        {"platform": "dingtalk", "webhook": webhook},
+    ])
+    assert [r["status"] for r in results] == ["success", "success"]
+    assert calls[0]["email_subject"] == api.DEFAULT_BROADCAST_SUBJECT
+    assert len(mock_webhook.requests) == 1
+
+
+def test_webhook_payload_is_rendered_once_per_platform(monkeypatch, mock_webhook, webhook):
+    built = []
+    build = api._build_dingtalk_wecom_message
+    monkeypatch.setattr(api, "_build_dingtalk_wecom_message", lambda **kwargs: built.append(kwargs) or build(**kwargs))
+    channels = [{"platform": "dingtalk", "webhook": f"{webhook}-{i}"} for i in range(3)]
+    channels.append({"platform": "wecom_webhook",
+                     "webhook": "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=test-key"})
+    results = X.broadcast("**磁盘告警**", channels, send_md=True, title="告警")
+    assert all(r["status"] == "success" for r in results)
+    assert len(built) == 2
+    bodies = [json.loads(request.content) for request in mock_webhook.requests]
+    assert bodies[0]["markdown"] == {"title": "告警", "text": "**磁盘告警**"}
+    assert sum(body == bodies[0] for body in bodies) == 3
+
+
+def test_async_channel_override_is_rendered_separately(mock_webhook, webhook):
+    async def main():
+        mock_webhook.async_client()
+        return await X.broadcast_async("磁盘告警", [
+            {"platform": "dingtalk", "webhook": f"{webhook}-a"},
+            {"platform": "dingtalk", "webhook": f"{webhook}-b", "message": "磁盘告警（值班）"},
+        ])
+
+    results = asyncio.run(main())
+    assert all(r["status"] == "success" for r in results)
+    contents = sorted(json.loads(request.content)["text"]["content"] for request in mock_webhook.requests)
+    assert contents == ["磁盘告警", "磁盘告警（值班）"]
@@ -0,0 +1,37 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：超长消息拆分测试：每部分不超过字节上限、不截断多字节字符，预算过小时报错而不是死循环。
+# 文件路径：tests/test_chunker.py
+
+import pytest
+
+from xqcsendmessage.core.chunker import PART_LABEL_RESERVE, _split_bytes, split_content
+from xqcsendmessage.core.exceptions import ValidationError
+
+
+def body(part: str) -> str:
+    return part.split("\n", 1)[1]
+
+
+def test_split_keeps_multibyte_characters_whole():
+    parts = split_content("中" * 100, PART_LABEL_RESERVE + 7)
+    assert all(len(part.encode("utf-8")) <= PART_LABEL_RESERVE + 7 for part in parts)
+    assert "".join(body(part) for part in parts) == "中" * 100
+
+
+def test_budget_smaller_than_a_character_raises():
+    with pytest.raises(ValidationError):
+        split_content("中" * 100, 34)
+
+
+def test_split_bytes_always_advances():
+    assert _split_bytes("中文😀", 2) == ["中", "文", "😀"]
+
+
+@pytest.mark.parametrize("max_bytes", range(PART_LABEL_RESERVE + 4, PART_LABEL_RESERVE + 20))
+def test_code_block_with_tiny_budget_terminates(max_bytes):
+    content = "```python\n" + "中" * 30 + "\n```"
+    parts = split_content(content, max_bytes, markdown=True)
+    assert all(len(part.encode("utf-8")) <= max_bytes for part in parts)
+    assert "".join(body(part) for part in parts).count("中") == 30
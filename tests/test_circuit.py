@@ -0,0 +1,107 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：熔断测试：状态转换、只有目标不可用的错误计为失败、熔断器名称不包含 Webhook 凭据。
+# 文件路径：tests/test_circuit.py
+
+import time
+
+import httpx
+import pytest
+
+import xqcsendmessage as X
+from xqcsendmessage.core.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from xqcsendmessage.core.exceptions import CircuitOpenError, HttpError, ValidationError
+from xqcsendmessage.core.utils import redact_url
+
+
+def raise_error(error):
+    raise error
+
+
+@pytest.fixture(autouse=True)
+def enable_breakers():
+    X.configure_circuit_breaker(window_size=4, min_calls=2, failure_rate=0.5, cooldown=0.2)
+
+
+def state(webhook):
+    return X.get_circuit_states()[redact_url(webhook)]["state"]
+
+
+def test_breaker_opens_half_opens_and_closes(mock_webhook, webhook):
+    mock_webhook.reply(*[httpx.Response(503, text="unavailable")] * 2)
+    for _ in range(2):
+        with pytest.raises(HttpError):
+            X.send_dingtalk("hi", webhook)
+    assert state(webhook) == OPEN
+
+    with pytest.raises(CircuitOpenError) as info:
+        X.send_dingtalk("hi", webhook)
+    assert 0 < info.value.retry_after <= 0.2
+    assert len(mock_webhook.requests) == 2
+
+    time.sleep(0.25)
+    assert state(webhook) == HALF_OPEN
+    assert X.send_dingtalk("hi", webhook)["errcode"] == 0
+    assert state(webhook) == CLOSED
+
+
+def test_failed_trial_reopens(mock_webhook, webhook):
+    mock_webhook.reply(*[httpx.Response(502, text="bad gateway")] * 3)
+    for _ in range(2):
+        with pytest.raises(HttpError):
+            X.send_dingtalk("hi", webhook)
+    time.sleep(0.25)
+    with pytest.raises(HttpError):
+        X.send_dingtalk("hi", webhook)
+    assert state(webhook) == OPEN
+
+
+def test_revoked_webhook_key_opens(mock_webhook, webhook):
+    mock_webhook.reply(*[httpx.Response(200, json={"errcode": 93000, "errmsg": "invalid webhook url"})] * 2)
+    for _ in range(2):
+        with pytest.raises(HttpError):
+            X.send_wecom_webhook("hi", webhook)
+    assert state(webhook) == OPEN
+    with pytest.raises(CircuitOpenError):
+        X.send_wecom_webhook("hi", webhook)
+    assert len(mock_webhook.requests) == 2
+
+
+def test_returned_dingtalk_errcode_for_dead_robot_opens(mock_webhook, webhook):
+    mock_webhook.reply(*[httpx.Response(200, json={"errcode": 400102, "errmsg": "robot stopped"})] * 2)
+    for _ in range(2):
+        assert X.send_dingtalk("hi", webhook)["errcode"] == 400102
+    assert state(webhook) == OPEN
+
+
+def test_other_business_errcodes_do_not_open(mock_webhook, webhook):
+    mock_webhook.reply(*[httpx.Response(200, json={"errcode": 310000, "errmsg": "keywords not in content"})] * 4)
+    for _ in range(4):
+        assert X.send_dingtalk("hi", webhook)["errcode"] == 310000
+    snapshot = X.get_circuit_states()[redact_url(webhook)]
+    assert snapshot["state"] == CLOSED
+    assert snapshot["failures"] == 0
+
+
+def test_only_outages_count_as_failures():
+    breaker = CircuitBreaker("test", window_size=4, min_calls=2, cooldown=60)
+    for error in (ValidationError("bad"), FileNotFoundError("a.png"), HttpError("busy", errcode=-1),
+                  HttpError("too many", 429), ValueError("bug")):
+        with pytest.raises(type(error)):
+            breaker.call(raise_error, error)
+    assert breaker.snapshot()["calls"] == 0
+
+    for error in (ConnectionResetError("reset"), httpx.ConnectTimeout("timeout")):
+        with pytest.raises(type(error)):
+            breaker.call(raise_error, error)
+    assert breaker.state == OPEN
+
+
+def test_states_do_not_expose_webhook_credentials(mock_webhook, webhook):
+    X.send_dingtalk("hi", webhook)
+    X.send_wecom_webhook("hi", "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=secret-key")
+    names = list(X.get_circuit_states())
+    assert redact_url(webhook) in names
+    assert all("test-token" not in name and "secret-key" not in name for name in names)
+    assert redact_url(webhook) != redact_url(webhook + "x")
@@ -0,0 +1,128 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：消息去重测试：发送失败的消息不被记录，重试时照常发送；发送期间到达的相同消息等待其结果。
+# 文件路径：tests/test_dedup.py
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import httpx
+import pytest
+
+import xqcsendmessage as X
+from xqcsendmessage.core import http as H
+from xqcsendmessage.core.exceptions import HttpError
+
+
+def test_duplicate_is_skipped_within_window(mock_webhook, webhook):
+    X.enable_dedup(ttl=60)
+    assert X.send_dingtalk("磁盘告警", webhook)["errcode"] == 0
+    result = X.send_dingtalk("  磁盘告警  ", webhook)
+    assert result["status"] == "duplicate"
+    assert result["suppressed"] == 1
+    assert 0 < result["retry_after"] <= 60
+    assert len(mock_webhook.requests) == 1
+
+
+def test_failed_send_is_not_recorded(mock_webhook, webhook):
+    X.enable_dedup(ttl=60)
+    mock_webhook.reply(httpx.Response(503, text="unavailable"))
+    with pytest.raises(HttpError):
+        X.send_dingtalk("磁盘告警", webhook)
+    assert X.send_dingtalk("磁盘告警", webhook)["errcode"] == 0
+    assert X.send_dingtalk("磁盘告警", webhook)["status"] == "duplicate"
+    assert len(mock_webhook.requests) == 2
+
+
+def test_failed_async_send_is_not_recorded(mock_webhook, webhook):
+    X.enable_dedup(ttl=60)
+    mock_webhook.reply(httpx.Response(503, text="unavailable"))
+
+    async def main():
+        mock_webhook.async_client()
+        with pytest.raises(HttpError):
+            await X.send_dingtalk_async("磁盘告警", webhook)
+        assert (await X.send_dingtalk_async("磁盘告警", webhook))["errcode"] == 0
+        assert (await X.send_dingtalk_async("磁盘告警", webhook))["status"] == "duplicate"
+
+    asyncio.run(main())
+    assert len(mock_webhook.requests) == 2
+
+
+def blocking_first_request(first: httpx.Response):
+    """
+    第一个请求阻塞到 release 被设置后返回 first，之后的请求返回成功。
+    """
+    started, release = threading.Event(), threading.Event()
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            started.set()
+            release.wait(5)
+            return first
+        return httpx.Response(200, json={"errcode": 0, "errmsg": "ok"})
+
+    H.close_http_clients()
+    H._sync_client = httpx.Client(transport=httpx.MockTransport(handler))
+    return started, release, requests
+
+
+@pytest.mark.parametrize("first, delivered", [
+    (httpx.Response(503, text="unavailable"), 2),
+    (httpx.Response(200, json={"errcode": 0, "errmsg": "ok"}), 1),
+])
+def test_concurrent_duplicate_waits_for_in_flight_send(webhook, first, delivered):
+    X.enable_dedup(ttl=60)
+    started, release, requests = blocking_first_request(first)
+    with ThreadPoolExecutor(2) as pool:
+        first_send = pool.submit(X.send_dingtalk, "磁盘告警", webhook)
+        assert started.wait(5)
+        second_send = pool.submit(X.send_dingtalk, "磁盘告警", webhook)
+        # 第一次发送完成前，相同消息既不发送也不返回 duplicate
+        with pytest.raises(TimeoutError):
+            second_send.result(timeout=0.2)
+        release.set()
+        if delivered == 2:
+            with pytest.raises(HttpError):
+                first_send.result(5)
+            assert second_send.result(5)["errcode"] == 0
+        else:
+            assert first_send.result(5)["errcode"] == 0
+            assert second_send.result(5)["status"] == "duplicate"
+    assert len(requests) == delivered
+    assert X.send_dingtalk("磁盘告警", webhook)["status"] == "duplicate"
+
+
+def test_concurrent_async_duplicate_is_sent_when_first_send_fails(webhook):
+    X.enable_dedup(ttl=60)
+    requests = []
+
+    async def main():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def handler(request):
+            requests.append(request)
+            if len(requests) == 1:
+                started.set()
+                await release.wait()
+                return httpx.Response(503, text="unavailable")
+            return httpx.Response(200, json={"errcode": 0, "errmsg": "ok"})
+
+        loop = asyncio.get_running_loop()
+        H._async_clients[id(loop)] = (loop, httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        first = asyncio.create_task(X.send_dingtalk_async("磁盘告警", webhook))
+        await started.wait()
+        second = asyncio.create_task(X.send_dingtalk_async("磁盘告警", webhook))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        release.set()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        assert isinstance(results[0], HttpError)
+        assert results[1]["errcode"] == 0
+
+    asyncio.run(main())
+    assert len(requests) == 2
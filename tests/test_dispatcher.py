@@ -0,0 +1,144 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：后台分发器测试：队列已满时的三种处理方式、退出时发送排队的任务、替换正在运行的分发器。
+# 文件路径：tests/test_dispatcher.py
+
+import asyncio
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from xqcsendmessage import dispatcher as D
+from xqcsendmessage.core.exceptions import QueueFullError, ValidationError
+
+
+class Gate:
+    """
+    阻塞的发送任务：开始后记录，直到 `open()` 才返回。
+    """
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    async def job(self, value):
+        self.started.set()
+        while not self.released.is_set():
+            await asyncio.sleep(0.005)
+        return value
+
+    def open(self):
+        self.released.set()
+
+
+async def echo(value):
+    return value
+
+
+@pytest.fixture(autouse=True)
+def shutdown_default():
+    yield
+    D._shutdown_dispatcher()
+
+
+def busy(overflow, **kwargs):
+    """
+    创建一个并发为 1、队列容量为 1 的分发器，正在运行一个阻塞任务，并已排队一个任务。
+    """
+    gate = Gate()
+    dispatcher = D.Dispatcher(max_queue_size=1, overflow=overflow, max_concurrency=1, **kwargs)
+    running = dispatcher.submit(gate.job, "running")
+    assert gate.started.wait(2)
+    queued = dispatcher.submit(echo, "queued")
+    return dispatcher, gate, running, queued
+
+
+def test_result_and_error_propagate():
+    dispatcher = D.Dispatcher()
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    assert dispatcher.submit(echo, 1).result(2) == 1
+    with pytest.raises(RuntimeError, match="boom"):
+        dispatcher.submit(fail).result(2)
+    dispatcher.shutdown()
+
+
+def test_block_times_out():
+    dispatcher, gate, running, queued = busy("block", block_timeout=0.1)
+    started = time.monotonic()
+    with pytest.raises(QueueFullError):
+        dispatcher.submit(echo, "late")
+    assert 0.09 <= time.monotonic() - started < 1
+    gate.open()
+    assert running.result(2) == "running" and queued.result(2) == "queued"
+    dispatcher.shutdown()
+
+
+def test_block_waits_for_space():
+    dispatcher, gate, running, queued = busy("block", block_timeout=2)
+    threading.Timer(0.05, gate.open).start()
+    late = dispatcher.submit(echo, "late")
+    assert late.result(2) == "late"
+    dispatcher.shutdown()
+
+
+def test_raise_fails_immediately():
+    dispatcher, gate, running, queued = busy("raise")
+    with pytest.raises(QueueFullError):
+        dispatcher.submit(echo, "late")
+    gate.open()
+    assert queued.result(2) == "queued"
+    dispatcher.shutdown()
+
+
+def test_drop_oldest_cancels_queued_future():
+    dispatcher, gate, running, queued = busy("drop_oldest")
+    late = dispatcher.submit(echo, "late")
+    assert queued.cancelled()
+    assert dispatcher.dropped == 1
+    gate.open()
+    with pytest.raises(CancelledError):
+        queued.result(2)
+    assert late.result(2) == "late"
+    assert dispatcher.flush(2)
+    dispatcher.shutdown()
+
+
+def test_shutdown_without_wait_cancels_pending():
+    dispatcher, gate, running, queued = busy("block")
+    dispatcher.shutdown(wait=False)
+    gate.open()
+    assert queued.cancelled()
+    assert running.done()
+    with pytest.raises(ValidationError):
+        dispatcher.submit(echo, "late")
+
+
+def test_exit_flushes_default_dispatcher():
+    gate = Gate()
+    dispatcher = D.configure_dispatcher(max_concurrency=1)
+    futures = [dispatcher.submit(gate.job, i) for i in range(3)]
+    threading.Timer(0.05, gate.open).start()
+    D._shutdown_dispatcher()
+    assert [future.result(0) for future in futures] == [0, 1, 2]
+    assert D.flush_dispatcher(0)
+
+
+def test_configure_replaces_live_dispatcher():
+    gate = Gate()
+    old = D.configure_dispatcher(max_concurrency=1)
+    pending = [old.submit(gate.job, i) for i in range(2)]
+    threading.Timer(0.05, gate.open).start()
+    new = D.configure_dispatcher(max_queue_size=10, overflow="raise")
+    # 旧分发器中的任务发送完成后才关闭
+    assert [future.result(0) for future in pending] == [0, 1]
+    with pytest.raises(ValidationError):
+        old.submit(echo, "late")
+    assert D.get_dispatcher() is new
+    assert new.overflow == "raise"
+    assert new.submit(echo, "new").result(2) == "new"
@@ -0,0 +1,100 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：邮件发送测试：超过大小上限的附件抛出 ValidationError，大附件通过注入的异步连接池流式发送。
+# 文件路径：tests/test_email.py
+
+import asyncio
+import email
+import os
+import socket
+
+import pytest
+
+from xqcsendmessage.core.exceptions import ValidationError
+from xqcsendmessage.email import streaming
+from xqcsendmessage.email.pool import AsyncSMTPConnectionPool, _pools
+from xqcsendmessage.email.sender import AsyncEmailSender, EmailSender
+from xqcsendmessage.email.streaming import supports_async_streaming
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_oversize_attachment_raises(tmp_path):
+    attachment = tmp_path / "big.bin"
+    attachment.write_bytes(b"x" * 2048)
+    sender = EmailSender("127.0.0.1", free_port(), "a@example.com", "pwd", use_tls=False, max_attachment_size=1024)
+    with pytest.raises(ValidationError):
+        sender.send("body", "subject", ["b@example.com"], email_attachments=[str(attachment)])
+
+
+def test_oversize_attachment_raises_async(tmp_path):
+    attachment = tmp_path / "big.bin"
+    attachment.write_bytes(b"x" * 2048)
+    sender = AsyncEmailSender("127.0.0.1", free_port(), "a@example.com", "pwd", use_tls=False,
+                              max_attachment_size=1024)
+    with pytest.raises(ValidationError):
+        asyncio.run(sender.send("body", "subject", ["b@example.com"], email_attachments=[str(attachment)]))
+
+
+def test_async_streamed_attachment_uses_injected_pool(tmp_path, smtp_server):
+    controller, handler = smtp_server
+    data = os.urandom(300 * 1024)
+    attachment = tmp_path / "report.bin"
+    attachment.write_bytes(data)
+
+    async def main():
+        pool = AsyncSMTPConnectionPool("127.0.0.1", controller.port, "a@example.com", "pwd", use_tls=False)
+        sender = AsyncEmailSender("127.0.0.1", controller.port, "a@example.com", "pwd", use_tls=False,
+                                  pool=pool, stream_threshold=1024)
+        for _ in range(2):
+            result = await sender.send("body", "subject", ["b@example.com"], email_attachments=[str(attachment)])
+            assert result["status"] == "success"
+        # 两封邮件复用同一个连接
+        assert len(pool._idle) == 1
+        await pool.aclose()
+
+    asyncio.run(main())
+    assert not any(key[0] == "127.0.0.1" and key[1] == controller.port for key in _pools)
+    assert len(handler.messages) == 2
+    parts = [part for part in email.message_from_bytes(handler.messages[0]).walk()
+             if part.get_filename() == "report.bin"]
+    assert parts[0].get_payload(decode=True) == data
+
+
+def test_installed_aiosmtplib_supports_streaming():
+    import aiosmtplib
+
+    async def main():
+        smtp = aiosmtplib.SMTP(hostname="127.0.0.1")
+        # 未连接的会话没有协议对象
+        assert not supports_async_streaming(smtp)
+        smtp.protocol = aiosmtplib.protocol.SMTPProtocol()
+        assert supports_async_streaming(smtp)
+
+    asyncio.run(main())
+
+
+def test_async_stream_falls_back_without_protocol_api(monkeypatch, tmp_path, smtp_server):
+    controller, handler = smtp_server
+    monkeypatch.setattr(streaming, "supports_async_streaming", lambda smtp: False)
+    data = os.urandom(64 * 1024)
+    attachment = tmp_path / "report.bin"
+    attachment.write_bytes(data)
+
+    async def main():
+        pool = AsyncSMTPConnectionPool("127.0.0.1", controller.port, "a@example.com", "pwd", use_tls=False)
+        sender = AsyncEmailSender("127.0.0.1", controller.port, "a@example.com", "pwd", use_tls=False,
+                                  pool=pool, stream_threshold=1024)
+        result = await sender.send("body", "subject", ["b@example.com"], email_attachments=[str(attachment)])
+        await pool.aclose()
+        return result
+
+    assert asyncio.run(main())["status"] == "success"
+    parts = [part for part in email.message_from_bytes(handler.messages[0]).walk()
+             if part.get_filename() == "report.bin"]
+    assert parts[0].get_payload(decode=True) == data
@@ -0,0 +1,85 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：批量邮件测试：同时发送的邮件数不超过 max_concurrency，单封失败不影响其他邮件，结果与输入顺序一致。
+# 文件路径：tests/test_email_batch.py
+
+import asyncio
+import threading
+
+import pytest
+
+import xqcsendmessage as X
+
+BAD_RECIPIENT = "bad@example.com"
+
+
+@pytest.fixture
+def batch_server(smtp_server):
+    """
+    记录同时处理的 DATA 命令数和用到的连接，拒绝发给 BAD_RECIPIENT 的邮件。
+    """
+    controller, handler = smtp_server
+    lock = threading.Lock()
+    handler.active = handler.peak = 0
+    handler.sessions = set()
+
+    async def handle_RCPT(server, session, envelope, address, rcpt_options):
+        if address == BAD_RECIPIENT:
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(server, session, envelope):
+        with lock:
+            handler.active += 1
+            handler.peak = max(handler.peak, handler.active)
+            handler.sessions.add(id(session))
+        await asyncio.sleep(0.05)
+        with lock:
+            handler.active -= 1
+        handler.messages.append(envelope.content)
+        return "250 OK"
+
+    handler.handle_RCPT = handle_RCPT
+    handler.handle_DATA = handle_DATA
+    return controller, handler
+
+
+def batch(count):
+    messages = [{"message": f"body {i}", "email_subject": f"subject {i}", "email_recipients": ["b@example.com"]}
+                for i in range(count)]
+    messages[3]["email_recipients"] = [BAD_RECIPIENT]
+    del messages[5]["email_subject"]
+    return messages
+
+
+def check_results(results, handler, count):
+    assert [r["index"] for r in results] == list(range(count))
+    failed = [r["index"] for r in results if r["status"] == "error"]
+    assert failed == [3, 5]
+    assert results[3]["recipients"] == [BAD_RECIPIENT]
+    assert "email_subject" in results[5]["error"]
+    assert len(handler.messages) == count - 2
+    # 同时发送的邮件数不超过 max_concurrency；收件人被拒绝的连接会被丢弃，最多再建一个连接
+    assert 1 < handler.peak <= 3
+    assert len(handler.sessions) <= 4
+
+
+def test_batch_sends_concurrently_and_reports_partial_failure(batch_server):
+    controller, handler = batch_server
+    results = X.send_email_batch(batch(12), "127.0.0.1", controller.port, "a@example.com", "pwd",
+                                 use_tls=False, max_concurrency=3)
+    check_results(results, handler, 12)
+
+
+def test_async_batch_sends_concurrently_and_reports_partial_failure(batch_server):
+    controller, handler = batch_server
+    results = asyncio.run(X.send_email_batch_async(batch(12), "127.0.0.1", controller.port, "a@example.com",
+                                                   "pwd", use_tls=False, max_concurrency=3))
+    check_results(results, handler, 12)
+
+
+def test_batch_rejects_invalid_concurrency():
+    with pytest.raises(X.SendMessageError):
+        X.send_email_batch([], "127.0.0.1", 25, "a@example.com", "pwd", max_concurrency=0)
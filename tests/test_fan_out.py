@@ -0,0 +1,97 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：批量发送测试：send_many 每个平台只构建和序列化一次消息体，单个目标失败不影响其他目标。
+# 文件路径：tests/test_fan_out.py
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import xqcsendmessage as X
+from xqcsendmessage import api
+from xqcsendmessage.core import payload
+from xqcsendmessage.core.payload import JSONPayload
+
+WECOM_WEBHOOK = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=test-key"
+
+
+@pytest.fixture
+def serializations(monkeypatch):
+    """
+    记录 JSONPayload 序列化的次数。
+    """
+    calls = []
+    dumps = json.dumps
+
+    def counting_dumps(obj, **kwargs):
+        calls.append(obj)
+        return dumps(obj, **kwargs)
+
+    monkeypatch.setattr(payload.json, "dumps", counting_dumps)
+    return calls
+
+
+def destinations(webhook, count=3):
+    targets = [{"platform": "dingtalk", "webhook": f"{webhook}-{i}"} for i in range(count)]
+    targets.append({"platform": "wecom_webhook", "webhook": WECOM_WEBHOOK})
+    return targets
+
+
+def test_payload_is_built_and_serialized_once_per_platform(monkeypatch, serializations, mock_webhook, webhook):
+    built = []
+    build = api._build_dingtalk_wecom_message
+    monkeypatch.setattr(api, "_build_dingtalk_wecom_message", lambda **kwargs: built.append(kwargs) or build(**kwargs))
+    message = {"msgtype": "text", "text": {"content": "磁盘告警"}}
+    results = X.send_many(message, destinations(webhook), at_mobiles=["13800000000"])
+    assert [r["status"] for r in results] == ["success"] * 4
+    assert len(built) == 2
+    assert len([obj for obj in serializations if isinstance(obj, JSONPayload)]) == 2
+    bodies = [request.content for request in mock_webhook.requests]
+    dingtalk = [body for body in bodies if b"13800000000" in body]
+    assert len(dingtalk) == 3 and len(set(dingtalk)) == 1
+    # 调用方的消息不会被修改
+    assert message == {"msgtype": "text", "text": {"content": "磁盘告警"}}
+
+
+def test_failed_destination_does_not_affect_others(mock_webhook, webhook):
+    mock_webhook.reply(httpx.Response(200, json={"errcode": 0}), httpx.Response(503, text="unavailable"))
+    targets = destinations(webhook)
+    # 只用一个线程，按顺序发送，第二个目标收到 503
+    results = X.send_many("磁盘告警", targets, max_concurrency=1)
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r["status"] for r in results] == ["success", "error", "success", "success"]
+    assert results[1]["webhook"] == targets[1]["webhook"]
+    assert "503" in results[1]["error"] or "unavailable" in results[1]["error"]
+
+
+def test_invalid_destination_is_rejected_before_sending(mock_webhook, webhook):
+    with pytest.raises(X.SendMessageError):
+        X.send_many("磁盘告警", [{"platform": "dingtalk", "webhook": webhook}, {"platform": "email"}])
+    with pytest.raises(X.SendMessageError):
+        X.send_many("磁盘告警", [{"platform": "dingtalk", "webhook": webhook}], max_concurrency=0)
+    assert mock_webhook.requests == []
+
+
+def test_async_send_many_shares_payload(serializations, mock_webhook, webhook):
+    async def main():
+        mock_webhook.async_client()
+        return await X.send_many_async("**磁盘告警**", destinations(webhook), send_md=True, max_concurrency=2)
+
+    results = asyncio.run(main())
+    assert [r["status"] for r in results] == ["success"] * 4
+    assert len([obj for obj in serializations if isinstance(obj, JSONPayload)]) == 2
+    dingtalk = json.loads(mock_webhook.requests[0].content)
+    assert dingtalk["markdown"]["title"] == "Markdown消息"
+
+
+def test_modified_payload_is_serialized_again():
+    message = JSONPayload({"msgtype": "text", "text": {"content": "a"}})
+    first = message.body()
+    assert message.body() is first
+    message.update({})
+    assert message.body() is first
+    message["msgtype"] = "markdown"
+    assert json.loads(message.body())["msgtype"] == "markdown"
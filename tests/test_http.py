@@ -0,0 +1,56 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：共享 HTTP 连接池测试：修改配置时被替换的异步客户端在所属事件循环上关闭。
+# 文件路径：tests/test_http.py
+
+import asyncio
+import threading
+
+from xqcsendmessage.core import http as H
+
+
+def test_configure_closes_client_on_current_loop():
+    async def main():
+        client = H.get_async_http_client()
+        H.configure_http(timeout=5)
+        await asyncio.sleep(0)
+        assert client.is_closed
+        assert H.get_async_http_client() is not client
+        await H.aclose_http_clients()
+
+    asyncio.run(main())
+    H.configure_http(timeout=H.DEFAULT_TIMEOUT)
+
+
+def test_configure_closes_client_on_other_running_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        client = asyncio.run_coroutine_threadsafe(_get_client(), loop).result(timeout=5)
+        H.configure_http(timeout=5)
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), loop).result(timeout=5)
+        assert client.is_closed
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        H.configure_http(timeout=H.DEFAULT_TIMEOUT)
+
+
+def test_idle_loop_client_is_closed_at_shutdown():
+    loop = asyncio.new_event_loop()
+    try:
+        client = loop.run_until_complete(_get_client())
+        H.configure_http(timeout=5)
+        assert not client.is_closed
+        H.close_http_clients()
+        assert client.is_closed
+    finally:
+        loop.close()
+        H.configure_http(timeout=H.DEFAULT_TIMEOUT)
+
+
+async def _get_client():
+    return H.get_async_http_client()
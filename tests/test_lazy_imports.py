@@ -0,0 +1,48 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：延迟导入测试：`import xqcsendmessage` 不加载 httpx、aiosmtplib 等依赖，公共名称在第一次访问时导入。
+# 文件路径：tests/test_lazy_imports.py
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import xqcsendmessage as X
+
+HEAVY_MODULES = ["httpx", "aiosmtplib", "aiofiles", "email.mime.multipart", "smtplib", "sqlite3"]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_after(code):
+    """
+    在新的解释器中执行代码，返回其中已加载的 HEAVY_MODULES。
+    """
+    script = f"import sys\n{code}\nimport json\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True, capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=ROOT)).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_import_does_not_load_dependencies():
+    assert loaded_after("import xqcsendmessage") == []
+
+
+def test_dingtalk_api_does_not_load_email_dependencies():
+    loaded = loaded_after("import xqcsendmessage as X\nX.send_dingtalk\nX.SendMessageError")
+    assert not {"aiosmtplib", "aiofiles", "email.mime.multipart", "smtplib"} & set(loaded)
+
+
+def test_every_public_name_resolves():
+    assert set(X._LAZY_IMPORTS) <= set(X.__all__)
+    for name in X.__all__:
+        assert getattr(X, name) is not None
+        assert name in dir(X)
+
+
+def test_unknown_name_raises_attribute_error():
+    with pytest.raises(AttributeError):
+        X.no_such_function
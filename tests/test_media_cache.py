@@ -0,0 +1,141 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：media_id 缓存测试：内容相同的图片只上传一次，素材失效（40007）时重新上传并重试，SQLite 存储跨实例共享。
+# 文件路径：tests/test_media_cache.py
+
+import asyncio
+import itertools
+import json
+
+import httpx
+import pytest
+
+from xqcsendmessage.wecom.media_cache import MediaCache, media_cache
+from xqcsendmessage.wecom.sender import AsyncWeComAppSender, WeComAppSender
+
+_corp_ids = itertools.count()
+
+
+class WeComApi:
+    """
+    模拟企业微信接口：记录上传次数，每次上传返回新的 media_id，可让指定的 media_id 发送时返回 40007。
+    """
+
+    def __init__(self):
+        self.uploads = 0
+        self.sent = []
+        self.expired = set()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/gettoken"):
+            return httpx.Response(200, json={"access_token": "token", "expires_in": 7200})
+        if request.url.path.endswith("/media/upload"):
+            self.uploads += 1
+            return httpx.Response(200, json={"errcode": 0, "media_id": f"media-{self.uploads}"})
+        media_id = json.loads(request.content)["image"]["media_id"]
+        self.sent.append(media_id)
+        if media_id in self.expired:
+            return httpx.Response(200, json={"errcode": 40007, "errmsg": "invalid media_id"})
+        return httpx.Response(200, json={"errcode": 0, "errmsg": "ok"})
+
+
+@pytest.fixture
+def api():
+    media_cache.clear()
+    yield WeComApi()
+    media_cache.clear()
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "chart.png"
+    path.write_bytes(b"\x89PNG chart")
+    return str(path)
+
+
+def app_sender(api, agentid=1000001, corpid=None):
+    client = httpx.Client(transport=httpx.MockTransport(api.handler))
+    return WeComAppSender(corpid or f"corp-{next(_corp_ids)}", "secret", agentid, client=client)
+
+
+def test_same_image_is_uploaded_once_per_corp(api, image, tmp_path):
+    sender = app_sender(api)
+    other_app = app_sender(api, agentid=1000002, corpid=sender.corpid)
+    other_corp = app_sender(api)
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(b"\x89PNG chart")
+    try:
+        sender.send({"touser": "@all"}, image_path=image)
+        # 同一企业的其他应用、内容相同的另一个文件都复用 media_id
+        other_app.send({"touser": "@all"}, image_path=str(copy))
+        assert api.uploads == 1
+        other_corp.send({"touser": "@all"}, image_path=image)
+        assert api.uploads == 2
+        assert api.sent == ["media-1", "media-1", "media-2"]
+    finally:
+        for s in (sender, other_app, other_corp):
+            s.close()
+
+
+def test_changed_image_is_uploaded_again(api, image):
+    sender = app_sender(api)
+    try:
+        sender.send({"touser": "@all"}, image_path=image)
+        with open(image, "ab") as f:
+            f.write(b" v2")
+        sender.send({"touser": "@all"}, image_path=image)
+        assert api.sent == ["media-1", "media-2"]
+    finally:
+        sender.close()
+
+
+def test_invalid_media_id_is_uploaded_again(api, image):
+    sender = app_sender(api)
+    try:
+        sender.send({"touser": "@all"}, image_path=image)
+        api.expired.add("media-1")
+        assert sender.send({"touser": "@all"}, image_path=image)["errcode"] == 0
+        assert api.sent == ["media-1", "media-1", "media-2"]
+        # 重新上传后的 media_id 写回缓存
+        sender.send({"touser": "@all"}, image_path=image)
+        assert api.uploads == 2
+    finally:
+        sender.close()
+
+
+def test_invalid_media_id_is_uploaded_again_async(api, image):
+    async def main():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(api.handler))
+        sender = AsyncWeComAppSender(f"corp-{next(_corp_ids)}", "secret", 1000001, client=client)
+        try:
+            await sender.send({"touser": "@all"}, image_path=image)
+            api.expired.add("media-1")
+            assert (await sender.send({"touser": "@all"}, image_path=image))["errcode"] == 0
+        finally:
+            await sender.aclose()
+            await client.aclose()
+
+    asyncio.run(main())
+    assert api.sent == ["media-1", "media-1", "media-2"]
+
+
+def test_cache_entries_expire(monkeypatch):
+    cache = MediaCache(ttl=10)
+    now = 1000.0
+    monkeypatch.setattr("xqcsendmessage.wecom.media_cache.time.time", lambda: now)
+    cache.set("key", "media-1")
+    assert cache.get("key") == "media-1"
+    now += 11
+    assert cache.get("key") is None
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "media.db")
+    first = MediaCache(path)
+    first.set("key", "media-1")
+    second = MediaCache(path)
+    assert second.get("key") == "media-1"
+    second.delete("key")
+    first.clear()
+    assert first.get("key") is None
@@ -0,0 +1,77 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：持久化发件箱测试：投递失败后重新投递，未实际送达的消息不会被删除。
+# 文件路径：tests/test_outbox.py
+
+import asyncio
+
+import httpx
+import pytest
+
+import xqcsendmessage as X
+from xqcsendmessage.outbox import Outbox
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = Outbox(str(tmp_path / "outbox.db"), base_delay=0, max_delay=0)
+    yield box
+    box.close()
+
+
+def test_failed_delivery_is_redelivered(mock_webhook, webhook, outbox):
+    X.enable_dedup(ttl=60)
+    mock_webhook.reply(httpx.Response(503, text="unavailable"))
+    outbox.enqueue("dingtalk", message="服务已恢复", webhook=webhook)
+    assert outbox.drain() == 2
+    assert outbox.stats() == {"pending": 0, "inflight": 0, "dead": 0}
+    assert len(mock_webhook.requests) == 2
+
+
+def test_failed_async_delivery_is_redelivered(mock_webhook, webhook, outbox):
+    mock_webhook.reply(httpx.Response(503, text="unavailable"))
+    outbox.enqueue("dingtalk", message="服务已恢复", webhook=webhook)
+
+    async def main():
+        mock_webhook.async_client()
+        assert await outbox.process_batch_async() == 1
+        assert outbox.stats()["pending"] == 1
+        assert await outbox.process_batch_async() == 1
+
+    asyncio.run(main())
+    assert outbox.stats() == {"pending": 0, "inflight": 0, "dead": 0}
+    assert len(mock_webhook.requests) == 2
+
+
+def test_duplicate_result_stays_pending(mock_webhook, webhook, outbox):
+    X.enable_dedup(ttl=60)
+    X.send_dingtalk("服务已恢复", webhook)
+    outbox.enqueue("dingtalk", message="服务已恢复", webhook=webhook)
+    assert outbox.process_batch() == 1
+    assert outbox.stats() == {"pending": 1, "inflight": 0, "dead": 0}
+    assert len(mock_webhook.requests) == 1
+
+
+def test_business_errcode_is_dead_lettered(mock_webhook, webhook, outbox):
+    mock_webhook.reply(httpx.Response(200, json={"errcode": 310000, "errmsg": "keywords not in content"}))
+    outbox.enqueue("dingtalk", message="服务已恢复", webhook=webhook)
+    assert outbox.drain() == 1
+    assert outbox.stats() == {"pending": 0, "inflight": 0, "dead": 1}
+    assert "keywords not in content" in outbox.dead_letters()[0]["last_error"]
+
+
+def test_delivery_bypasses_aggregation(mock_webhook, webhook, outbox):
+    X.enable_aggregation(window=60)
+    try:
+        mock_webhook.reply(httpx.Response(503, text="unavailable"))
+        outbox.enqueue("dingtalk", message="服务已恢复", webhook=webhook)
+        assert outbox.process_batch() == 1
+        assert outbox.stats()["pending"] == 1
+        assert outbox.process_batch() == 1
+        assert outbox.stats() == {"pending": 0, "inflight": 0, "dead": 0}
+        assert len(mock_webhook.requests) == 2
+        # 发件箱之外的调用仍然会被合并
+        assert X.send_dingtalk("磁盘告警", webhook)["status"] == "queued"
+    finally:
+        X.disable_aggregation()
@@ -0,0 +1,151 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：SMTP 连接池测试：空闲连接的 NOOP 检查和过期、单连接邮件数上限、复用的连接断开时重连一次、STARTTLS 失败时关闭连接。
+# 文件路径：tests/test_pool.py
+
+import asyncio
+import smtplib
+import socket
+
+import pytest
+
+from xqcsendmessage.email.pool import HEALTH_CHECK_AFTER, AsyncSMTPConnectionPool, SMTPConnectionPool
+
+MESSAGE = b"Subject: hi\r\n\r\nbody\r\n"
+
+
+@pytest.fixture
+def pool(smtp_server):
+    controller, _ = smtp_server
+    pool = SMTPConnectionPool("127.0.0.1", controller.port, "a@example.com", "pwd", use_tls=False,
+                              idle_timeout=60, max_messages=3)
+    connects = []
+    connect = pool._connect
+
+    def counting_connect():
+        conn = connect()
+        connects.append(conn)
+        return conn
+
+    pool._connect = counting_connect
+    pool.connects = connects
+    yield pool
+    pool.close()
+
+
+def send(pool):
+    assert pool.sendmail("a@example.com", ["b@example.com"], MESSAGE) == {}
+
+
+def age(pool, seconds):
+    for conn in pool._idle:
+        conn.last_used -= seconds
+
+
+def spy_noop(monkeypatch, code=250):
+    calls = []
+
+    def noop(self):
+        calls.append(self)
+        return code, b"OK"
+
+    monkeypatch.setattr(smtplib.SMTP, "noop", noop)
+    return calls
+
+
+def test_idle_connection_is_reused_without_noop(monkeypatch, pool):
+    noops = spy_noop(monkeypatch)
+    send(pool)
+    send(pool)
+    assert len(pool.connects) == 1
+    assert noops == []
+
+
+def test_noop_checks_connection_idle_for_a_while(monkeypatch, pool):
+    noops = spy_noop(monkeypatch)
+    send(pool)
+    age(pool, HEALTH_CHECK_AFTER + 1)
+    send(pool)
+    assert len(noops) == 1
+    assert len(pool.connects) == 1
+
+
+def test_failed_noop_replaces_connection(monkeypatch, pool):
+    noops = spy_noop(monkeypatch, code=421)
+    send(pool)
+    age(pool, HEALTH_CHECK_AFTER + 1)
+    send(pool)
+    assert len(noops) == 1
+    assert len(pool.connects) == 2
+
+
+def test_expired_connection_is_not_reused(monkeypatch, pool):
+    noops = spy_noop(monkeypatch)
+    send(pool)
+    age(pool, pool.idle_timeout + 1)
+    send(pool)
+    assert noops == []
+    assert len(pool.connects) == 2
+
+
+def test_connection_retires_after_max_messages(pool, smtp_server):
+    for _ in range(4):
+        send(pool)
+    assert len(pool.connects) == 2
+    assert len(smtp_server[1].messages) == 4
+
+
+def test_reused_connection_reconnects_once(pool, smtp_server):
+    send(pool)
+    # 服务端断开了空闲连接
+    pool._idle[0].smtp.sock.shutdown(socket.SHUT_RDWR)
+    send(pool)
+    assert len(pool.connects) == 2
+    assert len(smtp_server[1].messages) == 2
+
+
+def test_fresh_connection_failure_is_not_retried(monkeypatch, pool):
+    def disconnect(self, *args):
+        raise smtplib.SMTPServerDisconnected("gone")
+
+    monkeypatch.setattr(smtplib.SMTP, "sendmail", disconnect)
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        send(pool)
+    assert len(pool.connects) == 1
+
+
+def test_starttls_failure_closes_socket(monkeypatch, smtp_server):
+    controller, _ = smtp_server
+    servers = []
+    starttls = smtplib.SMTP.starttls
+
+    def recording_starttls(self, *args, **kwargs):
+        servers.append(self)
+        return starttls(self, *args, **kwargs)
+
+    monkeypatch.setattr(smtplib.SMTP, "starttls", recording_starttls)
+    pool = SMTPConnectionPool("127.0.0.1", controller.port, "a@example.com", "pwd", use_tls=True)
+    # 本地服务器不支持 STARTTLS
+    with pytest.raises(smtplib.SMTPNotSupportedError):
+        send(pool)
+    assert servers[0].sock is None
+
+
+def test_async_dropped_idle_connection_is_replaced(smtp_server):
+    controller, handler = smtp_server
+
+    async def main():
+        pool = AsyncSMTPConnectionPool("127.0.0.1", controller.port, "a@example.com", "pwd", use_tls=False,
+                                       max_messages=3)
+        await pool.sendmail("a@example.com", ["b@example.com"], MESSAGE)
+        first = pool._idle[0]
+        # 空闲期间连接被断开
+        first.smtp.transport.abort()
+        await asyncio.sleep(0)
+        await pool.sendmail("a@example.com", ["b@example.com"], MESSAGE)
+        assert pool._idle[0] is not first
+        await pool.aclose()
+
+    asyncio.run(main())
+    assert len(handler.messages) == 2
@@ -0,0 +1,63 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：Webhook 限流测试：默认限流器最多等待 `DEFAULT_MAX_WAIT` 秒，不会无限期阻塞发送方。
+# 文件路径：tests/test_ratelimit.py
+
+import sqlite3
+import time
+
+import pytest
+
+import xqcsendmessage as X
+from xqcsendmessage.core.exceptions import RateLimitError
+from xqcsendmessage.core.ratelimit import DEFAULT_MAX_WAIT, RateLimiter, SQLiteRateLimitBackend, webhook_rate_limiter
+
+
+def test_default_wait_is_bounded():
+    X.configure_rate_limit()
+    assert webhook_rate_limiter.max_wait == DEFAULT_MAX_WAIT
+    assert RateLimiter().max_wait == DEFAULT_MAX_WAIT
+
+
+def test_default_limiter_raises_instead_of_waiting_too_long(mock_webhook, webhook):
+    X.configure_rate_limit(rate=1, period=3600)
+    X.send_dingtalk("first", webhook)
+    started = time.monotonic()
+    with pytest.raises(RateLimitError) as info:
+        X.send_dingtalk("second", webhook)
+    assert time.monotonic() - started < 1
+    assert info.value.retry_after > DEFAULT_MAX_WAIT
+    assert len(mock_webhook.requests) == 1
+
+
+def test_short_waits_are_smoothed(mock_webhook, webhook):
+    limiter = RateLimiter(rate=10, period=1, burst=1)
+    assert limiter.acquire(webhook) == 0
+    assert 0 < limiter.acquire(webhook) <= 0.1
+
+
+def test_sqlite_backend_does_not_store_webhook_secret(tmp_path):
+    path = tmp_path / "rate_limits.db"
+    backend = SQLiteRateLimitBackend(str(path))
+    limiter = RateLimiter(rate=1, period=3600, block=False, backend=backend)
+    webhook = "https://oapi.dingtalk.com/robot/send?access_token=secret-token"
+    limiter.acquire(webhook)
+    with pytest.raises(RateLimitError):
+        limiter.acquire(webhook)
+    keys = [row[0] for row in sqlite3.connect(path).execute("SELECT key FROM rate_limits")]
+    assert len(keys) == 1 and "secret-token" not in keys[0]
+    for file in tmp_path.iterdir():
+        assert b"secret-token" not in file.read_bytes()
+    limiter.reset(webhook)
+    limiter.acquire(webhook)
+
+
+def test_sqlite_backend_drops_plain_text_rows(tmp_path):
+    path = tmp_path / "rate_limits.db"
+    SQLiteRateLimitBackend(str(path))
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO rate_limits VALUES ('https://x/send?key=secret', 0, 0)")
+    conn.commit()
+    SQLiteRateLimitBackend(str(path))
+    assert conn.execute("SELECT count(*) FROM rate_limits").fetchone() == (0,)
@@ -0,0 +1,103 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：发送器缓存测试：被 LRU 淘汰、缩容或清空的发送器会调用其关闭钩子。
+# 文件路径：tests/test_registry.py
+
+import asyncio
+import threading
+import time
+
+from xqcsendmessage.core.registry import SenderCache
+from xqcsendmessage.wecom.sender import AsyncWeComAppSender, WeComAppSender
+from xqcsendmessage.wecom.token import token_cache
+
+
+class SyncSender:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncSender:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class BrokenSender(SyncSender):
+    def close(self):
+        raise RuntimeError("boom")
+
+
+def test_lru_eviction_closes_sender():
+    cache = SenderCache(maxsize=2)
+    a = cache.get(SyncSender, name="a")
+    b = cache.get(SyncSender, name="b")
+    assert cache.get(SyncSender, name="a") is a
+    cache.get(SyncSender, name="c")
+    assert b.closed and not a.closed
+    assert len(cache) == 2
+
+
+def test_resize_and_clear_close_senders():
+    cache = SenderCache(maxsize=3)
+    senders = [cache.get(SyncSender, name=name) for name in "abc"]
+    cache.resize(1)
+    assert [s.closed for s in senders] == [True, True, False]
+    cache.clear()
+    assert senders[2].closed
+    assert len(cache) == 0
+
+
+def test_async_sender_is_closed_without_loop():
+    cache = SenderCache(maxsize=1)
+    a = cache.get(AsyncSender, name="a")
+    cache.get(AsyncSender, name="b")
+    assert a.closed
+
+
+def test_async_sender_is_closed_on_running_loop():
+    cache = SenderCache(maxsize=1)
+
+    async def main():
+        a = cache.get(AsyncSender, name="a")
+        cache.get(AsyncSender, name="b")
+        await asyncio.sleep(0)
+        return a
+
+    assert asyncio.run(main()).closed
+
+
+def test_close_failure_does_not_break_get():
+    cache = SenderCache(maxsize=1)
+    cache.get(BrokenSender, name="a")
+    b = cache.get(SyncSender, name="b")
+    assert cache.get(SyncSender, name="b") is b
+
+
+def test_evicting_one_app_sender_keeps_shared_token_refresh():
+    key = ("corp-shared", "secret")
+    cache = SenderCache(maxsize=1)
+    sync_sender = cache.get(WeComAppSender, corpid="corp-shared", corpsecret="secret", agentid=1000001)
+    async_sender = AsyncWeComAppSender("corp-shared", "secret", 1000001)
+    handle = threading.Timer(3600, lambda: None)
+    token_cache._store(key, "token", time.time() + 7200).refresh_handle = handle
+    try:
+        # 淘汰同步发送器，异步发送器仍在使用同一个 Token
+        cache.get(SyncSender, name="a")
+        assert not handle.finished.is_set()
+        # 重复关闭不会多次注销
+        sync_sender.close()
+        assert not handle.finished.is_set()
+
+        asyncio.run(async_sender.aclose())
+        assert handle.finished.is_set()
+    finally:
+        token_cache.clear()
@@ -0,0 +1,90 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：重试策略测试：临时性错误和错误码重试，本地限流不重试，业务错误码直接返回响应。
+# 文件路径：tests/test_retry.py
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import xqcsendmessage as X
+from xqcsendmessage.core.exceptions import HttpError, RateLimitError
+from xqcsendmessage.dingtalk.sender import AsyncDingTalkSender, DingTalkSender
+
+
+def text(content):
+    return {"msgtype": "text", "text": {"content": content}}
+
+
+@pytest.fixture(autouse=True)
+def fast_retry():
+    X.configure_retry(max_attempts=3, base_delay=0, max_delay=0)
+
+
+def test_http_5xx_is_retried(mock_webhook, webhook):
+    mock_webhook.reply(httpx.Response(503, text="unavailable"))
+    assert DingTalkSender(webhook).send(text("hi"))["errcode"] == 0
+    assert len(mock_webhook.requests) == 2
+
+
+def test_retry_gives_up_after_max_attempts(mock_webhook, webhook):
+    mock_webhook.reply(*[httpx.Response(503, text="unavailable")] * 3)
+    with pytest.raises(HttpError) as info:
+        DingTalkSender(webhook).send(text("hi"))
+    assert info.value.status_code == 503
+    assert len(mock_webhook.requests) == 3
+
+
+def test_retryable_errcode_is_retried(mock_webhook, webhook):
+    mock_webhook.reply(httpx.Response(200, json={"errcode": 130101, "errmsg": "send too fast"}))
+    assert DingTalkSender(webhook).send(text("hi"))["errcode"] == 0
+    assert len(mock_webhook.requests) == 2
+
+
+def test_retryable_errcode_is_not_logged_as_unknown_error(mock_webhook, webhook, caplog):
+    mock_webhook.reply(*[httpx.Response(200, json={"errcode": 130101, "errmsg": "send too fast"})] * 2)
+
+    async def main():
+        mock_webhook.async_client()
+        assert (await AsyncDingTalkSender(webhook).send(text("hi")))["errcode"] == 0
+
+    assert DingTalkSender(webhook).send(text("hi"))["errcode"] == 0
+    asyncio.run(main())
+    assert len(mock_webhook.requests) == 4
+    assert "未知错误" not in caplog.text
+    assert not [r for r in caplog.records if r.levelname == "ERROR"]
+
+
+def test_business_errcode_is_returned(mock_webhook, webhook):
+    mock_webhook.reply(httpx.Response(200, json={"errcode": 310000, "errmsg": "keywords not in content"}))
+    result = DingTalkSender(webhook).send(text("hi"))
+    assert result == {"errcode": 310000, "errmsg": "keywords not in content"}
+    assert len(mock_webhook.requests) == 1
+
+
+def test_rate_limit_error_fails_fast(mock_webhook, webhook):
+    sender = DingTalkSender(webhook, rate_limiter=X.RateLimiter(rate=1, period=60, block=False))
+    sender.send(text("first"))
+    started = time.monotonic()
+    with pytest.raises(RateLimitError):
+        sender.send(text("second"))
+    assert time.monotonic() - started < 1
+    assert len(mock_webhook.requests) == 1
+
+
+def test_rate_limit_max_wait_fails_fast_async(mock_webhook, webhook):
+    sender = AsyncDingTalkSender(webhook, rate_limiter=X.RateLimiter(rate=1, period=60, max_wait=0.1))
+
+    async def main():
+        mock_webhook.async_client()
+        await sender.send(text("first"))
+        started = time.monotonic()
+        with pytest.raises(RateLimitError):
+            await sender.send(text("second"))
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 1
+    assert len(mock_webhook.requests) == 1
@@ -0,0 +1,146 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：优先级调度器测试：紧急消息使用预留的工作协程，低优先级消息按等待时间提升，队列上限、取消和关闭。
+# 文件路径：tests/test_scheduler.py
+
+import asyncio
+
+import pytest
+
+from xqcsendmessage.core.exceptions import QueueFullError, ValidationError
+from xqcsendmessage.scheduler import PriorityScheduler
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+class Recorder:
+    """
+    记录任务的执行顺序，`blocker` 一直占用工作协程直到 `gate` 被设置。
+    """
+
+    def __init__(self):
+        self.order = []
+        self.gate = asyncio.Event()
+
+    async def blocker(self, name):
+        self.order.append(name)
+        await self.gate.wait()
+        return name
+
+    async def job(self, name):
+        self.order.append(name)
+        return name
+
+
+def test_urgent_uses_reserved_worker():
+    async def main():
+        rec = Recorder()
+        scheduler = PriorityScheduler(workers=2, reserved_urgent=1)
+        bulk = [scheduler.submit("email", rec.blocker, f"bulk-{i}", priority="bulk") for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["email"] == {"urgent": 0, "queued": 2, "running": 1}
+        urgent = scheduler.submit("email", rec.job, "urgent", priority="urgent")
+        assert await asyncio.wait_for(urgent, 1) == "urgent"
+        assert not any(future.done() for future in bulk)
+        rec.gate.set()
+        assert await asyncio.gather(*bulk) == ["bulk-0", "bulk-1", "bulk-2"]
+        await scheduler.close()
+
+    run(main())
+
+
+def test_channels_do_not_share_workers():
+    async def main():
+        rec = Recorder()
+        scheduler = PriorityScheduler(workers=2, reserved_urgent=1)
+        scheduler.submit("email", rec.blocker, "email")
+        assert await scheduler.submit("dingtalk", rec.job, "dingtalk") == "dingtalk"
+        rec.gate.set()
+        await scheduler.close()
+
+    run(main())
+
+
+@pytest.mark.parametrize("aging, expected", [(10.0, ["normal", "bulk"]), (0.05, ["bulk", "normal"])])
+def test_aging_order(aging, expected):
+    async def main():
+        rec = Recorder()
+        scheduler = PriorityScheduler(workers=2, reserved_urgent=1, aging=aging)
+        scheduler.submit("email", rec.blocker, "blocker")
+        await asyncio.sleep(0)
+        scheduler.submit("email", rec.job, "bulk", priority="bulk")
+        # 批量消息等待超过 2 × aging 后排到新提交的普通消息前面
+        await asyncio.sleep(0.2)
+        scheduler.submit("email", rec.job, "normal")
+        rec.gate.set()
+        await scheduler.join()
+        await scheduler.close()
+        return rec.order[1:]
+
+    assert run(main()) == expected
+
+
+def test_max_queue_size():
+    async def main():
+        rec = Recorder()
+        scheduler = PriorityScheduler(workers=2, reserved_urgent=1, max_queue_size=1)
+        scheduler.submit("email", rec.blocker, "running")
+        await asyncio.sleep(0)
+        queued = scheduler.submit("email", rec.job, "queued")
+        with pytest.raises(QueueFullError):
+            scheduler.submit("email", rec.job, "late")
+        # 其他通道不受影响
+        assert await scheduler.submit("dingtalk", rec.job, "dingtalk") == "dingtalk"
+        rec.gate.set()
+        assert await queued == "queued"
+        await scheduler.close()
+
+    run(main())
+
+
+def test_cancelled_pending_task_is_not_run():
+    async def main():
+        rec = Recorder()
+        scheduler = PriorityScheduler(workers=2, reserved_urgent=1)
+        scheduler.submit("email", rec.blocker, "running")
+        await asyncio.sleep(0)
+        cancelled = scheduler.submit("email", rec.job, "cancelled")
+        kept = scheduler.submit("email", rec.job, "kept")
+        cancelled.cancel()
+        rec.gate.set()
+        assert await kept == "kept"
+        await scheduler.join()
+        await scheduler.close()
+        return rec.order
+
+    assert run(main()) == ["running", "kept"]
+
+
+def test_close_without_wait_cancels_work():
+    async def main():
+        rec = Recorder()
+        scheduler = PriorityScheduler(workers=2, reserved_urgent=1)
+        running = scheduler.submit("email", rec.blocker, "running")
+        await asyncio.sleep(0)
+        queued = scheduler.submit("email", rec.job, "queued")
+        await scheduler.close(wait=False)
+        assert running.cancelled() and queued.cancelled()
+        assert rec.order == ["running"]
+        with pytest.raises(ValidationError):
+            scheduler.submit("email", rec.job, "late")
+
+    run(main())
+
+
+def test_close_waits_for_submitted_work():
+    async def main():
+        rec = Recorder()
+        scheduler = PriorityScheduler(workers=2, reserved_urgent=1)
+        futures = [scheduler.submit("email", rec.job, i, priority="bulk") for i in range(5)]
+        await scheduler.close()
+        return [future.result() for future in futures]
+
+    assert run(main()) == [0, 1, 2, 3, 4]
@@ -0,0 +1,89 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：钉钉加签测试：签名在复用时间内复用，到期后重新签名，Webhook 中的旧签名参数被替换。
+# 文件路径：tests/test_signing.py
+
+import base64
+import hashlib
+import hmac
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from xqcsendmessage.core.exceptions import ValidationError
+from xqcsendmessage.dingtalk.sender import DingTalkSender
+from xqcsendmessage.dingtalk.signing import SIGNATURE_MAX_AGE, SignedWebhook
+
+SECRET = "SEC-test-secret"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_700_000_000.0)
+    clock.time = lambda: clock.now
+    monkeypatch.setattr("xqcsendmessage.dingtalk.signing.time", clock)
+    return clock
+
+
+def params(url):
+    return {k: v[0] for k, v in parse_qs(urlparse(url).query).items()}
+
+
+def expected_sign(timestamp):
+    digest = hmac.new(SECRET.encode(), f"{timestamp}\n{SECRET}".encode(), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+def test_signature_is_reused_until_ttl(clock, webhook):
+    signed = SignedWebhook(webhook, SECRET, signature_ttl=600)
+    first = signed.url()
+    query = params(first)
+    assert query["timestamp"] == str(round(clock.now * 1000))
+    assert query["sign"] == expected_sign(query["timestamp"])
+    clock.now += 599
+    assert signed.url() is first
+    clock.now += 1
+    second = signed.url()
+    assert second != first
+    assert params(second)["timestamp"] == str(round(clock.now * 1000))
+    assert params(second)["sign"] == expected_sign(params(second)["timestamp"])
+
+
+def test_zero_ttl_signs_every_request(clock, webhook):
+    signed = SignedWebhook(webhook, SECRET, signature_ttl=0)
+    first = signed.url()
+    clock.now += 0.001
+    assert signed.url() != first
+
+
+def test_existing_signature_params_are_replaced(clock):
+    signed = SignedWebhook("https://oapi.dingtalk.com/robot/send?access_token=abc&timestamp=1&sign=old", SECRET)
+    query = params(signed.url())
+    assert query["access_token"] == "abc"
+    assert query["sign"] == expected_sign(query["timestamp"])
+    assert signed.url().count("timestamp=") == 1
+    assert SignedWebhook("https://example.com/hook", SECRET).url().startswith("https://example.com/hook?timestamp=")
+
+
+def test_webhook_without_secret_is_unchanged(webhook):
+    assert SignedWebhook(webhook).url() == webhook
+
+
+@pytest.mark.parametrize("ttl", [-1, SIGNATURE_MAX_AGE])
+def test_invalid_ttl_is_rejected(ttl, webhook):
+    with pytest.raises(ValidationError):
+        SignedWebhook(webhook, SECRET, signature_ttl=ttl)
+
+
+def test_sender_reuses_signed_url(clock, mock_webhook, webhook):
+    sender = DingTalkSender(webhook, secret=SECRET, signature_ttl=60)
+    message = {"msgtype": "text", "text": {"content": "hi"}}
+    sender.send(dict(message))
+    sender.send(dict(message))
+    clock.now += 60
+    sender.send(dict(message))
+    urls = [str(r.url) for r in mock_webhook.requests]
+    assert urls[0] == urls[1] != urls[2]
+    assert all(params(url)["sign"] == expected_sign(params(url)["timestamp"]) for url in urls)
@@ -0,0 +1,113 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T22:00:00.000Z
+# 文件描述：Access Token 缓存测试：异步获取时存储锁在同一线程中获取和释放，协程被取消时不会一直占用锁，进程内存储不启动线程。
+# 文件路径：tests/test_token.py
+
+import asyncio
+import threading
+
+import pytest
+
+from xqcsendmessage.wecom.token import AccessTokenCache, _hold_in_thread
+from xqcsendmessage.wecom.token_store import MemoryTokenStore
+
+
+class RLockStore(MemoryTokenStore):
+    """
+    使用只能由持有线程释放的可重入锁的存储。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rlock = threading.RLock()
+
+    def lock(self, key):
+        return self.rlock
+
+
+class FailingLockStore(MemoryTokenStore):
+    class _Lock:
+        def __enter__(self):
+            raise OSError("lock file unavailable")
+
+        def __exit__(self, *exc):
+            return None
+
+    def lock(self, key):
+        return self._Lock()
+
+
+def acquired_elsewhere(lock) -> bool:
+    result = []
+
+    def probe():
+        result.append(lock.acquire(timeout=2))
+        if result[0]:
+            lock.release()
+
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_async_fetch_releases_thread_owned_lock():
+    store = RLockStore()
+    cache = AccessTokenCache(store)
+
+    async def fetcher():
+        return "token", 7200
+
+    assert asyncio.run(cache.get_token_async(("corp", "secret"), fetcher)) == "token"
+    assert acquired_elsewhere(store.rlock)
+
+
+def test_cancelled_wait_does_not_leak_lock():
+    lock = threading.Lock()
+    lock.acquire()
+
+    async def main():
+        async def wait():
+            async with _hold_in_thread(lock):
+                pass
+
+        task = asyncio.create_task(wait())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    # 工作线程在取消后拿到锁，应立即释放
+    lock.release()
+    assert acquired_elsewhere(lock)
+
+
+def test_lock_error_is_raised():
+    cache = AccessTokenCache(FailingLockStore())
+
+    async def fetcher():
+        return "token", 7200
+
+    with pytest.raises(OSError):
+        asyncio.run(cache.get_token_async(("corp", "secret"), fetcher))
+
+
+def test_memory_store_async_fetch_starts_no_thread(monkeypatch):
+    def no_thread(*args, **kwargs):
+        raise AssertionError("进程内存储不应启动线程")
+
+    monkeypatch.setattr(threading, "Thread", no_thread)
+    monkeypatch.setattr(asyncio, "to_thread", no_thread)
+    cache = AccessTokenCache(MemoryTokenStore())
+
+    async def fetcher():
+        return "token", 7200
+
+    async def main():
+        token = await cache.get_token_async(("corp", "secret"), fetcher)
+        cache.cancel_refresh(("corp", "secret"))
+        return token
+
+    assert asyncio.run(main()) == "token"
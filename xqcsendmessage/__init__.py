@@ -4,42 +4,273 @@
 # 文件描述：xqcsendmessage 包的初始化文件，暴露公共 API。
 # 文件路径：xqcsendmessage/__init__.py
 
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
 from .core.exceptions import (
     SendMessageError,
     HttpError,
     AuthError,
     ValidationError,
+    RateLimitError,
+    CircuitOpenError,
+    QueueFullError,
 )
-from .api import (
-    send_email,
-    send_dingtalk,
-    send_wecom_webhook,
-    send_wecom_app,
-    send_email_async,
-    send_dingtalk_async,
-    send_wecom_webhook_async,
-    send_wecom_app_async,
-)
-from .core.utils import read_file, read_file_async
+
+# 公共名称 -> 所在模块。除异常外，公共名称在第一次访问时才导入所在模块（PEP 562），
+# 例如只发送钉钉消息的脚本不会加载 aiosmtplib、aiofiles 和 email.mime
+_LAZY_IMPORTS = {
+    # 发送信息
+    "send_email": ".api",
+    "send_email_batch": ".api",
+    "send_dingtalk": ".api",
+    "send_wecom_webhook": ".api",
+    "send_wecom_app": ".api",
+    "send_many": ".api",
+    "broadcast": ".api",
+    "send_email_async": ".api",
+    "send_email_batch_async": ".api",
+    "send_dingtalk_async": ".api",
+    "send_wecom_webhook_async": ".api",
+    "send_wecom_app_async": ".api",
+    "send_many_async": ".api",
+    "broadcast_async": ".api",
+
+    # 发件箱
+    "Outbox": ".outbox",
+
+    # 后台发送
+    "Dispatcher": ".dispatcher",
+    "dispatch": ".dispatcher",
+    "configure_dispatcher": ".dispatcher",
+    "flush_dispatcher": ".dispatcher",
+
+    # 优先级调度
+    "PriorityScheduler": ".scheduler",
+
+    # 文件读取工具
+    "read_file": ".core.utils",
+    "read_file_async": ".core.utils",
+
+    # HTTP 连接池
+    "configure_http": ".core.http",
+    "close_http_clients": ".core.http",
+    "aclose_http_clients": ".core.http",
+
+    # SMTP 连接池
+    "close_smtp_pools": ".email.pool",
+    "aclose_smtp_pools": ".email.pool",
+
+    # 邮件附件缓存
+    "clear_attachment_cache": ".email.attachments",
+    "set_attachment_cache_size": ".email.attachments",
+
+    # Webhook 限流
+    "RateLimiter": ".core.ratelimit",
+    "configure_rate_limit": ".core.ratelimit",
+    "set_webhook_rate_limit": ".core.ratelimit",
+    "set_rate_limit_backend": ".core.ratelimit",
+    "RateLimitBackend": ".core.ratelimit",
+    "MemoryRateLimitBackend": ".core.ratelimit",
+    "SQLiteRateLimitBackend": ".core.ratelimit",
+
+    # 失败重试
+    "RetryPolicy": ".core.retry",
+    "configure_retry": ".core.retry",
+
+    # 熔断
+    "CircuitBreaker": ".core.circuit",
+    "configure_circuit_breaker": ".core.circuit",
+    "get_circuit_states": ".core.circuit",
+    "reset_circuit_breakers": ".core.circuit",
+
+    # 消息合并
+    "MessageAggregator": ".core.aggregator",
+    "enable_aggregation": ".core.aggregator",
+    "disable_aggregation": ".core.aggregator",
+    "flush_aggregated": ".core.aggregator",
+    "bypass_aggregation": ".core.aggregator",
+
+    # 消息去重
+    "Deduplicator": ".core.dedup",
+    "enable_dedup": ".core.dedup",
+    "disable_dedup": ".core.dedup",
+
+    # 发送器缓存
+    "clear_sender_cache": ".core.registry",
+    "set_sender_cache_size": ".core.registry",
+
+    # 企业微信 Token 存储
+    "set_token_store": ".wecom.token",
+    "TokenStore": ".wecom.token_store",
+    "MemoryTokenStore": ".wecom.token_store",
+    "SQLiteTokenStore": ".wecom.token_store",
+
+    # 企业微信素材缓存
+    "set_media_cache_path": ".wecom.media_cache",
+    "clear_media_cache": ".wecom.media_cache",
+}
+
+if TYPE_CHECKING:
+    from .api import (
+        send_email,
+        send_email_batch,
+        send_dingtalk,
+        send_wecom_webhook,
+        send_wecom_app,
+        send_many,
+        broadcast,
+        send_email_async,
+        send_email_batch_async,
+        send_dingtalk_async,
+        send_wecom_webhook_async,
+        send_wecom_app_async,
+        send_many_async,
+        broadcast_async,
+    )
+    from .outbox import Outbox
+    from .dispatcher import Dispatcher, dispatch, configure_dispatcher, flush_dispatcher
+    from .scheduler import PriorityScheduler
+    from .core.utils import read_file, read_file_async
+    from .core.http import configure_http, close_http_clients, aclose_http_clients
+    from .core.ratelimit import (
+        RateLimiter,
+        RateLimitBackend,
+        MemoryRateLimitBackend,
+        SQLiteRateLimitBackend,
+        configure_rate_limit,
+        set_webhook_rate_limit,
+        set_rate_limit_backend,
+    )
+    from .core.retry import RetryPolicy, configure_retry
+    from .core.circuit import CircuitBreaker, configure_circuit_breaker, get_circuit_states, reset_circuit_breakers
+    from .core.dedup import Deduplicator, enable_dedup, disable_dedup
+    from .core.aggregator import (
+        MessageAggregator,
+        enable_aggregation,
+        disable_aggregation,
+        flush_aggregated,
+        bypass_aggregation,
+    )
+    from .core.registry import clear_sender_cache, set_sender_cache_size
+    from .wecom.token import set_token_store
+    from .wecom.token_store import TokenStore, MemoryTokenStore, SQLiteTokenStore
+    from .wecom.media_cache import set_media_cache_path, clear_media_cache
+    from .email.pool import close_smtp_pools, aclose_smtp_pools
+    from .email.attachments import clear_attachment_cache, set_attachment_cache_size
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    # 缓存到模块命名空间，之后的访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
+
 
 __all__ = [
     # 发送信息
     "send_email",
+    "send_email_batch",
     "send_dingtalk",
     "send_wecom_webhook",
     "send_wecom_app",
+    "send_many",
+    "broadcast",
     "send_email_async",
+    "send_email_batch_async",
     "send_dingtalk_async",
     "send_wecom_webhook_async",
     "send_wecom_app_async",
+    "send_many_async",
+    "broadcast_async",
+
+    # 发件箱
+    "Outbox",
+
+    # 后台发送
+    "Dispatcher",
+    "dispatch",
+    "configure_dispatcher",
+    "flush_dispatcher",
+
+    # 优先级调度
+    "PriorityScheduler",
 
     # 文件读取工具
     "read_file",
     "read_file_async",
 
+    # HTTP 连接池
+    "configure_http",
+    "close_http_clients",
+    "aclose_http_clients",
+
+    # SMTP 连接池
+    "close_smtp_pools",
+    "aclose_smtp_pools",
+
+    # 邮件附件缓存
+    "clear_attachment_cache",
+    "set_attachment_cache_size",
+
+    # Webhook 限流
+    "RateLimiter",
+    "configure_rate_limit",
+    "set_webhook_rate_limit",
+    "set_rate_limit_backend",
+    "RateLimitBackend",
+    "MemoryRateLimitBackend",
+    "SQLiteRateLimitBackend",
+
+    # 失败重试
+    "RetryPolicy",
+    "configure_retry",
+
+    # 熔断
+    "CircuitBreaker",
+    "configure_circuit_breaker",
+    "get_circuit_states",
+    "reset_circuit_breakers",
+
+    # 消息合并
+    "MessageAggregator",
+    "enable_aggregation",
+    "disable_aggregation",
+    "flush_aggregated",
+    "bypass_aggregation",
+
+    # 消息去重
+    "Deduplicator",
+    "enable_dedup",
+    "disable_dedup",
+
+    # 发送器缓存
+    "clear_sender_cache",
+    "set_sender_cache_size",
+
+    # 企业微信 Token 存储
+    "set_token_store",
+    "TokenStore",
+    "MemoryTokenStore",
+    "SQLiteTokenStore",
+
+    # 企业微信素材缓存
+    "set_media_cache_path",
+    "clear_media_cache",
+
     # 异常
     "SendMessageError",
     "HttpError",
     "AuthError",
     "ValidationError",
+    "RateLimitError",
+    "CircuitOpenError",
+    "QueueFullError",
 ]
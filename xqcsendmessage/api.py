@@ -4,19 +4,68 @@
 # 文件描述：提供统一的同步和异步消息发送函数，作为模块的顶层 API。
 # 文件路径：xqcsendmessage/api.py
 
-from typing import Any, Dict, List, Optional, Union
+import copy
+import importlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import threading
 
-# 导入所有发送器
-from .dingtalk.sender import DingTalkSender, AsyncDingTalkSender
-from .wecom.sender import (
-    WeComWebhookSender,
-    AsyncWeComWebhookSender,
-    WeComAppSender,
-    AsyncWeComAppSender,
-)
-from .email.sender import EmailSender, AsyncEmailSender
 from .core.exceptions import SendMessageError
+from .core.registry import get_sender
+from .core.aggregator import get_aggregator
+from .core.payload import JSONPayload
+from .core.logger import default_logger
+
+# 批量发送邮件时默认的并发数，与 SMTP 连接池的默认大小一致
+DEFAULT_EMAIL_BATCH_CONCURRENCY = 4
+# 同一消息发送给多个 Webhook 时默认的并发数
+DEFAULT_FAN_OUT_CONCURRENCY = 8
+
+# 广播时同时发送的通道数
+DEFAULT_BROADCAST_CONCURRENCY = 8
+# 广播时未提供 title 的邮件主题
+DEFAULT_BROADCAST_SUBJECT = "消息通知"
+# broadcast 支持的通道
+BROADCAST_PLATFORMS = ("email", "dingtalk", "wecom_webhook", "wecom_app")
+
+# 发送器类所在的模块。发送器在第一次使用时才导入，只发送钉钉消息时不会加载邮件和企业微信应用的依赖
+_SENDER_MODULES = {
+    "DingTalkSender": ".dingtalk.sender",
+    "AsyncDingTalkSender": ".dingtalk.sender",
+    "WeComWebhookSender": ".wecom.sender",
+    "AsyncWeComWebhookSender": ".wecom.sender",
+    "WeComAppSender": ".wecom.sender",
+    "AsyncWeComAppSender": ".wecom.sender",
+    "EmailSender": ".email.sender",
+    "AsyncEmailSender": ".email.sender",
+}
+
+# send_many 支持的平台：(同步发送器, 异步发送器)
+_FAN_OUT_SENDERS = {
+    "dingtalk": ("DingTalkSender", "AsyncDingTalkSender"),
+    "wecom_webhook": ("WeComWebhookSender", "AsyncWeComWebhookSender"),
+}
+# 只包含这些键的 Webhook 通道使用同一平台共享的消息体
+_BROADCAST_SHARED_KEYS = frozenset({"platform", "webhook", "secret"})
+
+
+def _sender_class(name: str) -> type:
+    """
+    返回发送器类，首次调用时导入其所在模块。
+
+    :param name: 发送器类名，如 "DingTalkSender"。
+    :return: 发送器类。
+    """
+    return getattr(importlib.import_module(_SENDER_MODULES[name], __package__), name)
+
+
+def __getattr__(name: str) -> Any:
+    # 兼容 `from xqcsendmessage.api import DingTalkSender` 的写法
+    if name in _SENDER_MODULES:
+        return _sender_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # --- 辅助函数：消息体构建 ---
 def _build_dingtalk_wecom_message(
@@ -114,6 +163,163 @@ def _build_dingtalk_wecom_message(
     return final_message_body
 
 
+def _validate_email_batch_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    校验批量邮件中的单条消息，返回传给 `send` 的参数。
+    """
+    if not item.get("email_subject") or not item.get("message") or not item.get("email_recipients"):
+        raise SendMessageError(f"❌ 第 {index} 封邮件缺少必要的参数：message, email_subject 或 email_recipients。")
+    return dict(item)
+
+
+def _batch_error_result(index: int, item: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    """
+    构建批量发送中单条失败消息的结果。
+    """
+    default_logger.error(f"🔥 批量邮件第 {index} 封发送失败: {error}")
+    return {
+        "index": index,
+        "status": "error",
+        "recipients": item.get("email_recipients") if isinstance(item, dict) else None,
+        "error": str(error),
+    }
+
+
+def _prepare_fan_out(
+    message: Union[str, Dict[str, Any]],
+    destinations: List[Dict[str, Any]],
+    send_md: bool,
+    title: Optional[str],
+    at_mobiles: Optional[List[str]],
+    at_userids: Optional[List[str]],
+    is_at_all: bool,
+    max_concurrency: int,
+) -> Dict[str, JSONPayload]:
+    """
+    校验发送目标，并为每个用到的平台构建一次消息体。
+    """
+    if max_concurrency < 1:
+        raise SendMessageError("❌ max_concurrency 必须大于 0。")
+    for index, destination in enumerate(destinations):
+        if destination.get("platform") not in _FAN_OUT_SENDERS or not destination.get("webhook"):
+            raise SendMessageError(
+                f"❌ 第 {index} 个目标无效：需要 webhook，platform 支持 {', '.join(_FAN_OUT_SENDERS)}。")
+
+    if at_mobiles or at_userids:
+        is_at_all = False
+    payloads: Dict[str, JSONPayload] = {}
+    platforms = {destination["platform"] for destination in destinations}
+    if "dingtalk" in platforms:
+        payloads["dingtalk"] = JSONPayload(_build_dingtalk_wecom_message(
+            message=copy.deepcopy(message),
+            send_md=send_md,
+            at_mobiles=at_mobiles,
+            at_userids=at_userids,
+            is_at_all=is_at_all,
+            # 钉钉 Markdown 消息必须带标题
+            title=title or ("Markdown消息" if send_md else None),
+        ))
+    if "wecom_webhook" in platforms:
+        payloads["wecom_webhook"] = JSONPayload(_build_dingtalk_wecom_message(
+            message=copy.deepcopy(message),
+            send_md=send_md,
+        ))
+    # 分发前先序列化，避免多个线程同时发现缓存为空而重复序列化
+    for payload in payloads.values():
+        payload.body()
+    return payloads
+
+
+def _fan_out_sender(destination: Dict[str, Any], use_async: bool) -> Any:
+    """
+    获取发送目标对应的（缓存的）发送器。
+    """
+    sender_cls = _sender_class(_FAN_OUT_SENDERS[destination["platform"]][1 if use_async else 0])
+    if destination["platform"] == "dingtalk":
+        return get_sender(sender_cls, webhook=destination["webhook"], secret=destination.get("secret"))
+    return get_sender(sender_cls, webhook=destination["webhook"])
+
+
+def _fan_out_result(index: int, destination: Dict[str, Any], result: Optional[Dict[str, Any]] = None,
+                    error: Optional[Exception] = None) -> Dict[str, Any]:
+    """
+    构建单个发送目标的结果。
+    """
+    entry = {"index": index, "platform": destination["platform"], "webhook": destination["webhook"]}
+    if error is not None:
+        default_logger.error(f"🔥 第 {index} 个目标 ({destination['platform']}) 发送失败: {error}")
+        entry.update(status="error", error=str(error))
+    else:
+        entry.update(status="success", result=result)
+    return entry
+
+
+def _prepare_broadcast(channels: List[Dict[str, Any]], message: str, send_md: bool,
+                       title: Optional[str]) -> Dict[str, JSONPayload]:
+    """
+    为使用默认内容的 Webhook 通道，按平台各构建一次消息体。
+    """
+    shared = [config for config in channels
+              if config["platform"] in _FAN_OUT_SENDERS and config.get("webhook")
+              and config.keys() <= _BROADCAST_SHARED_KEYS]
+    if not shared:
+        return {}
+    return _prepare_fan_out(message, shared, send_md, title, None, None, False, max_concurrency=1)
+
+
+def _broadcast_call(config: Dict[str, Any], payloads: Dict[str, JSONPayload], message: str, send_md: bool,
+                    title: Optional[str], use_async: bool) -> Tuple[Callable[..., Any], Dict[str, Any]]:
+    """
+    根据通道配置返回要调用的发送函数及其参数。使用默认内容的 Webhook 通道直接复用平台共享的消息体。
+    """
+    platform = config["platform"]
+    if platform in payloads and config.keys() <= _BROADCAST_SHARED_KEYS:
+        return _fan_out_sender(config, use_async).send, {"message": payloads[platform]}
+    kwargs = {k: v for k, v in config.items() if k != "platform"}
+    kwargs.setdefault("message", message)
+    if platform == "email":
+        kwargs.setdefault("email_subject", title or DEFAULT_BROADCAST_SUBJECT)
+        funcs = (send_email, send_email_async)
+    elif platform == "dingtalk":
+        kwargs.setdefault("send_md", send_md)
+        # 钉钉 Markdown 消息必须带标题
+        kwargs.setdefault("title", title or ("Markdown消息" if send_md else None))
+        funcs = (send_dingtalk, send_dingtalk_async)
+    elif platform == "wecom_webhook":
+        kwargs.setdefault("send_md", send_md)
+        funcs = (send_wecom_webhook, send_wecom_webhook_async)
+    else:
+        kwargs.setdefault("send_md", send_md)
+        funcs = (send_wecom_app, send_wecom_app_async)
+    return funcs[1 if use_async else 0], kwargs
+
+
+def _validate_broadcast(channels: List[Dict[str, Any]], max_concurrency: int) -> None:
+    """
+    校验广播的通道配置。
+    """
+    if max_concurrency < 1:
+        raise SendMessageError("❌ max_concurrency 必须大于 0。")
+    for index, config in enumerate(channels):
+        if config.get("platform") not in BROADCAST_PLATFORMS:
+            raise SendMessageError(
+                f"❌ 第 {index} 个通道的 platform 无效，支持 {', '.join(BROADCAST_PLATFORMS)}。")
+
+
+def _broadcast_result(index: int, config: Dict[str, Any], result: Optional[Dict[str, Any]] = None,
+                      error: Optional[Exception] = None) -> Dict[str, Any]:
+    """
+    构建单个通道的广播结果。
+    """
+    entry = {"index": index, "platform": config["platform"]}
+    if error is not None:
+        default_logger.error(f"🔥 广播第 {index} 个通道 ({config['platform']}) 发送失败: {error}")
+        entry.update(status="error", error=str(error))
+    else:
+        entry.update(status="success", result=result)
+    return entry
+
+
 # --- 同步发送函数 ---
 
 
@@ -149,7 +355,8 @@ def send_email(
     if not email_subject or not message or not email_recipients:
         raise SendMessageError("❌ 邮件发送缺少必要的参数：message, email_subject 或 email_recipients。")
 
-    sender = EmailSender(
+    sender = get_sender(
+        _sender_class("EmailSender"),
         smtp_server=smtp_server,
         smtp_port=smtp_port,
         sender_email=sender_email,
@@ -166,6 +373,62 @@ def send_email(
     )
 
 
+def send_email_batch(
+    messages: Iterable[Dict[str, Any]],
+    smtp_server: str,
+    smtp_port: int,
+    sender_email: str,
+    sender_password: str,
+    use_tls: bool = True,
+    max_concurrency: int = DEFAULT_EMAIL_BATCH_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    通过少量复用的 SMTP 连接同步批量发送邮件。单封邮件失败不会中断整个批次。
+
+    :param messages: 邮件的可迭代对象，每项为字典，包含 `message`, `email_subject`, `email_recipients`，
+                     以及可选的 `email_subtype`, `email_attachments`。会被逐项读取，不会一次性载入内存。
+    :param smtp_server: SMTP 服务器地址。
+    :param smtp_port: SMTP 服务器端口。
+    :param sender_email: 发件人邮箱。
+    :param sender_password: 发件人邮箱密码或授权码。
+    :param use_tls: 是否使用 TLS 加密。
+    :param max_concurrency: 同时发送的邮件数，即最多使用的 SMTP 连接数。
+    :return: 与输入顺序一致的结果列表，每项包含 `index` 和 `status`（"success" 或 "error"），失败时附带 `error`。
+    """
+    if max_concurrency < 1:
+        raise SendMessageError("❌ max_concurrency 必须大于 0。")
+
+    sender = get_sender(
+        _sender_class("EmailSender"),
+        smtp_server=smtp_server,
+        smtp_port=smtp_port,
+        sender_email=sender_email,
+        sender_password=sender_password,
+        use_tls=use_tls,
+    )
+    results: Dict[int, Dict[str, Any]] = {}
+    # 限制已提交但未完成的任务数，避免一次性为整个批次创建任务
+    in_flight = threading.BoundedSemaphore(max_concurrency * 2)
+
+    def _send_one(index: int, item: Dict[str, Any]) -> None:
+        try:
+            result = sender.send(**_validate_email_batch_item(index, item))
+            results[index] = {"index": index, **result}
+        except Exception as e:
+            results[index] = _batch_error_result(index, item, e)
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="xqc-email-batch") as executor:
+        count = 0
+        for index, item in enumerate(messages):
+            in_flight.acquire()
+            executor.submit(_send_one, index, item)
+            count += 1
+
+    return [results[i] for i in range(count)]
+
+
 def send_dingtalk(
     message: Union[str, Dict[str, Any]],
     webhook: str,
@@ -195,7 +458,7 @@ def send_dingtalk(
     if at_mobiles or at_userids:
         is_at_all = False
         
-    sender = DingTalkSender(webhook=webhook, secret=secret)
+    sender = get_sender(_sender_class("DingTalkSender"), webhook=webhook, secret=secret)
     final_message_body = _build_dingtalk_wecom_message(
         message=message,
         send_md=send_md,
@@ -204,6 +467,11 @@ def send_dingtalk(
         is_at_all=is_at_all,
         title=title
     )
+    aggregator = get_aggregator()
+    if aggregator is not None and not kwargs and aggregator.accepts(final_message_body):
+        queued = aggregator.offer(sender, final_message_body)
+        if queued is not None:
+            return queued
     return sender.send(final_message_body, **kwargs)
 
 
@@ -292,14 +560,99 @@ def send_wecom_webhook(
     :param kwargs: 其他可选参数，将传递给底层的 `WeComWebhookSender`。
     :return: 发送结果的字典。
     """
-    sender = WeComWebhookSender(webhook=webhook)
+    sender = get_sender(_sender_class("WeComWebhookSender"), webhook=webhook)
     final_message_body = _build_dingtalk_wecom_message(
         message=message,
         send_md=send_md,
     )
+    aggregator = get_aggregator()
+    if aggregator is not None and not kwargs and aggregator.accepts(final_message_body):
+        queued = aggregator.offer(sender, final_message_body)
+        if queued is not None:
+            return queued
     return sender.send(final_message_body, **kwargs)
 
 
+def send_many(
+    message: Union[str, Dict[str, Any]],
+    destinations: List[Dict[str, Any]],
+    send_md: bool = False,
+    title: Optional[str] = None,
+    at_mobiles: Optional[List[str]] = None,
+    at_userids: Optional[List[str]] = None,
+    is_at_all: bool = False,
+    max_concurrency: int = DEFAULT_FAN_OUT_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    将同一条消息并发发送给多个钉钉/企业微信 Webhook。每个平台的消息体只构建和序列化一次，
+    单个目标失败不会影响其他目标。
+
+    :param message: 消息内容，字符串或消息体字典。
+    :param destinations: 发送目标列表，每项为字典：`{"platform": "dingtalk", "webhook": ..., "secret": ...}`
+                         或 `{"platform": "wecom_webhook", "webhook": ...}`。
+    :param send_md: 是否发送 Markdown 格式消息，默认为 False (发送 text 格式)。
+    :param title: 钉钉 Markdown 消息的标题。
+    :param at_mobiles: 钉钉消息中被 @ 的用户的手机号列表。
+    :param at_userids: 钉钉消息中被 @ 的用户 ID 列表。
+    :param is_at_all: 钉钉消息是否 @ 所有人。
+    :param max_concurrency: 同时发送的目标数。
+    :return: 与 `destinations` 顺序一致的结果列表，每项包含 `index`, `platform`, `webhook`, `status`
+             （"success" 或 "error"），成功时附带 `result`，失败时附带 `error`。
+    """
+    payloads = _prepare_fan_out(message, destinations, send_md, title, at_mobiles, at_userids, is_at_all,
+                                max_concurrency)
+
+    def _send_one(index: int, destination: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            sender = _fan_out_sender(destination, use_async=False)
+            return _fan_out_result(index, destination, sender.send(payloads[destination["platform"]]))
+        except Exception as e:
+            return _fan_out_result(index, destination, error=e)
+
+    if not destinations:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(destinations)),
+                            thread_name_prefix="xqc-send-many") as executor:
+        return list(executor.map(_send_one, range(len(destinations)), destinations))
+
+
+def broadcast(
+    message: str,
+    channels: List[Dict[str, Any]],
+    send_md: bool = False,
+    title: Optional[str] = None,
+    max_concurrency: int = DEFAULT_BROADCAST_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    将一条通知同时发送到多个通道（邮件、钉钉、企业微信 Webhook、企业微信应用）。各通道在线程池中并发发送，
+    单个通道失败不会影响其他通道。使用默认内容的钉钉和企业微信 Webhook 通道按平台共享同一个消息体，只构建和序列化一次。
+
+    :param message: 消息内容。
+    :param channels: 通道配置列表，每项为字典，`platform` 为 "email", "dingtalk", "wecom_webhook" 或 "wecom_app"，
+                     其余键为对应发送函数（如 `send_email`、`send_dingtalk`）的参数，可包含 `message` 以覆盖默认内容。
+    :param send_md: 是否以 Markdown 格式发送钉钉和企业微信消息。
+    :param title: 消息标题，用作钉钉 Markdown 标题和邮件主题的默认值；未提供时邮件主题为 "消息通知"。
+    :param max_concurrency: 同时发送的通道数。
+    :return: 与 `channels` 顺序一致的结果列表，每项包含 `index`, `platform`, `status`（"success" 或 "error"），
+             成功时附带 `result`，失败时附带 `error`。
+    """
+    _validate_broadcast(channels, max_concurrency)
+    payloads = _prepare_broadcast(channels, message, send_md, title)
+
+    def _send_one(index: int, config: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            func, kwargs = _broadcast_call(config, payloads, message, send_md, title, use_async=False)
+            return _broadcast_result(index, config, func(**kwargs))
+        except Exception as e:
+            return _broadcast_result(index, config, error=e)
+
+    if not channels:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(channels)),
+                            thread_name_prefix="xqc-broadcast") as executor:
+        return list(executor.map(_send_one, range(len(channels)), channels))
+
+
 def send_wecom_app(
     corpid: str,
     corpsecret: str,
@@ -335,7 +688,7 @@ def send_wecom_app(
     if (toparty or totag) and touser == "@all":
         touser = ""
 
-    sender = WeComAppSender(corpid=corpid, corpsecret=corpsecret, agentid=agentid)
+    sender = get_sender(_sender_class("WeComAppSender"), corpid=corpid, corpsecret=corpsecret, agentid=agentid)
     
     if image_path:
         # 准备一个包含接收者信息的基础消息体
@@ -397,7 +750,8 @@ async def send_email_async(
     if not email_subject or not message or not email_recipients:
         raise SendMessageError("❌ 邮件发送缺少必要的参数：message, email_subject 或 email_recipients。")
 
-    sender = AsyncEmailSender(
+    sender = get_sender(
+        _sender_class("AsyncEmailSender"),
         smtp_server=smtp_server,
         smtp_port=smtp_port,
         sender_email=sender_email,
@@ -414,6 +768,65 @@ async def send_email_async(
     )
 
 
+async def send_email_batch_async(
+    messages: Iterable[Dict[str, Any]],
+    smtp_server: str,
+    smtp_port: int,
+    sender_email: str,
+    sender_password: str,
+    use_tls: bool = True,
+    max_concurrency: int = DEFAULT_EMAIL_BATCH_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    通过少量复用的 SMTP 连接异步批量发送邮件。单封邮件失败不会中断整个批次。
+
+    :param messages: 邮件的可迭代对象，每项为字典，包含 `message`, `email_subject`, `email_recipients`，
+                     以及可选的 `email_subtype`, `email_attachments`。会被逐项读取，不会一次性载入内存。
+    :param smtp_server: SMTP 服务器地址。
+    :param smtp_port: SMTP 服务器端口。
+    :param sender_email: 发件人邮箱。
+    :param sender_password: 发件人邮箱密码或授权码。
+    :param use_tls: 是否使用 TLS 加密。
+    :param max_concurrency: 同时发送的邮件数，即最多使用的 SMTP 连接数。
+    :return: 与输入顺序一致的结果列表，每项包含 `index` 和 `status`（"success" 或 "error"），失败时附带 `error`。
+    """
+    if max_concurrency < 1:
+        raise SendMessageError("❌ max_concurrency 必须大于 0。")
+
+    sender = get_sender(
+        _sender_class("AsyncEmailSender"),
+        smtp_server=smtp_server,
+        smtp_port=smtp_port,
+        sender_email=sender_email,
+        sender_password=sender_password,
+        use_tls=use_tls,
+    )
+    results: Dict[int, Dict[str, Any]] = {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _send_one(index: int, item: Dict[str, Any]) -> None:
+        try:
+            result = await sender.send(**_validate_email_batch_item(index, item))
+            results[index] = {"index": index, **result}
+        except Exception as e:
+            results[index] = _batch_error_result(index, item, e)
+        finally:
+            semaphore.release()
+
+    tasks = set()
+    count = 0
+    for index, item in enumerate(messages):
+        await semaphore.acquire()
+        task = asyncio.create_task(_send_one(index, item))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        count += 1
+    if tasks:
+        await asyncio.gather(*tasks)
+
+    return [results[i] for i in range(count)]
+
+
 async def send_dingtalk_async(
     message: Union[str, Dict[str, Any]],
     webhook: str,
@@ -443,7 +856,7 @@ async def send_dingtalk_async(
     if at_mobiles or at_userids:
         is_at_all = False
         
-    sender = AsyncDingTalkSender(webhook=webhook, secret=secret)
+    sender = get_sender(_sender_class("AsyncDingTalkSender"), webhook=webhook, secret=secret)
     final_message_body = _build_dingtalk_wecom_message(
         message=message,
         send_md=send_md,
@@ -452,6 +865,13 @@ async def send_dingtalk_async(
         is_at_all=is_at_all,
         title=title
     )
+    aggregator = get_aggregator()
+    if aggregator is not None and not kwargs and aggregator.accepts(final_message_body):
+        # 合并后的消息由合并器的后台线程通过同步发送器发出
+        sync_sender = get_sender(_sender_class("DingTalkSender"), webhook=webhook, secret=secret)
+        queued = aggregator.offer(sync_sender, final_message_body)
+        if queued is not None:
+            return queued
     return await sender.send(final_message_body, **kwargs)
 
 
@@ -471,14 +891,94 @@ async def send_wecom_webhook_async(
     :param kwargs: 其他可选参数，将传递给底层的 `AsyncWeComWebhookSender`。
     :return: 发送结果的字典。
     """
-    sender = AsyncWeComWebhookSender(webhook=webhook)
+    sender = get_sender(_sender_class("AsyncWeComWebhookSender"), webhook=webhook)
     final_message_body = _build_dingtalk_wecom_message(
         message=message,
         send_md=send_md,
     )
+    aggregator = get_aggregator()
+    if aggregator is not None and not kwargs and aggregator.accepts(final_message_body):
+        # 合并后的消息由合并器的后台线程通过同步发送器发出
+        sync_sender = get_sender(_sender_class("WeComWebhookSender"), webhook=webhook)
+        queued = aggregator.offer(sync_sender, final_message_body)
+        if queued is not None:
+            return queued
     return await sender.send(final_message_body, **kwargs)
 
 
+async def send_many_async(
+    message: Union[str, Dict[str, Any]],
+    destinations: List[Dict[str, Any]],
+    send_md: bool = False,
+    title: Optional[str] = None,
+    at_mobiles: Optional[List[str]] = None,
+    at_userids: Optional[List[str]] = None,
+    is_at_all: bool = False,
+    max_concurrency: int = DEFAULT_FAN_OUT_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    将同一条消息异步并发发送给多个钉钉/企业微信 Webhook。每个平台的消息体只构建和序列化一次，
+    单个目标失败不会影响其他目标。
+
+    :param message: 消息内容，字符串或消息体字典。
+    :param destinations: 发送目标列表，每项为字典：`{"platform": "dingtalk", "webhook": ..., "secret": ...}`
+                         或 `{"platform": "wecom_webhook", "webhook": ...}`。
+    :param send_md: 是否发送 Markdown 格式消息，默认为 False (发送 text 格式)。
+    :param title: 钉钉 Markdown 消息的标题。
+    :param at_mobiles: 钉钉消息中被 @ 的用户的手机号列表。
+    :param at_userids: 钉钉消息中被 @ 的用户 ID 列表。
+    :param is_at_all: 钉钉消息是否 @ 所有人。
+    :param max_concurrency: 同时发送的目标数。
+    :return: 与 `destinations` 顺序一致的结果列表，格式同 `send_many`。
+    """
+    payloads = _prepare_fan_out(message, destinations, send_md, title, at_mobiles, at_userids, is_at_all,
+                                max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _send_one(index: int, destination: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                sender = _fan_out_sender(destination, use_async=True)
+                return _fan_out_result(index, destination, await sender.send(payloads[destination["platform"]]))
+            except Exception as e:
+                return _fan_out_result(index, destination, error=e)
+
+    return list(await asyncio.gather(*(_send_one(i, d) for i, d in enumerate(destinations))))
+
+
+async def broadcast_async(
+    message: str,
+    channels: List[Dict[str, Any]],
+    send_md: bool = False,
+    title: Optional[str] = None,
+    max_concurrency: int = DEFAULT_BROADCAST_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    异步将一条通知同时发送到多个通道（邮件、钉钉、企业微信 Webhook、企业微信应用）。各通道并发发送，
+    单个通道失败不会影响其他通道。
+
+    :param message: 消息内容。
+    :param channels: 通道配置列表，格式同 `broadcast`。
+    :param send_md: 是否以 Markdown 格式发送钉钉和企业微信消息。
+    :param title: 消息标题，用作钉钉 Markdown 标题和邮件主题的默认值；未提供时邮件主题为 "消息通知"。
+    :param max_concurrency: 同时发送的通道数。
+    :return: 与 `channels` 顺序一致的结果列表，格式同 `broadcast`。
+    """
+    _validate_broadcast(channels, max_concurrency)
+    payloads = _prepare_broadcast(channels, message, send_md, title)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _send_one(index: int, config: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                func, kwargs = _broadcast_call(config, payloads, message, send_md, title, use_async=True)
+                return _broadcast_result(index, config, await func(**kwargs))
+            except Exception as e:
+                return _broadcast_result(index, config, error=e)
+
+    return list(await asyncio.gather(*(_send_one(i, c) for i, c in enumerate(channels))))
+
+
 async def send_wecom_app_async(
     corpid: str,
     corpsecret: str,
@@ -514,7 +1014,7 @@ async def send_wecom_app_async(
     if (toparty or totag) and touser == "@all":
         touser = ""
         
-    sender = AsyncWeComAppSender(corpid=corpid, corpsecret=corpsecret, agentid=agentid)
+    sender = get_sender(_sender_class("AsyncWeComAppSender"), corpid=corpid, corpsecret=corpsecret, agentid=agentid)
     
     if image_path:
         # 准备一个包含接收者信息的基础消息体
@@ -539,3 +1039,12 @@ async def send_wecom_app_async(
             totag=totag,
         )
         return await sender.send(final_message_body, **kwargs)
+
+
+# 各平台的顶层发送函数：(同步发送函数, 异步发送函数)，供发件箱和后台分发器按平台名调用
+SEND_FUNCTIONS = {
+    "email": (send_email, send_email_async),
+    "dingtalk": (send_dingtalk, send_dingtalk_async),
+    "wecom_webhook": (send_wecom_webhook, send_wecom_webhook_async),
+    "wecom_app": (send_wecom_app, send_wecom_app_async),
+}
@@ -13,6 +13,9 @@ class Sender(ABC):
     所有同步发送器的基类。
     """
 
+    # 各消息类型（如 'text'、'markdown'）内容的最大字节数，为空表示不限制
+    MESSAGE_BYTE_LIMITS: Dict[str, int] = {}
+
     @abstractmethod
     def send(self, message: str | Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
         """
@@ -30,6 +33,9 @@ class AsyncSender(ABC):
     所有异步发送器的基类。
     """
 
+    # 各消息类型（如 'text'、'markdown'）内容的最大字节数，为空表示不限制
+    MESSAGE_BYTE_LIMITS: Dict[str, int] = {}
+
     @abstractmethod
     async def send(self, message: str | Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
         """
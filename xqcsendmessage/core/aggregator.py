@@ -0,0 +1,285 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T15:30:00.000Z
+# 文件描述：消息合并器，在时间窗口内把发往同一 Webhook 的文本/Markdown 消息合并为一条发送。
+# 文件路径：xqcsendmessage/core/aggregator.py
+
+import atexit
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from .abc import Sender
+from .chunker import content_field
+from .exceptions import ValidationError
+from .logger import default_logger
+
+# 默认合并窗口（秒）和每条合并消息最多包含的原始消息数
+DEFAULT_AGGREGATION_WINDOW = 5.0
+DEFAULT_AGGREGATION_MAX_MESSAGES = 50
+# 为合并消息的标题预留的字节数
+_HEADER_RESERVE = 64
+# 为每条消息的分隔符和重复次数标注预留的字节数
+_ITEM_RESERVE = 32
+
+
+class _Batch:
+    """
+    单个目标正在合并的消息。
+    """
+    __slots__ = ("sender", "msgtype", "title", "contents", "count", "size", "timer")
+
+    def __init__(self, sender: Sender, msgtype: str, title: Optional[str]):
+        self.sender = sender
+        self.msgtype = msgtype
+        self.title = title
+        # 正文 -> 出现次数，相同的消息只保留一份
+        self.contents: "OrderedDict[str, int]" = OrderedDict()
+        self.count = 0
+        self.size = _HEADER_RESERVE
+        self.timer: Optional[threading.Timer] = None
+
+
+class MessageAggregator:
+    """
+    按目标（发送器类型 + Webhook）合并消息。
+
+    第一条消息到达后开始计时，窗口结束、消息数达到 `max_messages`，或再加入一条就会超过平台长度限制时，
+    缓冲的消息合并为一条发送，相同内容只发送一次并标注重复次数。合并后的消息由后台线程按顺序发送，
+    调用方不会被阻塞。`close()` 和进程退出时会发送所有未发送的消息。
+    """
+
+    def __init__(self, window: float = DEFAULT_AGGREGATION_WINDOW,
+                 max_messages: int = DEFAULT_AGGREGATION_MAX_MESSAGES):
+        """
+        初始化消息合并器。
+
+        :param window: 合并窗口（秒）。
+        :param max_messages: 每条合并消息最多包含的原始消息数。
+        """
+        if window <= 0 or max_messages < 1:
+            raise ValidationError("❌ 合并窗口必须大于 0，max_messages 必须大于 0。")
+        self.window = window
+        self.max_messages = max_messages
+        self.logger = default_logger
+        self._batches: Dict[Hashable, _Batch] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[Sender, Dict[str, Any]]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+    @staticmethod
+    def accepts(message: Dict[str, Any]) -> bool:
+        """
+        判断消息能否合并。只合并不带 @ 等附加参数的文本和 Markdown 消息。
+
+        :param message: 消息体。
+        :return: 能否合并。
+        """
+        msgtype = message.get("msgtype")
+        return (msgtype in ("text", "markdown") and set(message) == {"msgtype", msgtype}
+                and content_field(message) is not None)
+
+    def add(self, sender: Sender, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        加入一条消息，等待与同一目标的其他消息合并后发送。
+
+        :param sender: 同步发送器，需要有 `webhook` 属性。
+        :param message: 可合并的消息体，见 `accepts`。
+        :return: 排队结果，包含当前目标已缓冲的消息数。
+        """
+        result = self.offer(sender, message)
+        if result is None:
+            raise ValidationError("❌ 消息合并器已关闭。")
+        return result
+
+    def offer(self, sender: Sender, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        与 `add` 相同，但合并器已关闭时返回 None 而不抛出异常，由调用方直接发送。
+        顶层发送函数使用该方法，其他线程同时调用 `disable_aggregation()` 时消息不会发送失败。
+
+        :param sender: 同步发送器，需要有 `webhook` 属性。
+        :param message: 可合并的消息体，见 `accepts`。
+        :return: 排队结果，合并器已关闭时返回 None。
+        """
+        if not self.accepts(message):
+            raise ValidationError("❌ 只能合并不带附加参数的文本或 Markdown 消息。")
+        msgtype = message["msgtype"]
+        content = message[msgtype][content_field(message)]
+        title = message[msgtype].get("title")
+        key = (type(sender), sender.webhook)
+        limit = sender.MESSAGE_BYTE_LIMITS.get(msgtype)
+        size = len(content.encode("utf-8")) + _ITEM_RESERVE
+
+        with self._lock:
+            if self._closed:
+                return None
+            batch = self._batches.get(key)
+            if batch is not None and (batch.msgtype != msgtype
+                                      or (limit is not None and content not in batch.contents
+                                          and batch.size + size > limit)):
+                self._flush_locked(key)
+                batch = None
+            if batch is None:
+                batch = self._batches[key] = _Batch(sender, msgtype, title)
+                batch.timer = threading.Timer(self.window, self._on_timer, args=(key, batch))
+                batch.timer.daemon = True
+                batch.timer.start()
+            if content not in batch.contents:
+                batch.size += size
+            batch.contents[content] = batch.contents.get(content, 0) + 1
+            batch.count += 1
+            pending = batch.count
+            if batch.count >= self.max_messages:
+                self._flush_locked(key)
+        return {"status": "queued", "pending": pending}
+
+    def _on_timer(self, key: Hashable, batch: _Batch) -> None:
+        with self._lock:
+            if self._batches.get(key) is batch:
+                self._flush_locked(key)
+
+    def _flush_locked(self, key: Hashable) -> None:
+        """
+        取出目标的缓冲消息并交给后台线程发送，调用方需持有锁。
+        """
+        batch = self._batches.pop(key)
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self._queue.put((batch.sender, self._build(batch)))
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="xqc-aggregator", daemon=True)
+            self._worker.start()
+
+    @staticmethod
+    def _build(batch: _Batch) -> Dict[str, Any]:
+        """
+        将缓冲的消息合并为一条消息。
+        """
+        markdown = batch.msgtype == "markdown"
+        items: List[str] = []
+        for content, count in batch.contents.items():
+            items.append(content if count == 1 else f"{content}\n（重复 {count} 次）")
+
+        if batch.count == 1:
+            text = items[0]
+        elif markdown:
+            text = f"**共 {batch.count} 条消息**\n\n" + "\n\n---\n\n".join(items)
+        else:
+            text = f"【共 {batch.count} 条消息】\n\n" + "\n\n".join(items)
+
+        if not markdown:
+            return {"msgtype": "text", "text": {"content": text}}
+        if batch.title is not None:
+            return {"msgtype": "markdown", "markdown": {"title": batch.title, "text": text}}
+        return {"msgtype": "markdown", "markdown": {"content": text}}
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                sender, message = item
+                try:
+                    sender.send(message)
+                except Exception as e:
+                    self.logger.error(f"🔥 发送合并消息失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """
+        立即发送所有缓冲的消息，并等待发送完成。
+        """
+        with self._lock:
+            for key in list(self._batches):
+                self._flush_locked(key)
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        发送所有缓冲的消息并停止后台线程，之后不能再加入消息。
+        """
+        with self._lock:
+            self._closed = True
+        self.flush()
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            self._queue.put(None)
+            worker.join()
+
+
+# 顶层发送函数使用的合并器，默认不启用
+_aggregator: Optional[MessageAggregator] = None
+_aggregator_lock = threading.Lock()
+# 当前线程或协程是否绕过合并器，直接发送
+_bypass: ContextVar[bool] = ContextVar("xqc_aggregation_bypass", default=False)
+
+
+def get_aggregator() -> Optional[MessageAggregator]:
+    """
+    返回当前启用的消息合并器。
+
+    :return: 消息合并器，未启用或当前处于 `bypass_aggregation()` 中时返回 None。
+    """
+    if _bypass.get():
+        return None
+    return _aggregator
+
+
+@contextmanager
+def bypass_aggregation() -> Iterator[None]:
+    """
+    在 `with` 块内绕过消息合并，顶层发送函数直接发送并返回平台的实际结果。
+    只影响当前线程或协程，供需要确认送达结果的调用方（如持久化发件箱）使用。
+    """
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def enable_aggregation(window: float = DEFAULT_AGGREGATION_WINDOW,
+                       max_messages: int = DEFAULT_AGGREGATION_MAX_MESSAGES) -> MessageAggregator:
+    """
+    为 `send_dingtalk`、`send_wecom_webhook` 及其异步版本启用消息合并。已启用时先发送旧合并器中的消息。
+
+    :param window: 合并窗口（秒）。
+    :param max_messages: 每条合并消息最多包含的原始消息数。
+    :return: 新的消息合并器。
+    """
+    global _aggregator
+    aggregator = MessageAggregator(window, max_messages)
+    with _aggregator_lock:
+        previous, _aggregator = _aggregator, aggregator
+    if previous is not None:
+        previous.close()
+    return aggregator
+
+
+def disable_aggregation() -> None:
+    """
+    关闭消息合并，并发送所有缓冲的消息。
+    """
+    global _aggregator
+    with _aggregator_lock:
+        previous, _aggregator = _aggregator, None
+    if previous is not None:
+        previous.close()
+
+
+def flush_aggregated() -> None:
+    """
+    立即发送所有缓冲的合并消息，并等待发送完成。
+    """
+    aggregator = _aggregator
+    if aggregator is not None:
+        aggregator.flush()
+
+
+atexit.register(disable_aggregation)
@@ -0,0 +1,218 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T16:00:00.000Z
+# 文件描述：按平台字节限制拆分超长消息，在行或 Markdown 块的边界处拆分并为各部分编号。
+# 文件路径：xqcsendmessage/core/chunker.py
+
+from typing import Any, Dict, List, Optional
+
+from .abc import Sender, AsyncSender
+from .exceptions import ValidationError
+from .logger import default_logger
+
+# 为每部分的编号（如 "**(12/34)**\n"）预留的字节数
+PART_LABEL_RESERVE = 32
+# UTF-8 单个字符最多占用的字节数，每部分至少要能放下一个完整字符
+_MAX_CHAR_BYTES = 4
+
+_FENCES = ("```", "~~~")
+
+
+def content_field(message: Dict[str, Any]) -> Optional[str]:
+    """
+    返回消息正文所在的字段名。钉钉 Markdown 使用 'text'，其余使用 'content'。
+
+    :param message: 消息体。
+    :return: 字段名，消息没有文本正文时返回 None。
+    """
+    body = message.get(message.get("msgtype"))
+    if not isinstance(body, dict):
+        return None
+    if message["msgtype"] == "markdown" and "text" in body:
+        return "text"
+    return "content" if "content" in body else None
+
+
+def _byte_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def _split_bytes(text: str, max_bytes: int) -> List[str]:
+    """
+    按字节数硬拆分，不会截断 UTF-8 多字节字符。`max_bytes` 小于一个字符的字节数时，该部分只放这一个字符。
+    """
+    data = text.encode("utf-8")
+    pieces = []
+    start = 0
+    while start < len(data):
+        end = min(start + max_bytes, len(data))
+        # 回退到字符起始字节（UTF-8 后续字节形如 0b10xxxxxx）
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        if end == start:
+            # 至少前进一个完整字符，避免死循环
+            end += 1
+            while end < len(data) and (data[end] & 0xC0) == 0x80:
+                end += 1
+        pieces.append(data[start:end].decode("utf-8"))
+        start = end
+    return pieces
+
+
+def _pack(units: List[str], budget: int, joiner: str) -> List[str]:
+    """
+    将各单元按顺序尽量多地装入每个分块，每个单元都不超过 `budget`。
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    joiner_size = _byte_len(joiner)
+    for unit in units:
+        unit_size = _byte_len(unit)
+        if current and size + joiner_size + unit_size > budget:
+            chunks.append(joiner.join(current))
+            current, size = [], 0
+        size = unit_size if not current else size + joiner_size + unit_size
+        current.append(unit)
+    if current:
+        chunks.append(joiner.join(current))
+    return chunks
+
+
+def _split_lines(lines: List[str], budget: int) -> List[str]:
+    """
+    按行拆分，超长的行按字节硬拆分。
+    """
+    units: List[str] = []
+    for line in lines:
+        units.extend(_split_bytes(line, budget) if _byte_len(line) > budget else [line])
+    return _pack(units, budget, "\n")
+
+
+def _markdown_blocks(content: str) -> List[str]:
+    """
+    按空行将 Markdown 拆分为块，代码块内部的空行不作为分隔。
+    """
+    blocks: List[str] = []
+    current: List[str] = []
+    fence: Optional[str] = None
+    for line in content.split("\n"):
+        marker = line.lstrip()[:3]
+        if fence is None and marker in _FENCES:
+            fence = marker
+        elif fence is not None and marker == fence:
+            fence = None
+        elif fence is None and not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _split_block(block: str, budget: int) -> List[str]:
+    """
+    拆分超长的 Markdown 块。代码块拆分后每部分都补全起止标记。
+    """
+    lines = block.split("\n")
+    opening = lines[0].lstrip()
+    if opening[:3] in _FENCES and len(lines) > 2 and lines[-1].strip() == opening[:3]:
+        closing = opening[:3]
+        inner_budget = budget - _byte_len(lines[0]) - _byte_len(closing) - 2
+        if inner_budget >= _MAX_CHAR_BYTES:
+            return [f"{lines[0]}\n{piece}\n{closing}" for piece in _split_lines(lines[1:-1], inner_budget)]
+    return _split_lines(lines, budget)
+
+
+def split_content(content: str, max_bytes: int, markdown: bool = False) -> List[str]:
+    """
+    将超过 `max_bytes` 字节（UTF-8）的内容拆分为多部分并编号。
+
+    文本按行拆分；Markdown 优先按块（空行分隔的段落、完整的代码块）拆分，块过长时再按行拆分；
+    单行过长时按字节拆分，不会截断多字节字符。
+
+    :param content: 消息内容。
+    :param max_bytes: 每部分的最大字节数。
+    :param markdown: 是否按 Markdown 拆分。
+    :return: 各部分内容，未超过限制时返回只包含原内容的列表。
+    """
+    if _byte_len(content) <= max_bytes:
+        return [content]
+    budget = max_bytes - PART_LABEL_RESERVE
+    if budget < _MAX_CHAR_BYTES:
+        raise ValidationError(f"❌ max_bytes 过小，至少需要 {PART_LABEL_RESERVE + _MAX_CHAR_BYTES} 字节。")
+
+    if markdown:
+        units: List[str] = []
+        for block in _markdown_blocks(content):
+            units.extend(_split_block(block, budget) if _byte_len(block) > budget else [block])
+        chunks = _pack(units, budget, "\n\n")
+    else:
+        chunks = _split_lines(content.split("\n"), budget)
+
+    total = len(chunks)
+    if markdown:
+        return [f"**({index}/{total})**\n{chunk}" for index, chunk in enumerate(chunks, 1)]
+    return [f"({index}/{total})\n{chunk}" for index, chunk in enumerate(chunks, 1)]
+
+
+def split_payload(message: Dict[str, Any], limits: Dict[str, int]) -> List[Dict[str, Any]]:
+    """
+    按发送器的字节限制拆分文本或 Markdown 消息体。
+
+    拆分出的每条消息保留原消息的其他字段（如接收人、标题）；钉钉的 `at` 字段只保留在最后一条，
+    避免重复提醒。
+
+    :param message: 消息体。
+    :param limits: 各消息类型的最大字节数，即发送器的 `MESSAGE_BYTE_LIMITS`。
+    :return: 拆分后的消息体列表，无需拆分时返回只包含原消息的列表。
+    """
+    msgtype = message.get("msgtype")
+    limit = limits.get(msgtype)
+    field = content_field(message)
+    if limit is None or field is None:
+        return [message]
+    body = message[msgtype]
+    content = body[field]
+    if not isinstance(content, str) or _byte_len(content) <= limit:
+        return [message]
+
+    chunks = split_content(content, limit, markdown=msgtype == "markdown")
+    parts = []
+    for index, chunk in enumerate(chunks, 1):
+        part = {k: v for k, v in message.items() if k != "at" or index == len(chunks)}
+        # 钉钉 Markdown 可能同时带有 text 和 content，两者保持一致
+        part[msgtype] = {k: (chunk if k in ("text", "content") and v == content else v) for k, v in body.items()}
+        parts.append(part)
+    return parts
+
+
+def send_parts(sender: Sender, parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    按顺序逐条发送拆分后的消息。每条消息单独经过发送器的限流。
+
+    :param sender: 同步发送器。
+    :param parts: 拆分后的消息体列表。
+    :return: 最后一条消息的响应，`parts` 字段为各部分的响应列表。
+    """
+    default_logger.warning(f"⚠️ 消息超过长度限制，拆分为 {len(parts)} 条按顺序发送。")
+    results = [sender.send(part) for part in parts]
+    return dict(results[-1], parts=results)
+
+
+async def send_parts_async(sender: AsyncSender, parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    按顺序逐条异步发送拆分后的消息。每条消息单独经过发送器的限流。
+
+    :param sender: 异步发送器。
+    :param parts: 拆分后的消息体列表。
+    :return: 最后一条消息的响应，`parts` 字段为各部分的响应列表。
+    """
+    default_logger.warning(f"⚠️ 消息超过长度限制，拆分为 {len(parts)} 条按顺序发送。")
+    results = []
+    for part in parts:
+        results.append(await sender.send(part))
+    return dict(results[-1], parts=results)
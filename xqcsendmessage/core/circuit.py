@@ -0,0 +1,384 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T18:30:00.000Z
+# 文件描述：按发送目标（Webhook、企业微信应用、SMTP 服务器）熔断，目标持续失败时直接拒绝发送，冷却后再试探恢复。
+# 文件路径：xqcsendmessage/core/circuit.py
+
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from .exceptions import CircuitOpenError, HttpError, ValidationError
+from .logger import default_logger
+from .retry import loaded_errors
+
+T = TypeVar("T")
+
+# 熔断器状态
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 统计失败率的最近调用次数
+DEFAULT_WINDOW_SIZE = 20
+# 最近调用次数达到该值后才计算失败率
+DEFAULT_MIN_CALLS = 5
+# 失败率达到该值时熔断
+DEFAULT_FAILURE_RATE = 0.5
+# 熔断后的冷却时间（秒），之后进入半开状态试探
+DEFAULT_COOLDOWN = 30.0
+# 半开状态下允许同时进行的试探调用数
+DEFAULT_HALF_OPEN_CALLS = 1
+
+# 说明目标不可用的网络、传输和 SMTP 连接错误：模块名 -> 错误类名
+_OUTAGE_ERROR_NAMES = {
+    "httpx": ("TransportError",),
+    "smtplib": ("SMTPServerDisconnected", "SMTPConnectError"),
+    "aiosmtplib": ("SMTPServerDisconnected", "SMTPConnectError", "SMTPTimeoutError"),
+    "socket": ("gaierror",),
+}
+
+# 说明发送目标已失效的平台错误码，与网络错误一样计入熔断：Webhook 被删除、机器人被停用、凭据无效等，
+# 这类目标在人工修复前每次发送都会失败
+DESTINATION_INVALID_ERRCODES = frozenset({
+    93000,   # 企业微信：Webhook 地址无效（key 被删除或错误）
+    40001,   # 企业微信：Secret 无效
+    40013,   # 企业微信：CorpID 无效
+    300001,  # 钉钉：access_token 不存在
+    400013,  # 钉钉：群已被解散
+    400101,  # 钉钉：access_token 不存在
+    400102,  # 钉钉：机器人已停用
+})
+
+
+def is_outage(error: BaseException) -> bool:
+    """
+    判断错误是否说明发送目标不可用：网络和传输错误、超时、HTTP 5xx 和 408、SMTP 连接断开，
+    以及 `DESTINATION_INVALID_ERRCODES` 中说明目标已失效的错误码。
+    参数错误、本地限流、读取文件失败和其他业务错误码（如关键词不匹配）不说明目标不可用，不计入熔断。
+
+    :param error: 发送时抛出的异常。
+    :return: 是否计为一次失败。
+    """
+    if isinstance(error, HttpError):
+        if error.errcode in DESTINATION_INVALID_ERRCODES:
+            return True
+        return error.status_code is not None and (error.status_code >= 500 or error.status_code == 408)
+    return isinstance(error, (ConnectionError, TimeoutError) + loaded_errors(_OUTAGE_ERROR_NAMES.items()))
+
+
+class CircuitBreaker:
+    """
+    单个发送目标的熔断器。
+
+    关闭状态下正常发送并记录最近 `window_size` 次的结果，失败率达到 `failure_rate` 时打开；
+    打开状态下直接抛出 `CircuitOpenError`，不再连接目标；`cooldown` 秒后进入半开状态，
+    放行少量试探调用，成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, name: str, window_size: int = DEFAULT_WINDOW_SIZE, min_calls: int = DEFAULT_MIN_CALLS,
+                 failure_rate: float = DEFAULT_FAILURE_RATE, cooldown: float = DEFAULT_COOLDOWN,
+                 half_open_calls: int = DEFAULT_HALF_OPEN_CALLS):
+        """
+        初始化熔断器。
+
+        :param name: 发送目标的名称，用于日志和监控。
+        :param window_size: 统计失败率的最近调用次数。
+        :param min_calls: 最近调用次数达到该值后才会熔断。
+        :param failure_rate: 熔断的失败率阈值，0 到 1 之间。
+        :param cooldown: 熔断后的冷却时间（秒）。
+        :param half_open_calls: 半开状态下允许同时进行的试探调用数。
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._results: Deque[bool] = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self.configure(window_size, min_calls, failure_rate, cooldown, half_open_calls)
+
+    def configure(self, window_size: int = DEFAULT_WINDOW_SIZE, min_calls: int = DEFAULT_MIN_CALLS,
+                  failure_rate: float = DEFAULT_FAILURE_RATE, cooldown: float = DEFAULT_COOLDOWN,
+                  half_open_calls: int = DEFAULT_HALF_OPEN_CALLS) -> None:
+        """
+        修改熔断参数，参数含义同 `__init__`，已记录的结果保留。
+        """
+        if window_size < 1 or not 1 <= min_calls <= window_size:
+            raise ValidationError("❌ window_size 必须大于 0，min_calls 必须在 1 到 window_size 之间。")
+        if not 0 < failure_rate <= 1 or cooldown < 0 or half_open_calls < 1:
+            raise ValidationError("❌ failure_rate 必须在 (0, 1] 之间，cooldown 不能为负数，half_open_calls 必须大于 0。")
+        with self._lock:
+            if window_size != self._results.maxlen:
+                self._results = deque(self._results, maxlen=window_size)
+            self.min_calls = min_calls
+            self.failure_rate = failure_rate
+            self.cooldown = cooldown
+            self.half_open_calls = half_open_calls
+
+    def _current_state(self) -> str:
+        """
+        返回当前状态，冷却结束的打开状态视为半开，调用方需持有锁。
+        """
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._trials = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        """
+        当前状态：'closed'、'open' 或 'half_open'。
+        """
+        with self._lock:
+            return self._current_state()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取用于监控的状态快照。
+
+        :return: 包含 `name`, `state`, `calls`, `failures`, `failure_rate`, `retry_after` 的字典。
+        """
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._results)
+            failures = calls - sum(self._results)
+            retry_after = max(0.0, self._opened_at + self.cooldown - time.monotonic()) if state == OPEN else 0.0
+        return {
+            "name": self.name,
+            "state": state,
+            "calls": calls,
+            "failures": failures,
+            "failure_rate": failures / calls if calls else 0.0,
+            "retry_after": retry_after,
+        }
+
+    def before_call(self) -> None:
+        """
+        发送前检查是否允许调用，不允许时抛出 `CircuitOpenError`。
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return
+            retry_after = max(0.0, self._opened_at + self.cooldown - time.monotonic())
+        raise CircuitOpenError(f"❌ 发送目标 {self.name} 已熔断，暂停发送。", retry_after)
+
+    def record_success(self) -> None:
+        """
+        记录一次成功调用，半开状态下恢复为关闭。
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._results.clear()
+                default_logger.info(f"🎉 发送目标 {self.name} 已恢复，关闭熔断。")
+            self._results.append(True)
+
+    def record_failure(self) -> None:
+        """
+        记录一次失败调用，半开状态下或失败率达到阈值时打开熔断。
+        """
+        with self._lock:
+            self._results.append(False)
+            calls = len(self._results)
+            failures = calls - sum(self._results)
+            if self._state == HALF_OPEN or (
+                    self._state == CLOSED and calls >= self.min_calls and failures / calls >= self.failure_rate):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                default_logger.warning(
+                    f"⚠️ 发送目标 {self.name} 最近 {calls} 次调用失败 {failures} 次，熔断 {self.cooldown:g} 秒。")
+
+    def _record_result(self, result: Any) -> None:
+        # 钉钉把不可重试的错误码作为响应返回，目标已失效时同样计为失败
+        if isinstance(result, dict) and result.get("errcode") in DESTINATION_INVALID_ERRCODES:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def _record_error(self, error: BaseException) -> None:
+        if is_outage(error):
+            self.record_failure()
+            return
+        with self._lock:
+            # 其他错误（包括任务取消）不计入结果，但要归还半开状态的试探名额
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        通过熔断器调用同步函数。
+
+        :param func: 要调用的函数。
+        :param args: 位置参数。
+        :param kwargs: 关键字参数。
+        :return: 函数的返回值。
+        """
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self._record_error(e)
+            raise
+        self._record_result(result)
+        return result
+
+    async def call_async(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """
+        通过熔断器调用异步函数。
+
+        :param func: 要调用的异步函数。
+        :param args: 位置参数。
+        :param kwargs: 关键字参数。
+        :return: 函数的返回值。
+        """
+        self.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            self._record_error(e)
+            raise
+        self._record_result(result)
+        return result
+
+    def reset(self) -> None:
+        """
+        清空记录并恢复为关闭状态。
+        """
+        with self._lock:
+            self._results.clear()
+            self._state = CLOSED
+            self._trials = 0
+
+
+class CircuitBreakerRegistry:
+    """
+    按发送目标创建和保存熔断器，同一目标的所有发送器共用一个熔断器。
+    """
+
+    def __init__(self, **defaults: Any):
+        """
+        初始化熔断器注册表。
+
+        :param defaults: 新建熔断器的默认参数，见 `CircuitBreaker`。
+        """
+        self._defaults = defaults
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.enabled = True
+
+    def get(self, name: str) -> CircuitBreaker:
+        """
+        获取发送目标的熔断器，不存在时创建。
+
+        :param name: 发送目标的名称。
+        :return: 熔断器。
+        """
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(name, **self._defaults)
+        return breaker
+
+    def configure(self, enabled: bool = True, **params: Any) -> None:
+        """
+        修改所有熔断器（包括已创建的）的参数。
+
+        :param enabled: 是否启用熔断。
+        :param params: 熔断参数，见 `CircuitBreaker`。
+        """
+        with self._lock:
+            self._defaults = params
+            breakers = list(self._breakers.values())
+            self.enabled = enabled
+        for breaker in breakers:
+            breaker.configure(**params)
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取所有熔断器的状态快照。
+
+        :return: 发送目标名称 -> 状态快照。
+        """
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+    def reset(self) -> None:
+        """
+        将所有熔断器恢复为关闭状态。
+        """
+        with self._lock:
+            breakers = list(self._breakers.values())
+        for breaker in breakers:
+            breaker.reset()
+
+
+# 所有发送器默认共用的熔断器注册表
+circuit_breakers = CircuitBreakerRegistry()
+
+
+def guarded(breaker: Optional[CircuitBreaker], func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    在熔断启用时通过熔断器调用同步函数，否则直接调用。
+
+    :param breaker: 发送目标的熔断器。
+    :param func: 要调用的函数。
+    :return: 函数的返回值。
+    """
+    if breaker is None or not circuit_breakers.enabled:
+        return func(*args, **kwargs)
+    return breaker.call(func, *args, **kwargs)
+
+
+async def guarded_async(breaker: Optional[CircuitBreaker], func: Callable[..., Awaitable[T]],
+                        *args: Any, **kwargs: Any) -> T:
+    """
+    在熔断启用时通过熔断器调用异步函数，否则直接调用。
+
+    :param breaker: 发送目标的熔断器。
+    :param func: 要调用的异步函数。
+    :return: 函数的返回值。
+    """
+    if breaker is None or not circuit_breakers.enabled:
+        return await func(*args, **kwargs)
+    return await breaker.call_async(func, *args, **kwargs)
+
+
+def configure_circuit_breaker(window_size: int = DEFAULT_WINDOW_SIZE, min_calls: int = DEFAULT_MIN_CALLS,
+                              failure_rate: float = DEFAULT_FAILURE_RATE, cooldown: float = DEFAULT_COOLDOWN,
+                              half_open_calls: int = DEFAULT_HALF_OPEN_CALLS, enabled: bool = True) -> None:
+    """
+    配置所有发送目标的熔断参数。
+
+    :param window_size: 统计失败率的最近调用次数，默认 20。
+    :param min_calls: 最近调用次数达到该值后才会熔断，默认 5。
+    :param failure_rate: 熔断的失败率阈值，默认 0.5。
+    :param cooldown: 熔断后的冷却时间（秒），默认 30。
+    :param half_open_calls: 半开状态下允许同时进行的试探调用数，默认 1。
+    :param enabled: 是否启用熔断。
+    """
+    circuit_breakers.configure(enabled=enabled, window_size=window_size, min_calls=min_calls,
+                               failure_rate=failure_rate, cooldown=cooldown, half_open_calls=half_open_calls)
+
+
+def get_circuit_states() -> Dict[str, Dict[str, Any]]:
+    """
+    获取所有发送目标的熔断状态，用于监控。
+
+    :return: 发送目标名称 -> 状态快照（`state`, `calls`, `failures`, `failure_rate`, `retry_after`）。
+    """
+    return circuit_breakers.states()
+
+
+def reset_circuit_breakers() -> None:
+    """
+    将所有发送目标的熔断器恢复为关闭状态。
+    """
+    circuit_breakers.reset()
@@ -0,0 +1,413 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T19:30:00.000Z
+# 文件描述：消息去重，在时间窗口内跳过发往同一目标的相同内容，并可定期发送重复次数汇总。
+# 文件路径：xqcsendmessage/core/dedup.py
+
+import asyncio
+import atexit
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .chunker import content_field
+from .exceptions import ValidationError
+from .logger import default_logger
+from .utils import redact_url
+
+# 默认去重窗口（秒）和最多记录的消息数
+DEFAULT_DEDUP_TTL = 60.0
+DEFAULT_DEDUP_MAXSIZE = 10000
+# 汇总消息中原消息预览的最大字符数
+_PREVIEW_CHARS = 200
+
+# 接收汇总文本并发送的函数，可以返回协程
+Notify = Callable[[str], Any]
+
+
+def _normalize(value: Any) -> Any:
+    """
+    规范化消息体：去掉字符串首尾空白，字典按键排序（由 json.dumps 完成）。
+    """
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def message_digest(destination: str, message: Any) -> str:
+    """
+    计算目标和规范化后消息的 SHA-256 摘要。
+
+    :param destination: 发送目标，如 Webhook 地址。
+    :param message: 消息体或消息文本。
+    :return: 十六进制摘要。
+    """
+    data = json.dumps([destination, _normalize(message)], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _preview(message: Any) -> str:
+    """
+    返回消息正文的预览，用于汇总消息。
+    """
+    if isinstance(message, dict):
+        field = content_field(message)
+        text = message[message["msgtype"]][field] if field else json.dumps(message, ensure_ascii=False)
+    else:
+        text = str(message)
+    text = text.strip()
+    return text if len(text) <= _PREVIEW_CHARS else text[:_PREVIEW_CHARS] + "…"
+
+
+class _Entry:
+    """
+    窗口内已发送或正在发送的一条消息。
+    """
+    __slots__ = ("expires_at", "first_sent", "suppressed", "reported", "notify", "loop", "preview", "owner",
+                 "outcome")
+
+    def __init__(self, expires_at: float, notify: Optional[Notify], loop: Optional[asyncio.AbstractEventLoop],
+                 preview: str, owner: Optional[asyncio.AbstractEventLoop]):
+        self.expires_at = expires_at
+        self.first_sent = time.time()
+        self.suppressed = 0
+        self.reported = 0
+        self.notify = notify
+        self.loop = loop
+        self.preview = preview
+        # 发送该消息的调用方所在的事件循环，同步调用时为 None
+        self.owner = owner
+        # 发送完成后设置为是否送达，发送期间到达的相同消息等待该结果
+        self.outcome: "Future[bool]" = Future()
+
+
+class Deduplicator:
+    """
+    按 (目标, 消息内容) 去重。
+
+    消息第一次发送时记录其摘要，`ttl` 秒内再次发往同一目标的相同消息会被跳过；窗口从第一次发送开始计算，
+    因此持续重复的消息每个窗口最多发送一次。记录数超过 `maxsize` 时淘汰最早的记录。
+    设置 `summary_interval` 后，后台线程定期向目标发送一条“已忽略 N 条重复消息”的汇总。
+    """
+
+    def __init__(self, ttl: float = DEFAULT_DEDUP_TTL, maxsize: int = DEFAULT_DEDUP_MAXSIZE,
+                 summary_interval: Optional[float] = None):
+        """
+        初始化去重器。
+
+        :param ttl: 去重窗口（秒）。
+        :param maxsize: 最多记录的消息数。
+        :param summary_interval: 发送重复次数汇总的间隔（秒），默认不发送。
+        """
+        if ttl <= 0 or maxsize < 1 or (summary_interval is not None and summary_interval <= 0):
+            raise ValidationError("❌ ttl、maxsize 和 summary_interval 必须大于 0。")
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.summary_interval = summary_interval
+        self.logger = default_logger
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # 已淘汰但还有未汇总重复次数的记录
+        self._evicted: List[_Entry] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        if summary_interval is not None:
+            self._worker = threading.Thread(target=self._run, name="xqc-dedup", daemon=True)
+            self._worker.start()
+
+    def _evict_locked(self, now: float) -> None:
+        """
+        淘汰过期和超出容量的记录，调用方需持有锁。记录按第一次发送的顺序排列，过期时间也按此顺序递增。
+        """
+        entries = self._entries
+        while entries:
+            entry = next(iter(entries.values()))
+            if entry.expires_at > now and len(entries) <= self.maxsize:
+                break
+            entries.popitem(last=False)
+            if self.summary_interval is not None and entry.suppressed > entry.reported:
+                self._evicted.append(entry)
+
+    def check(self, destination: str, message: Any, notify: Optional[Notify] = None) -> Optional[Dict[str, Any]]:
+        """
+        检查消息是否在窗口内发送过。未发送过时记录该消息并返回 None，调用方应继续发送。
+        相同消息正在通过发送器发送时，等待其结果：送达则视为重复，失败则记录该消息并返回 None。
+
+        :param destination: 发送目标，如 Webhook 地址。
+        :param message: 规范化前的消息体或消息文本。
+        :param notify: 发送汇总文本的函数，可以返回协程（在调用 `check` 时所在的事件循环中执行）。
+        :return: 重复时返回 `{"status": "duplicate", "suppressed": n, "retry_after": 窗口剩余秒数}`，否则返回 None。
+        """
+        key = message_digest(destination, message)
+        entry, duplicate = self._claim(key, destination, message, notify)
+        if entry is not None:
+            self._settle(key, entry, True)
+        return duplicate
+
+    def _check(self, key: str, destination: str, message: Any, notify: Optional[Notify]
+               ) -> Tuple[Optional[_Entry], Optional[Dict[str, Any]], Optional[_Entry]]:
+        """
+        检查并记录消息摘要。
+
+        :return: (新记录的条目, None, None)；重复时的 (None, 跳过结果, None)；
+                 相同消息正在发送时的 (None, None, 正在发送的条目)，调用方应等待其结果后重新检查。
+        """
+        now = time.monotonic()
+        running = _running_loop()
+        with self._lock:
+            self._evict_locked(now)
+            entry = self._entries.get(key)
+            if entry is not None and not entry.outcome.done():
+                return None, None, entry
+            if entry is not None:
+                entry.suppressed += 1
+                suppressed = entry.suppressed
+                remaining = entry.expires_at - now
+            else:
+                loop = running if notify is not None and self.summary_interval is not None else None
+                entry = self._entries[key] = _Entry(now + self.ttl, notify, loop, _preview(message), running)
+                self._evict_locked(now)
+                return entry, None, None
+        self.logger.info(f"⚠️ 跳过重复消息（窗口内第 {suppressed} 次）: {redact_url(destination)}")
+        return None, {"status": "duplicate", "suppressed": suppressed, "retry_after": remaining}, None
+
+    def _claim(self, key: str, destination: str, message: Any,
+               notify: Optional[Notify]) -> Tuple[Optional[_Entry], Optional[Dict[str, Any]]]:
+        """
+        同步调用方检查消息，相同消息正在发送时阻塞等待其结果。
+
+        :return: (新记录的条目, None)，调用方负责发送；或重复时的 (None, 跳过结果)。
+        """
+        while True:
+            entry, duplicate, pending = self._check(key, destination, message, notify)
+            if pending is None:
+                return entry, duplicate
+            if pending.owner is not None and pending.owner is _running_loop():
+                # 在发送方所在的事件循环线程中阻塞等待会造成死锁，只能按重复处理
+                return self._duplicate_in_flight(key, destination, pending)
+            pending.outcome.result()
+
+    async def _claim_async(self, key: str, destination: str, message: Any,
+                           notify: Optional[Notify]) -> Tuple[Optional[_Entry], Optional[Dict[str, Any]]]:
+        """
+        异步调用方检查消息，相同消息正在发送时等待其结果，不阻塞事件循环。
+
+        :return: (新记录的条目, None)，调用方负责发送；或重复时的 (None, 跳过结果)。
+        """
+        while True:
+            entry, duplicate, pending = self._check(key, destination, message, notify)
+            if pending is None:
+                return entry, duplicate
+            # shield 防止等待方被取消时连带取消发送方的结果
+            await asyncio.shield(asyncio.wrap_future(pending.outcome))
+
+    def _duplicate_in_flight(self, key: str, destination: str,
+                             pending: _Entry) -> Tuple[Optional[_Entry], Optional[Dict[str, Any]]]:
+        """
+        把无法等待结果的相同消息计为重复。
+        """
+        with self._lock:
+            pending.suppressed += 1
+            suppressed = pending.suppressed
+            remaining = pending.expires_at - time.monotonic()
+        self.logger.info(f"⚠️ 跳过正在发送的重复消息（窗口内第 {suppressed} 次）: {redact_url(destination)}")
+        return None, {"status": "duplicate", "suppressed": suppressed, "retry_after": remaining}
+
+    def _settle(self, key: str, entry: _Entry, delivered: bool) -> None:
+        """
+        记录发送结果并唤醒等待的相同消息。发送失败时撤销记录，之后重试同一消息时不会被当作重复跳过。
+        """
+        if not delivered:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                    if self.summary_interval is not None and entry.suppressed > entry.reported:
+                        self._evicted.append(entry)
+        entry.outcome.set_result(delivered)
+
+    def _collect(self) -> List[Tuple[_Entry, int]]:
+        """
+        取出有新的重复次数需要汇总的记录及新增的重复次数。
+        """
+        with self._lock:
+            self._evict_locked(time.monotonic())
+            entries = [e for e in self._entries.values() if e.suppressed > e.reported] + self._evicted
+            self._evicted = []
+            pending = []
+            for entry in entries:
+                pending.append((entry, entry.suppressed - entry.reported))
+                entry.reported = entry.suppressed
+        return pending
+
+    def _send_summary(self, entry: _Entry, count: int) -> None:
+        if entry.notify is None:
+            return
+        elapsed = int(time.time() - entry.first_sent)
+        text = f"【重复消息汇总】以下消息在过去 {elapsed} 秒内又出现了 {count} 次，已忽略：\n{entry.preview}"
+        try:
+            result = entry.notify(text)
+            if asyncio.iscoroutine(result):
+                if entry.loop is None or entry.loop.is_closed():
+                    result.close()
+                    self.logger.warning("⚠️ 事件循环已关闭，无法发送重复消息汇总。")
+                    return
+                # 不等待结果，避免在事件循环所在线程中调用时阻塞事件循环
+                asyncio.run_coroutine_threadsafe(result, entry.loop).add_done_callback(self._log_failure)
+        except Exception as e:
+            self.logger.error(f"🔥 发送重复消息汇总失败: {e}")
+
+    def _log_failure(self, future: "Future[Any]") -> None:
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.error(f"🔥 发送重复消息汇总失败: {future.exception()}")
+
+    def flush_summaries(self) -> None:
+        """
+        立即发送所有待发送的重复次数汇总。
+        """
+        for entry, count in self._collect():
+            self._send_summary(entry, count)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.summary_interval):
+            self.flush_summaries()
+
+    def clear(self) -> None:
+        """
+        清空所有记录。
+        """
+        with self._lock:
+            self._entries.clear()
+            self._evicted = []
+
+    def close(self) -> None:
+        """
+        停止后台线程并发送待发送的汇总。
+        """
+        self._stopped.set()
+        worker = self._worker
+        if worker is not None and worker.is_alive() and worker is not threading.current_thread():
+            worker.join()
+        if self.summary_interval is not None:
+            self.flush_summaries()
+
+
+# 所有发送器使用的去重器，默认不启用
+_deduplicator: Optional[Deduplicator] = None
+_deduplicator_lock = threading.Lock()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_deduplicator() -> Optional[Deduplicator]:
+    """
+    返回当前启用的去重器。
+
+    :return: 去重器，未启用时返回 None。
+    """
+    return _deduplicator
+
+
+@contextmanager
+def suppress_duplicate(destination: str, message: Any,
+                       notify: Optional[Notify] = None) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    供发送器调用：去重启用时检查消息是否重复，在 `with` 块中完成发送。
+
+    块内抛出异常（发送失败）时撤销该消息的记录，重试同一消息不会被当作重复跳过。
+    相同消息正在发送时阻塞等待其结果：送达则视为重复，失败则由本次调用重新发送。
+
+    :param destination: 发送目标。
+    :param message: 消息体或消息文本，进入 `with` 块时计算摘要，块内修改消息不影响撤销。
+    :param notify: 发送汇总文本的函数。
+    :return: 重复时产出跳过结果，否则产出 None，调用方应继续发送。
+    """
+    deduplicator = _deduplicator
+    if deduplicator is None:
+        yield None
+        return
+    key = message_digest(destination, message)
+    entry, duplicate = deduplicator._claim(key, destination, message, notify)
+    if entry is None:
+        yield duplicate
+        return
+    try:
+        yield None
+    except BaseException:
+        deduplicator._settle(key, entry, False)
+        raise
+    deduplicator._settle(key, entry, True)
+
+
+@asynccontextmanager
+async def asuppress_duplicate(destination: str, message: Any,
+                              notify: Optional[Notify] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    `suppress_duplicate` 的异步版本，供异步发送器调用，等待正在发送的相同消息时不阻塞事件循环。
+
+    :param destination: 发送目标。
+    :param message: 消息体或消息文本。
+    :param notify: 发送汇总文本的函数。
+    :return: 重复时产出跳过结果，否则产出 None，调用方应继续发送。
+    """
+    deduplicator = _deduplicator
+    if deduplicator is None:
+        yield None
+        return
+    key = message_digest(destination, message)
+    entry, duplicate = await deduplicator._claim_async(key, destination, message, notify)
+    if entry is None:
+        yield duplicate
+        return
+    try:
+        yield None
+    except BaseException:
+        deduplicator._settle(key, entry, False)
+        raise
+    deduplicator._settle(key, entry, True)
+
+
+def enable_dedup(ttl: float = DEFAULT_DEDUP_TTL, maxsize: int = DEFAULT_DEDUP_MAXSIZE,
+                 summary_interval: Optional[float] = None) -> Deduplicator:
+    """
+    为所有发送器启用消息去重。已启用时替换旧的去重器。
+
+    :param ttl: 去重窗口（秒），默认 60。
+    :param maxsize: 最多记录的消息数，默认 10000。
+    :param summary_interval: 发送重复次数汇总的间隔（秒），默认不发送。
+    :return: 新的去重器。
+    """
+    global _deduplicator
+    deduplicator = Deduplicator(ttl, maxsize, summary_interval)
+    with _deduplicator_lock:
+        previous, _deduplicator = _deduplicator, deduplicator
+    if previous is not None:
+        previous.close()
+    return deduplicator
+
+
+def disable_dedup() -> None:
+    """
+    关闭消息去重，并发送待发送的汇总。
+    """
+    global _deduplicator
+    with _deduplicator_lock:
+        previous, _deduplicator = _deduplicator, None
+    if previous is not None:
+        previous.close()
+
+
+atexit.register(disable_dedup)
@@ -12,20 +12,27 @@ class SendMessageError(Exception):
 class HttpError(SendMessageError):
     """当 HTTP 请求失败时引发的异常。"""
 
-    def __init__(self, message: str, status_code: int = None):
+    def __init__(self, message: str, status_code: int = None, errcode: int = None, retry_after: float = None):
         """
         初始化 HttpError 异常。
 
         :param message: 错误信息。
         :param status_code: HTTP 状态码。
+        :param errcode: 钉钉或企业微信接口返回的错误码。
+        :param retry_after: 服务端建议在多少秒后重试（`Retry-After` 响应头）。
         """
         super().__init__(message)
         self.status_code = status_code
+        self.errcode = errcode
+        self.retry_after = retry_after
 
     def __str__(self) -> str:
+        message = super().__str__()
+        if self.errcode is not None:
+            message = f"{message} (errcode: {self.errcode})"
         if self.status_code:
-            return f"HTTP Error {self.status_code}: {super().__str__()}"
-        return super().__str__()
+            return f"HTTP Error {self.status_code}: {message}"
+        return message
 
 
 class AuthError(SendMessageError):
@@ -36,3 +43,36 @@ class AuthError(SendMessageError):
 class ValidationError(SendMessageError):
     """当输入数据验证失败时引发的异常。"""
     pass
+
+
+class RateLimitError(SendMessageError):
+    """当发送频率超过限制且不允许等待时引发的异常。"""
+
+    def __init__(self, message: str, retry_after: float = None):
+        """
+        初始化 RateLimitError 异常。
+
+        :param message: 错误信息。
+        :param retry_after: 建议在多少秒后重试。
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(SendMessageError):
+    """当发送目标已熔断、暂停发送时引发的异常。"""
+
+    def __init__(self, message: str, retry_after: float = None):
+        """
+        初始化 CircuitOpenError 异常。
+
+        :param message: 错误信息。
+        :param retry_after: 距离熔断器进入半开状态的秒数。
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(SendMessageError):
+    """当后台发送队列已满且不允许等待时引发的异常。"""
+    pass
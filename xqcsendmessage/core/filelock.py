@@ -0,0 +1,78 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T10:30:00.000Z
+# 文件描述：跨进程文件锁，用于同一主机上多个进程之间协调共享资源。
+# 文件路径：xqcsendmessage/core/filelock.py
+
+import os
+import threading
+from types import TracebackType
+from typing import Optional, Type
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    基于锁文件的跨进程互斥锁，同时保证同一进程内的线程互斥。
+
+    POSIX 系统使用 `fcntl.flock`，Windows 使用 `msvcrt.locking`。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化文件锁。
+
+        :param path: 锁文件路径，不存在时自动创建。
+        """
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> None:
+        """
+        获取锁，阻塞直到成功。
+        """
+        self._thread_lock.acquire()
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            except BaseException:
+                os.close(fd)
+                raise
+            self._fd = fd
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self) -> None:
+        """
+        释放锁。
+        """
+        fd, self._fd = self._fd, None
+        try:
+            if fd is not None:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+                os.close(fd)
+        finally:
+            self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc: Optional[BaseException],
+                 tb: Optional[TracebackType]) -> None:
+        self.release()
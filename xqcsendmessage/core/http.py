@@ -0,0 +1,199 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T08:00:00.000Z
+# 文件描述：进程级共享的 HTTP 连接池，供所有 Webhook 和应用发送器复用。
+# 文件路径：xqcsendmessage/core/http.py
+
+import asyncio
+import atexit
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from .logger import default_logger
+
+# 默认超时：连接 5 秒，其余阶段 10 秒
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+# 默认连接池限制：保持长连接，避免每条消息都重新进行 DNS/TCP/TLS 握手
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0)
+
+_config: Dict[str, Any] = {
+    "timeout": DEFAULT_TIMEOUT,
+    "limits": DEFAULT_LIMITS,
+    "http2": False,
+}
+_lock = threading.Lock()
+_sync_client: Optional[httpx.Client] = None
+# 异步客户端绑定在事件循环上，按事件循环分别维护：{id(loop): (loop, client)}
+_async_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+# 修改配置后被替换、但所在事件循环当前未运行的异步客户端，留到 `close_http_clients()` 时关闭
+_retired_clients: List[Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = []
+# 正在当前事件循环上关闭的客户端任务，保留引用避免任务被垃圾回收
+_closing_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def _http2_enabled() -> bool:
+    """
+    判断是否可以启用 HTTP/2。HTTP/2 依赖可选的 `h2` 包，缺失时回退到 HTTP/1.1。
+
+    :return: 是否启用 HTTP/2。
+    """
+    if not _config["http2"]:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        default_logger.warning("⚠️ 未安装 h2，HTTP/2 不可用，已回退到 HTTP/1.1。可通过 `pip install httpx[http2]` 安装。")
+        _config["http2"] = False
+        return False
+    return True
+
+
+def _retire_async_client(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+    """
+    在客户端所属的事件循环上关闭被替换的异步客户端。事件循环正在运行时提交关闭任务；
+    未运行时留到 `close_http_clients()` 再关闭；已关闭的事件循环无法再执行清理，直接丢弃。
+
+    :param loop: 客户端所属的事件循环。
+    :param client: 要关闭的异步客户端。
+    """
+    if loop.is_closed() or client.is_closed:
+        return
+    if not loop.is_running():
+        _retired_clients.append((loop, client))
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    try:
+        if running is loop:
+            task = loop.create_task(client.aclose())
+            _closing_tasks.add(task)
+            task.add_done_callback(_closing_tasks.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    except RuntimeError:
+        # 事件循环恰好在此时关闭
+        default_logger.warning("⚠️ 异步 HTTP 客户端所属的事件循环已关闭，无法关闭该客户端。")
+
+
+def configure_http(
+    timeout: Optional[httpx.Timeout | float] = None,
+    limits: Optional[httpx.Limits] = None,
+    http2: Optional[bool] = None,
+) -> None:
+    """
+    配置共享 HTTP 连接池。已创建的客户端会被关闭，下次使用时按新配置重建。
+
+    异步客户端在各自的事件循环上关闭：事件循环正在运行时提交关闭任务，未运行时留到
+    `close_http_clients()` 再关闭。
+
+    :param timeout: 请求超时，可以是秒数或 `httpx.Timeout`。
+    :param limits: 连接池限制，`httpx.Limits` 实例。
+    :param http2: 是否启用 HTTP/2（需要安装 `h2`）。
+    """
+    global _sync_client
+    with _lock:
+        if timeout is not None:
+            _config["timeout"] = timeout if isinstance(
+                timeout, httpx.Timeout) else httpx.Timeout(timeout)
+        if limits is not None:
+            _config["limits"] = limits
+        if http2 is not None:
+            _config["http2"] = http2
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+        for loop, client in _async_clients.values():
+            _retire_async_client(loop, client)
+        _async_clients.clear()
+
+
+def get_http_client() -> httpx.Client:
+    """
+    获取进程级共享的同步 HTTP 客户端，首次调用时创建。
+
+    :return: 共享的 `httpx.Client` 实例。
+    """
+    global _sync_client
+    client = _sync_client
+    if client is not None and not client.is_closed:
+        return client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(
+                timeout=_config["timeout"],
+                limits=_config["limits"],
+                http2=_http2_enabled(),
+            )
+        return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    获取当前事件循环共享的异步 HTTP 客户端，首次调用时创建。必须在事件循环中调用。
+
+    :return: 共享的 `httpx.AsyncClient` 实例。
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(id(loop))
+    if entry is not None and entry[0] is loop and not entry[1].is_closed:
+        return entry[1]
+    with _lock:
+        # 清理已关闭事件循环上遗留的客户端
+        for key, (old_loop, _) in list(_async_clients.items()):
+            if old_loop.is_closed():
+                del _async_clients[key]
+        client = httpx.AsyncClient(
+            timeout=_config["timeout"],
+            limits=_config["limits"],
+            http2=_http2_enabled(),
+        )
+        _async_clients[id(loop)] = (loop, client)
+        return client
+
+
+def close_http_clients() -> None:
+    """
+    关闭共享的同步 HTTP 客户端，以及修改配置时被替换、尚未关闭的异步客户端，释放所有保持的连接。
+    进程退出时会自动调用。
+    """
+    global _sync_client
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+        retired = list(_retired_clients)
+        _retired_clients.clear()
+    for loop, client in retired:
+        if loop.is_closed() or client.is_closed:
+            continue
+        if loop.is_running():
+            _retire_async_client(loop, client)
+            continue
+        try:
+            loop.run_until_complete(client.aclose())
+        except RuntimeError:
+            # 当前线程正在运行另一个事件循环
+            default_logger.warning("⚠️ 当前线程正在运行其他事件循环，无法关闭被替换的异步 HTTP 客户端。")
+
+
+async def aclose_http_clients() -> None:
+    """
+    关闭当前事件循环上共享的异步 HTTP 客户端，以及修改配置时被替换的异步客户端，释放所有保持的连接。
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _async_clients.pop(id(loop), None)
+        retired = [client for owner, client in _retired_clients if owner is loop]
+        _retired_clients[:] = [item for item in _retired_clients if item[0] is not loop]
+    if entry is not None and entry[0] is loop:
+        retired.append(entry[1])
+    for client in retired:
+        await client.aclose()
+
+
+atexit.register(close_http_clients)
@@ -0,0 +1,58 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T17:00:00.000Z
+# 文件描述：缓存序列化结果的消息体，同一消息发送给多个目标时只序列化一次。
+# 文件路径：xqcsendmessage/core/payload.py
+
+import json
+from typing import Any, Dict, Optional
+
+
+class JSONPayload(dict):
+    """
+    缓存 JSON 序列化结果的消息体字典。修改顶层键后缓存自动失效，嵌套的字典应视为只读。
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._body: Optional[bytes] = None
+
+    def body(self) -> bytes:
+        """
+        获取 UTF-8 编码的 JSON 请求体。
+
+        :return: 请求体字节串。
+        """
+        if self._body is None:
+            self._body = json.dumps(self, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self._body
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._body = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self._body = None
+        super().__delitem__(key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        # 发送器总会合并额外参数，合并空字典时保留缓存
+        if kwargs or any(args):
+            self._body = None
+        super().update(*args, **kwargs)
+
+    def pop(self, *args: Any) -> Any:
+        self._body = None
+        return super().pop(*args)
+
+
+def request_body(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    返回传给 `httpx` 请求方法的请求体参数。`JSONPayload` 使用缓存的序列化结果。
+
+    :param message: 消息体。
+    :return: `{"content": ...}` 或 `{"json": ...}`。
+    """
+    if isinstance(message, JSONPayload):
+        return {"content": message.body()}
+    return {"json": message}
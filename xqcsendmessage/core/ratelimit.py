@@ -0,0 +1,354 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T14:30:00.000Z
+# 文件描述：按 Webhook 限流的令牌桶，超过频率时排队等待或立即失败，支持同一主机多进程共享的 SQLite 后端。
+# 文件路径：xqcsendmessage/core/ratelimit.py
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Tuple
+
+from .exceptions import RateLimitError, ValidationError
+from .logger import default_logger
+
+if TYPE_CHECKING:
+    import sqlite3
+
+# 钉钉和企业微信群机器人每分钟最多发送 20 条消息
+DEFAULT_RATE = 20
+DEFAULT_PERIOD = 60.0
+# 令牌不足时默认最长等待的秒数，需要等待更久时抛出 `RateLimitError`，避免告警风暴时发送方无限期阻塞
+DEFAULT_MAX_WAIT = 30.0
+# 桶的数量超过该值时清理已回满的桶
+_PRUNE_THRESHOLD = 1024
+
+
+class RateLimit(NamedTuple):
+    """
+    单个 Webhook 的限流参数：每 `period` 秒最多 `rate` 条，允许瞬时突发 `burst` 条。
+    """
+    rate: int
+    period: float
+    burst: int
+
+    @property
+    def per_second(self) -> float:
+        return self.rate / self.period
+
+
+def _make_limit(rate: int, period: float, burst: Optional[int]) -> RateLimit:
+    if rate <= 0 or period <= 0:
+        raise ValidationError("❌ 限流速率和周期必须大于 0。")
+    burst = rate if burst is None else burst
+    if burst < 1:
+        raise ValidationError("❌ 限流突发容量不能小于 1。")
+    return RateLimit(rate, period, burst)
+
+
+def _take(tokens: float, updated: float, now: float, limit: RateLimit,
+          max_wait: Optional[float]) -> Tuple[float, float]:
+    """
+    补充令牌后取出一个，返回 (剩余令牌数, 需要等待的秒数)。需要等待且超过 `max_wait` 时抛出 `RateLimitError`。
+    """
+    tokens = min(float(limit.burst), tokens + max(now - updated, 0.0) * limit.per_second)
+    wait = 0.0 if tokens >= 1 else (1 - tokens) / limit.per_second
+    if wait > 0 and max_wait is not None and wait > max_wait:
+        raise RateLimitError(f"❌ 发送频率超过限制（每 {limit.period:g} 秒 {limit.rate} 条），"
+                             f"请在 {wait:.1f} 秒后重试。", retry_after=wait)
+    return tokens - 1, wait
+
+
+class RateLimitBackend(ABC):
+    """
+    令牌桶状态的存储后端。
+    """
+
+    # 后端操作是否涉及磁盘 I/O，为 True 时异步限流会在工作线程中调用
+    blocking_io = False
+
+    @abstractmethod
+    def take(self, key: str, limit: RateLimit, max_wait: Optional[float]) -> float:
+        """
+        原子地从键对应的桶中取出一个令牌（令牌不足时预留）。
+
+        :param key: 限流键。
+        :param limit: 限流参数。
+        :param max_wait: 允许的最长等待秒数，为 None 时不限制，为 0 时不允许等待。
+        :return: 发送前需要等待的秒数。
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def reset(self, key: Optional[str] = None) -> None:
+        """
+        重置令牌桶。
+
+        :param key: 要重置的键，为 None 时重置全部。
+        """
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    进程内的令牌桶存储（默认）。
+    """
+
+    def __init__(self):
+        # 键 -> (当前令牌数, 更新时间, 限流参数)，令牌数为负表示已有等待中的预留
+        self._buckets: Dict[str, Tuple[float, float, RateLimit]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit, max_wait: Optional[float]) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated, _ = self._buckets.get(key, (float(limit.burst), now, limit))
+            tokens, wait = _take(tokens, updated, now, limit, max_wait)
+            self._buckets[key] = (tokens, now, limit)
+            if len(self._buckets) > _PRUNE_THRESHOLD:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now: float) -> None:
+        for key, (tokens, updated, limit) in list(self._buckets.items()):
+            if tokens + (now - updated) * limit.per_second >= limit.burst:
+                del self._buckets[key]
+
+    def reset(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    基于 SQLite 文件的令牌桶存储，同一主机上的多个进程共享同一个桶。
+
+    每次取令牌在一个 `BEGIN IMMEDIATE` 事务中完成，由 SQLite 的文件锁保证多进程间的原子性。
+    键只以 SHA-256 摘要落盘，Webhook 地址中的 access_token、key 等凭据不会明文写入文件。
+    """
+
+    blocking_io = True
+
+    def __init__(self, path: str):
+        """
+        初始化 SQLite 限流存储。
+
+        :param path: SQLite 数据库文件路径。
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        # 清理旧版本以明文 Webhook 地址为键写入的行，对应的桶会重新回满
+        conn.execute("DELETE FROM rate_limits WHERE length(key) != 64 OR key GLOB '*[^0-9a-f]*'")
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _connection(self) -> "sqlite3.Connection":
+        # 每个线程复用一个连接，fork 出的子进程重新建立连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            import sqlite3  # 只有使用 SQLite 后端时才导入
+
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key: str, limit: RateLimit, max_wait: Optional[float]) -> float:
+        key = self._digest(key)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 使用墙上时钟，各进程的时间基准一致
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (float(limit.burst), now)
+            tokens, wait = _take(tokens, updated, now, limit, max_wait)
+            conn.execute("INSERT OR REPLACE INTO rate_limits (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return wait
+
+    def reset(self, key: Optional[str] = None) -> None:
+        conn = self._connection()
+        if key is None:
+            conn.execute("DELETE FROM rate_limits")
+        else:
+            conn.execute("DELETE FROM rate_limits WHERE key = ?", (self._digest(key),))
+
+
+class RateLimiter:
+    """
+    按键（通常为 Webhook 地址）限流的令牌桶。
+
+    每个键一个桶，容量为 `burst`，按 `rate / period` 的速度补充令牌。令牌不足时，
+    `block=True` 会预留下一个令牌并等待（先到先得，突发消息被平滑发出，默认最多等待 30 秒），
+    `block=False` 或所需等待超过 `max_wait` 时立即抛出 `RateLimitError`。
+    使用 `SQLiteRateLimitBackend` 时，同一主机上的所有进程共享同一个桶。
+    """
+
+    def __init__(self, rate: int = DEFAULT_RATE, period: float = DEFAULT_PERIOD, burst: Optional[int] = None,
+                 block: bool = True, max_wait: Optional[float] = DEFAULT_MAX_WAIT,
+                 backend: Optional[RateLimitBackend] = None):
+        """
+        初始化限流器。
+
+        :param rate: 每个周期允许发送的消息数。
+        :param period: 周期（秒）。
+        :param burst: 允许的瞬时突发数，默认等于 `rate`。
+        :param block: 超过频率时是否等待，为 False 时立即抛出 `RateLimitError`。
+        :param max_wait: 最长等待时间（秒），需要等待更久时抛出 `RateLimitError`，默认 30，为 None 时不限制。
+        :param backend: 令牌桶存储后端，默认为进程内存储。
+        """
+        self.logger = default_logger
+        self.backend = backend or MemoryRateLimitBackend()
+        self.enabled = True
+        self.default_limit = _make_limit(rate, period, burst)
+        self.block = block
+        self.max_wait = max_wait
+        self._limits: Dict[str, RateLimit] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, rate: int = DEFAULT_RATE, period: float = DEFAULT_PERIOD, burst: Optional[int] = None,
+                  block: bool = True, max_wait: Optional[float] = DEFAULT_MAX_WAIT,
+                  enabled: bool = True) -> None:
+        """
+        修改默认限流参数，不影响通过 `set_limit` 单独设置的键。
+
+        :param rate: 每个周期允许发送的消息数。
+        :param period: 周期（秒）。
+        :param burst: 允许的瞬时突发数，默认等于 `rate`。
+        :param block: 超过频率时是否等待。
+        :param max_wait: 最长等待时间（秒），为 None 时不限制。
+        :param enabled: 是否启用限流。
+        """
+        limit = _make_limit(rate, period, burst)
+        with self._lock:
+            self.default_limit = limit
+            self.block = block
+            self.max_wait = max_wait
+            self.enabled = enabled
+
+    def set_limit(self, key: str, rate: int, period: float = DEFAULT_PERIOD, burst: Optional[int] = None) -> None:
+        """
+        为单个键设置限流参数。
+
+        :param key: 限流键，通常为 Webhook 地址。
+        :param rate: 每个周期允许发送的消息数。
+        :param period: 周期（秒）。
+        :param burst: 允许的瞬时突发数，默认等于 `rate`。
+        """
+        limit = _make_limit(rate, period, burst)
+        with self._lock:
+            self._limits[key] = limit
+
+    def _reserve(self, key: str) -> float:
+        """
+        取出一个令牌，返回发送前需要等待的秒数。
+        """
+        with self._lock:
+            limit = self._limits.get(key, self.default_limit)
+            max_wait = self.max_wait if self.block else 0.0
+        return self.backend.take(key, limit, max_wait)
+
+    def acquire(self, key: str) -> float:
+        """
+        获取发送许可，必要时阻塞等待。
+
+        :param key: 限流键，通常为 Webhook 地址。
+        :return: 实际等待的秒数。
+        """
+        if not self.enabled:
+            return 0.0
+        wait = self._reserve(key)
+        if wait > 0:
+            self.logger.warning(f"⚠️ 发送频率超过限制，等待 {wait:.1f} 秒后发送。")
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, key: str) -> float:
+        """
+        异步获取发送许可，必要时等待，不阻塞事件循环。
+
+        :param key: 限流键，通常为 Webhook 地址。
+        :return: 实际等待的秒数。
+        """
+        if not self.enabled:
+            return 0.0
+        if self.backend.blocking_io:
+            wait = await asyncio.to_thread(self._reserve, key)
+        else:
+            wait = self._reserve(key)
+        if wait > 0:
+            self.logger.warning(f"⚠️ 发送频率超过限制，等待 {wait:.1f} 秒后发送。")
+            await asyncio.sleep(wait)
+        return wait
+
+    def reset(self, key: Optional[str] = None) -> None:
+        """
+        重置令牌桶。
+
+        :param key: 要重置的键，为 None 时重置全部。
+        """
+        self.backend.reset(key)
+
+
+# 钉钉和企业微信 Webhook 发送器共享的限流器
+webhook_rate_limiter = RateLimiter()
+
+
+def configure_rate_limit(rate: int = DEFAULT_RATE, period: float = DEFAULT_PERIOD, burst: Optional[int] = None,
+                         block: bool = True, max_wait: Optional[float] = DEFAULT_MAX_WAIT,
+                         enabled: bool = True) -> None:
+    """
+    配置钉钉和企业微信 Webhook 的默认限流参数。
+
+    :param rate: 每个周期允许发送的消息数，默认 20。
+    :param period: 周期（秒），默认 60。
+    :param burst: 允许的瞬时突发数，默认等于 `rate`。
+    :param block: 超过频率时是否等待，为 False 时立即抛出 `RateLimitError`。
+    :param max_wait: 最长等待时间（秒），需要等待更久时抛出 `RateLimitError`，默认 30，为 None 时不限制。
+    :param enabled: 是否启用限流。
+    """
+    webhook_rate_limiter.configure(rate, period, burst, block, max_wait, enabled)
+
+
+def set_webhook_rate_limit(webhook: str, rate: int, period: float = DEFAULT_PERIOD,
+                           burst: Optional[int] = None) -> None:
+    """
+    为单个 Webhook 设置限流参数。
+
+    :param webhook: Webhook 地址。
+    :param rate: 每个周期允许发送的消息数。
+    :param period: 周期（秒）。
+    :param burst: 允许的瞬时突发数，默认等于 `rate`。
+    """
+    webhook_rate_limiter.set_limit(webhook, rate, period, burst)
+
+
+def set_rate_limit_backend(backend: RateLimitBackend) -> None:
+    """
+    设置钉钉和企业微信 Webhook 限流的存储后端。
+
+    :param backend: 存储后端，例如 `SQLiteRateLimitBackend("/tmp/xqc_rate_limits.db")`，
+        同一主机上使用相同文件的进程共享限流额度。
+    """
+    webhook_rate_limiter.backend = backend
@@ -0,0 +1,169 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T08:30:00.000Z
+# 文件描述：发送器实例缓存，让顶层 API 函数复用已预热的发送器。
+# 文件路径：xqcsendmessage/core/registry.py
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Set, Tuple, Type, TypeVar
+
+from .exceptions import ValidationError
+from .logger import default_logger
+
+T = TypeVar("T")
+
+DEFAULT_CACHE_SIZE = 128
+
+# 正在关闭的异步发送器任务，保留引用避免任务被垃圾回收
+_closing_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def _close_sender(sender: Any) -> None:
+    """
+    调用被移出缓存的发送器的关闭钩子（同步的 `close()` 或异步的 `aclose()`），释放后台刷新任务等资源。
+    关闭失败只记录日志，不影响获取发送器。
+
+    :param sender: 被移出缓存的发送器。
+    """
+    try:
+        close = getattr(sender, "close", None)
+        if callable(close):
+            close()
+            return
+        aclose = getattr(sender, "aclose", None)
+        if not callable(aclose):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(aclose())
+            return
+        task = loop.create_task(aclose())
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+    except Exception as e:
+        default_logger.warning(f"⚠️ 关闭被移出缓存的发送器 {type(sender).__name__} 失败: {e}")
+
+
+class SenderCache:
+    """
+    有界的 LRU 发送器缓存，按 (发送器类型, 凭据/Webhook) 作为键。
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        """
+        初始化发送器缓存。
+
+        :param maxsize: 最多缓存的发送器数量，为 0 时关闭缓存。
+        """
+        if maxsize < 0:
+            raise ValidationError("❌ 发送器缓存大小不能为负数。")
+        self.maxsize = maxsize
+        self._senders: "OrderedDict[Tuple[Hashable, ...], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(cls: Type[Any], kwargs: dict) -> Tuple[Hashable, ...]:
+        return (cls,) + tuple(sorted(kwargs.items()))
+
+    def get(self, cls: Type[T], **kwargs: Any) -> T:
+        """
+        获取缓存的发送器，不存在时创建并放入缓存，超过容量时淘汰并关闭最久未使用的发送器。
+
+        :param cls: 发送器类型。
+        :param kwargs: 发送器的构造参数，同时作为缓存键。
+        :return: 发送器实例。
+        """
+        if self.maxsize == 0:
+            return cls(**kwargs)
+
+        key = self._make_key(cls, kwargs)
+        with self._lock:
+            sender = self._senders.get(key)
+            if sender is not None:
+                self._senders.move_to_end(key)
+                return sender
+
+        sender = cls(**kwargs)
+        with self._lock:
+            # 并发创建时以先放入缓存的实例为准
+            existing = self._senders.get(key)
+            if existing is not None:
+                self._senders.move_to_end(key)
+                return existing
+            self._senders[key] = sender
+            evicted = self._evict(self.maxsize)
+        for old in evicted:
+            _close_sender(old)
+        return sender
+
+    def _evict(self, maxsize: int) -> List[Any]:
+        """
+        按 LRU 顺序移出超出容量的发送器，需要在持有锁时调用。
+
+        :param maxsize: 保留的发送器数量。
+        :return: 被移出的发送器，由调用方在释放锁后关闭。
+        """
+        evicted = []
+        while len(self._senders) > maxsize:
+            evicted.append(self._senders.popitem(last=False)[1])
+        return evicted
+
+    def resize(self, maxsize: int) -> None:
+        """
+        调整缓存容量，超出部分按 LRU 顺序淘汰并关闭。
+
+        :param maxsize: 新的缓存容量，为 0 时关闭缓存。
+        """
+        if maxsize < 0:
+            raise ValidationError("❌ 发送器缓存大小不能为负数。")
+        with self._lock:
+            self.maxsize = maxsize
+            evicted = self._evict(maxsize)
+        for sender in evicted:
+            _close_sender(sender)
+
+    def clear(self) -> None:
+        """
+        清空缓存，并关闭所有缓存的发送器。
+        """
+        with self._lock:
+            evicted = self._evict(0)
+        for sender in evicted:
+            _close_sender(sender)
+
+    def __len__(self) -> int:
+        return len(self._senders)
+
+
+# 顶层 API 共享的发送器缓存
+sender_cache = SenderCache()
+
+
+def get_sender(cls: Type[T], **kwargs: Any) -> T:
+    """
+    从共享缓存中获取发送器实例。
+
+    :param cls: 发送器类型。
+    :param kwargs: 发送器的构造参数。
+    :return: 发送器实例。
+    """
+    return sender_cache.get(cls, **kwargs)
+
+
+def clear_sender_cache() -> None:
+    """
+    清空顶层 API 使用的发送器缓存。
+    """
+    sender_cache.clear()
+
+
+def set_sender_cache_size(maxsize: int) -> None:
+    """
+    设置顶层 API 使用的发送器缓存容量。
+
+    :param maxsize: 缓存容量，为 0 时关闭缓存，每次调用都创建新的发送器。
+    """
+    sender_cache.resize(maxsize)
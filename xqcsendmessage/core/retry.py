@@ -0,0 +1,247 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T18:00:00.000Z
+# 文件描述：发送器共用的重试策略，对临时性的网络、HTTP、SMTP 错误和平台错误码进行指数退避重试。
+# 文件路径：xqcsendmessage/core/retry.py
+
+import asyncio
+import random
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar
+
+from .exceptions import HttpError, ValidationError
+from .logger import default_logger
+
+if TYPE_CHECKING:
+    import httpx
+
+T = TypeVar("T")
+
+# 默认最多尝试次数（含第一次发送）
+DEFAULT_MAX_ATTEMPTS = 3
+# 第一次重试前的基础等待时间（秒），之后按 `multiplier` 倍数增长
+DEFAULT_BASE_DELAY = 0.5
+# 单次等待的上限（秒）
+DEFAULT_MAX_DELAY = 30.0
+# 可重试的平台错误码：-1 系统繁忙；45009 接口调用超过限制；45033 接口并发调用超过限制；130101 钉钉发送太快
+DEFAULT_RETRY_ERRCODES = frozenset({-1, 45009, 45033, 130101})
+# 可重试的 HTTP 状态码
+DEFAULT_RETRY_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# 临时性的网络和 SMTP 连接错误：模块名 -> 错误类名
+_TRANSIENT_ERROR_NAMES = {
+    "httpx": ("TimeoutException", "NetworkError", "RemoteProtocolError"),
+    "smtplib": ("SMTPServerDisconnected", "SMTPConnectError"),
+    "aiosmtplib": ("SMTPServerDisconnected", "SMTPConnectError", "SMTPTimeoutError"),
+}
+# 带有 SMTP 响应码的错误
+_SMTP_RESPONSE_ERROR_NAMES = {
+    "smtplib": ("SMTPResponseException",),
+    "aiosmtplib": ("SMTPResponseException",),
+}
+
+
+def loaded_errors(names: Iterable[Tuple[str, Tuple[str, ...]]]) -> Tuple[type, ...]:
+    """
+    返回已导入模块中的错误类型。模块未导入时不可能抛出其中的错误，因此判断错误时无需导入 httpx、aiosmtplib。
+
+    :param names: (模块名, 错误类名元组) 列表。
+    :return: 已导入模块中的错误类型。
+    """
+    errors: List[type] = []
+    for module_name, class_names in names:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            errors.extend(getattr(module, name) for name in class_names)
+    return tuple(errors)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 HTTP `Retry-After` 响应头。
+
+    :param value: 响应头的值，秒数或 HTTP 日期。
+    :return: 需要等待的秒数，无法解析时返回 None。
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def http_error(message: str, response: "httpx.Response") -> HttpError:
+    """
+    根据失败的 HTTP 响应构建 `HttpError`，附带状态码和 `Retry-After`。
+
+    :param message: 错误信息。
+    :param response: HTTP 响应。
+    :return: HttpError 异常。
+    """
+    return HttpError(message, response.status_code,
+                     retry_after=parse_retry_after(response.headers.get("Retry-After")))
+
+
+class RetryPolicy:
+    """
+    重试策略。可重试的错误按指数退避加随机抖动（full jitter）等待后重试，
+    错误带有 `retry_after` 时至少等待该时长；尝试次数或总耗时达到上限后抛出最后一次的错误。
+    """
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY, multiplier: float = 2.0, jitter: bool = True,
+                 deadline: Optional[float] = None, retry_errcodes: Iterable[int] = DEFAULT_RETRY_ERRCODES,
+                 retry_status_codes: Iterable[int] = DEFAULT_RETRY_STATUS_CODES):
+        """
+        初始化重试策略。
+
+        :param max_attempts: 最多尝试次数（含第一次发送），为 1 时不重试。
+        :param base_delay: 第一次重试前的基础等待时间（秒）。
+        :param max_delay: 单次等待的上限（秒）。
+        :param multiplier: 每次重试等待时间的增长倍数。
+        :param jitter: 是否在 0 到退避时间之间随机取值，避免多个客户端同时重试。
+        :param deadline: 从第一次发送开始计算的总耗时上限（秒），默认不限制。
+        :param retry_errcodes: 可重试的平台错误码。
+        :param retry_status_codes: 可重试的 HTTP 状态码。
+        """
+        self.configure(max_attempts, base_delay, max_delay, multiplier, jitter, deadline,
+                       retry_errcodes, retry_status_codes)
+
+    def configure(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY,
+                  max_delay: float = DEFAULT_MAX_DELAY, multiplier: float = 2.0, jitter: bool = True,
+                  deadline: Optional[float] = None, retry_errcodes: Iterable[int] = DEFAULT_RETRY_ERRCODES,
+                  retry_status_codes: Iterable[int] = DEFAULT_RETRY_STATUS_CODES) -> None:
+        """
+        修改重试参数，参数含义同 `__init__`。
+        """
+        if max_attempts < 1 or base_delay < 0 or max_delay < 0 or multiplier < 1:
+            raise ValidationError("❌ max_attempts 必须大于 0，等待时间不能为负数，multiplier 不能小于 1。")
+        if deadline is not None and deadline <= 0:
+            raise ValidationError("❌ deadline 必须大于 0。")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_errcodes = frozenset(retry_errcodes)
+        self.retry_status_codes = frozenset(retry_status_codes)
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """
+        判断错误是否为临时性错误。
+
+        :param error: 发送时抛出的异常。
+        :return: 是否可以重试。
+        """
+        if isinstance(error, HttpError):
+            return error.errcode in self.retry_errcodes or error.status_code in self.retry_status_codes
+        if isinstance(error, loaded_errors(_SMTP_RESPONSE_ERROR_NAMES.items())):
+            # SMTP 4xx 为临时性错误，如 421 服务不可用、451 处理出错
+            code = getattr(error, "smtp_code", None) or getattr(error, "code", 0)
+            return 400 <= code < 500
+        return isinstance(error, (ConnectionError, TimeoutError) + loaded_errors(_TRANSIENT_ERROR_NAMES.items()))
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        计算第 `attempt` 次发送失败后的等待时间。
+
+        :param attempt: 已发送的次数，从 1 开始。
+        :param error: 本次发送的错误，带有 `retry_after` 时至少等待该时长。
+        :return: 等待的秒数。
+        """
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _next_delay(self, attempt: int, error: BaseException, started: float) -> Optional[float]:
+        """
+        返回重试前的等待时间，不应再重试时返回 None。
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(error):
+            return None
+        delay = self.backoff(attempt, error)
+        if self.deadline is not None and time.monotonic() + delay - started > self.deadline:
+            return None
+        default_logger.warning(f"⚠️ 第 {attempt}/{self.max_attempts} 次发送失败，{delay:.2f} 秒后重试: {error}")
+        return delay
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        按重试策略调用同步函数。
+
+        :param func: 要调用的函数。
+        :param args: 位置参数。
+        :param kwargs: 关键字参数。
+        :return: 函数的返回值。
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(attempt, e, started)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    async def call_async(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """
+        按重试策略调用异步函数。
+
+        :param func: 要调用的异步函数。
+        :param args: 位置参数。
+        :param kwargs: 关键字参数。
+        :return: 函数的返回值。
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(attempt, e, started)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+
+# 所有发送器默认共用的重试策略
+default_retry_policy = RetryPolicy()
+_configure_lock = threading.Lock()
+
+
+def configure_retry(max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY,
+                    max_delay: float = DEFAULT_MAX_DELAY, multiplier: float = 2.0, jitter: bool = True,
+                    deadline: Optional[float] = None, retry_errcodes: Iterable[int] = DEFAULT_RETRY_ERRCODES,
+                    retry_status_codes: Iterable[int] = DEFAULT_RETRY_STATUS_CODES) -> None:
+    """
+    配置所有发送器默认使用的重试策略。
+
+    :param max_attempts: 最多尝试次数（含第一次发送），默认 3，为 1 时不重试。
+    :param base_delay: 第一次重试前的基础等待时间（秒），默认 0.5。
+    :param max_delay: 单次等待的上限（秒），默认 30。
+    :param multiplier: 每次重试等待时间的增长倍数，默认 2。
+    :param jitter: 是否对等待时间加随机抖动。
+    :param deadline: 从第一次发送开始计算的总耗时上限（秒），默认不限制。
+    :param retry_errcodes: 可重试的平台错误码，默认 -1、45009、45033、130101。
+    :param retry_status_codes: 可重试的 HTTP 状态码，默认 408、425、429、500、502、503、504。
+    """
+    with _configure_lock:
+        default_retry_policy.configure(max_attempts, base_delay, max_delay, multiplier, jitter, deadline,
+                                       retry_errcodes, retry_status_codes)
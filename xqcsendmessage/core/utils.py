@@ -4,11 +4,32 @@
 # 文件描述：提供核心工具函数，如文件读取。
 # 文件路径：xqcsendmessage/core/utils.py
 
-import aiofiles
-from typing import Optional
+import uuid
+from typing import AsyncIterator, Dict, Optional, Tuple
 
 from .exceptions import SendMessageError
 
+def redact_url(url: str) -> str:
+    """
+    隐去 URL 中的查询参数（如 access_token、key）和用户信息，用于日志、熔断器名称等对外可见的位置。
+    附加完整 URL 的摘要，不同凭据的 Webhook 仍然可以区分。
+
+    :param url: Webhook 地址，不是 URL 的字符串原样返回。
+    :return: 形如 `https://oapi.dingtalk.com/robot/send#1a2b3c4d5e6f` 的名称。
+    """
+    import hashlib
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+    host = parts.hostname or ""
+    if parts.port:
+        host = f"{host}:{parts.port}"
+    return f"{parts.scheme}://{host}{parts.path}#{digest}"
+
+
 def read_file(file_path: str, encoding: str = "utf-8") -> str:
     """
     同步读取文件内容。
@@ -33,10 +54,76 @@ async def read_file_async(file_path: str, encoding: str = "utf-8") -> str:
     :param encoding: 文件编码，默认为 'utf-8'。
     :return: 文件内容字符串。
     """
+    import aiofiles  # 只在异步读取时导入
+
     try:
         async with aiofiles.open(file_path, "r", encoding=encoding) as f:
             return await f.read()
     except FileNotFoundError:
         raise SendMessageError(f"❌ 文件未找到: {file_path}")
     except Exception as e:
-        raise SendMessageError(f"❌ 读取文件时发生错误: {e}")
\ No newline at end of file
+        raise SendMessageError(f"❌ 读取文件时发生错误: {e}")
+
+# 异步分块读取文件时每块的字节数
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+async def iter_file_async(file_path: str, chunk_size: int = FILE_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    异步分块读取文件，读取操作不会阻塞事件循环。
+
+    :param file_path: 文件路径。
+    :param chunk_size: 每块的字节数。
+    :return: 文件内容分块的异步迭代器。
+    """
+    import aiofiles
+
+    async with aiofiles.open(file_path, "rb") as f:
+        while True:
+            chunk = await f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _quote_form_value(value: str) -> str:
+    # 与 httpx 一致，按 HTML5 规范转义表单参数中的特殊字符
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+async def multipart_file_stream(field_name: str, file_path: str, content_type: str,
+                                filename: Optional[str] = None) -> Tuple[Dict[str, str], AsyncIterator[bytes]]:
+    """
+    构建只包含一个文件字段的 multipart/form-data 请求体。文件内容在发送时异步分块读取，
+    不会整体载入内存，也不会阻塞事件循环。
+
+    :param field_name: 表单字段名。
+    :param file_path: 文件路径。
+    :param content_type: 文件的 Content-Type。
+    :param filename: 上传时使用的文件名，默认为 `file_path`。
+    :return: (请求头, 请求体的异步迭代器)，可直接传给 `httpx.AsyncClient.post(headers=..., content=...)`。
+    """
+    import aiofiles.os
+
+    size = (await aiofiles.os.stat(file_path)).st_size
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{_quote_form_value(field_name)}"; '
+        f'filename="{_quote_form_value(filename if filename is not None else file_path)}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("ascii")
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        # 给出准确的长度，避免使用分块传输编码
+        "Content-Length": str(len(head) + size + len(tail)),
+    }
+
+    async def body() -> AsyncIterator[bytes]:
+        yield head
+        async for chunk in iter_file_async(file_path):
+            yield chunk
+        yield tail
+
+    return headers, body()
@@ -4,16 +4,24 @@
 # 文件描述：钉钉消息发送器
 # 文件路径：xqcsendmessage/dingtalk/sender.py
 
-import hmac
-import hashlib
-import base64
-import time
 import httpx
 from typing import Any, Dict, Optional, Union
 
 from ..core.abc import Sender, AsyncSender
 from ..core.exceptions import HttpError
+from ..core.http import get_http_client, get_async_http_client
 from ..core.logger import default_logger
+from ..core.payload import request_body
+from ..core.chunker import split_payload, send_parts, send_parts_async
+from ..core.ratelimit import RateLimiter, webhook_rate_limiter
+from ..core.dedup import asuppress_duplicate, suppress_duplicate
+from ..core.circuit import CircuitBreaker, circuit_breakers, guarded, guarded_async
+from ..core.retry import RetryPolicy, default_retry_policy, http_error
+from ..core.utils import redact_url
+from .signing import SignedWebhook, DEFAULT_SIGNATURE_TTL
+
+# 钉钉机器人消息内容的最大字节数
+DINGTALK_BYTE_LIMITS = {"text": 20000, "markdown": 20000}
 
 
 class DingTalkSender(Sender):
@@ -21,38 +29,32 @@ class DingTalkSender(Sender):
     钉钉同步消息发送器。
     """
 
-    def __init__(self, webhook: str, secret: Optional[str] = None):
+    MESSAGE_BYTE_LIMITS = DINGTALK_BYTE_LIMITS
+
+    def __init__(self, webhook: str, secret: Optional[str] = None, client: Optional[httpx.Client] = None,
+                 rate_limiter: Optional[RateLimiter] = None, signature_ttl: float = DEFAULT_SIGNATURE_TTL,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         """
         初始化钉钉同步发送器。
 
         :param webhook: 钉钉机器人的 Webhook 地址。
         :param secret: 钉钉机器人的密钥，用于签名。
+        :param client: 自定义的 HTTP 客户端，默认使用进程级共享连接池。
+        :param rate_limiter: 自定义的限流器，默认使用按 Webhook 限流的共享限流器。
+        :param signature_ttl: 加签的复用时间（秒），钉钉接受一小时内的签名，默认复用 30 分钟，为 0 时每次重新签名。
+        :param retry_policy: 自定义的重试策略，默认使用共享的重试策略。
+        :param circuit_breaker: 自定义的熔断器，默认使用按发送目标共享的熔断器。
         """
         self.webhook = webhook
         self.secret = secret
         self.logger = default_logger
-
-    def _sign(self) -> Dict[str, str]:
-        """
-        生成钉钉 API 所需的签名。
-
-        :return: 包含签名和时间戳的字典。
-        """
-        if not self.secret:
-            return {}
-
-        timestamp = str(round(time.time() * 1000))
-        secret_enc = self.secret.encode("utf-8")
-        string_to_sign = f"{timestamp}\n{self.secret}"
-        string_to_sign_enc = string_to_sign.encode("utf-8")
-
-        hmac_code = hmac.new(
-            secret_enc, string_to_sign_enc, digestmod=hashlib.sha256
-        ).digest()
-
-        sign = base64.b64encode(hmac_code).decode("utf-8")
-
-        return {"timestamp": timestamp, "sign": sign}
+        self._client = client
+        self._rate_limiter = rate_limiter or webhook_rate_limiter
+        # Webhook 地址只解析一次，签名在复用时间内缓存
+        self._url = SignedWebhook(webhook, secret, signature_ttl)
+        self._retry_policy = retry_policy or default_retry_policy
+        self._breaker = circuit_breaker or circuit_breakers.get(redact_url(webhook))
 
     def send(self, message: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
         """
@@ -63,39 +65,49 @@ class DingTalkSender(Sender):
         :return: 钉钉 API 的响应。
         """
         message.update(kwargs)  # 合并额外的关键字参数
-        headers = {"Content-Type": "application/json"}
-
-        # 解析 webhook URL，获取基础 URL 和已有的查询参数
-        from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-
-        parsed_url = urlparse(self.webhook)
-        query_params = parse_qs(parsed_url.query)
-
-        # 将签名参数添加到查询参数中
-        signed_params = self._sign()
-        for k, v in signed_params.items():
-            query_params[k] = [v]  # parse_qs 返回列表，所以这里也用列表
+        with suppress_duplicate(self.webhook, message,
+                                lambda text: self.send({"msgtype": "text", "text": {"content": text}})) as duplicate:
+            if duplicate is not None:
+                return duplicate
+            parts = split_payload(message, self.MESSAGE_BYTE_LIMITS)
+            if len(parts) > 1:
+                return send_parts(self, parts)
+            return self._retry_policy.call(guarded, self._breaker, self._post, message)
+
+    def _post(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        发送一条钉钉消息，失败时不重试。
 
-        # 重新构建查询字符串
-        new_query_string = urlencode({k: v[0] if isinstance(
-            v, list) else v for k, v in query_params.items()})
+        :param message: 消息内容。
+        :return: 钉钉 API 的响应。
+        """
+        self._rate_limiter.acquire(self.webhook)
+        headers = {"Content-Type": "application/json"}
 
-        # 重新构建 URL
-        final_url = urlunparse(parsed_url._replace(query=new_query_string))
+        final_url = self._url.url()
 
         try:
-            with httpx.Client() as client:
-                response = client.post(
-                    final_url, headers=headers, json=message
-                )
-                response.raise_for_status()
-                result = response.json()
-                self.logger.info(f"🎉 钉钉消息发送成功: {result}")
+            client = self._client or get_http_client()
+            response = client.post(
+                final_url, headers=headers, **request_body(message)
+            )
+            response.raise_for_status()
+            result = response.json()
+            errcode = result.get("errcode", 0)
+            if errcode in self._retry_policy.retry_errcodes:
+                # 发送太快等临时性错误码交给重试策略处理，其余错误码与以前一样直接返回响应
+                raise HttpError(f"发送钉钉消息失败: {result.get('errmsg')}", errcode=errcode)
+            if errcode != 0:
+                self.logger.error(f"🔥 钉钉消息发送失败: {result}")
                 return result
+            self.logger.info(f"🎉 钉钉消息发送成功: {result}")
+            return result
+        except HttpError:
+            # 可重试的错误码由重试策略记录日志，不当作未知错误
+            raise
         except httpx.HTTPStatusError as e:
             self.logger.error(f"🔥 钉钉消息发送失败: {e.response.text}")
-            raise HttpError(
-                f"发送钉钉消息失败: {e.response.text}", e.response.status_code)
+            raise http_error(f"发送钉钉消息失败: {e.response.text}", e.response)
         except Exception as e:
             self.logger.error(f"🔥 发送钉钉消息时发生未知错误: {e}")
             raise
@@ -106,38 +118,32 @@ class AsyncDingTalkSender(AsyncSender):
     钉钉异步消息发送器。
     """
 
-    def __init__(self, webhook: str, secret: Optional[str] = None):
+    MESSAGE_BYTE_LIMITS = DINGTALK_BYTE_LIMITS
+
+    def __init__(self, webhook: str, secret: Optional[str] = None, client: Optional[httpx.AsyncClient] = None,
+                 rate_limiter: Optional[RateLimiter] = None, signature_ttl: float = DEFAULT_SIGNATURE_TTL,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         """
         初始化钉钉异步发送器。
 
         :param webhook: 钉钉机器人的 Webhook 地址。
         :param secret: 钉钉机器人的密钥，用于签名。
+        :param client: 自定义的异步 HTTP 客户端，默认使用当前事件循环的共享连接池。
+        :param rate_limiter: 自定义的限流器，默认使用按 Webhook 限流的共享限流器。
+        :param signature_ttl: 加签的复用时间（秒），钉钉接受一小时内的签名，默认复用 30 分钟，为 0 时每次重新签名。
+        :param retry_policy: 自定义的重试策略，默认使用共享的重试策略。
+        :param circuit_breaker: 自定义的熔断器，默认使用按发送目标共享的熔断器。
         """
         self.webhook = webhook
         self.secret = secret
         self.logger = default_logger
-
-    def _sign(self) -> Dict[str, str]:
-        """
-        生成钉钉 API 所需的签名。
-
-        :return: 包含签名和时间戳的字典。
-        """
-        if not self.secret:
-            return {}
-
-        timestamp = str(round(time.time() * 1000))
-        secret_enc = self.secret.encode("utf-8")
-        string_to_sign = f"{timestamp}\n{self.secret}"
-        string_to_sign_enc = string_to_sign.encode("utf-8")
-
-        hmac_code = hmac.new(
-            secret_enc, string_to_sign_enc, digestmod=hashlib.sha256
-        ).digest()
-
-        sign = base64.b64encode(hmac_code).decode("utf-8")
-
-        return {"timestamp": timestamp, "sign": sign}
+        self._client = client
+        self._rate_limiter = rate_limiter or webhook_rate_limiter
+        # Webhook 地址只解析一次，签名在复用时间内缓存
+        self._url = SignedWebhook(webhook, secret, signature_ttl)
+        self._retry_policy = retry_policy or default_retry_policy
+        self._breaker = circuit_breaker or circuit_breakers.get(redact_url(webhook))
 
     async def send(self, message: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
         """
@@ -148,39 +154,49 @@ class AsyncDingTalkSender(AsyncSender):
         :return: 钉钉 API 的响应。
         """
         message.update(kwargs)  # 合并额外的关键字参数
-        headers = {"Content-Type": "application/json"}
-
-        # 解析 webhook URL，获取基础 URL 和已有的查询参数
-        from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-
-        parsed_url = urlparse(self.webhook)
-        query_params = parse_qs(parsed_url.query)
-
-        # 将签名参数添加到查询参数中
-        signed_params = self._sign()
-        for k, v in signed_params.items():
-            query_params[k] = [v]
+        async with asuppress_duplicate(self.webhook, message,
+                                       lambda text: self.send({"msgtype": "text", "text": {"content": text}})) as duplicate:
+            if duplicate is not None:
+                return duplicate
+            parts = split_payload(message, self.MESSAGE_BYTE_LIMITS)
+            if len(parts) > 1:
+                return await send_parts_async(self, parts)
+            return await self._retry_policy.call_async(guarded_async, self._breaker, self._post, message)
+
+    async def _post(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        异步发送一条钉钉消息，失败时不重试。
 
-        # 重新构建查询字符串
-        new_query_string = urlencode({k: v[0] if isinstance(
-            v, list) else v for k, v in query_params.items()})
+        :param message: 消息内容。
+        :return: 钉钉 API 的响应。
+        """
+        await self._rate_limiter.acquire_async(self.webhook)
+        headers = {"Content-Type": "application/json"}
 
-        # 重新构建 URL
-        final_url = urlunparse(parsed_url._replace(query=new_query_string))
+        final_url = self._url.url()
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    final_url, headers=headers, json=message
-                )
-                response.raise_for_status()
-                result = response.json()
-                self.logger.info(f"🎉 钉钉消息发送成功: {result}")
+            client = self._client or get_async_http_client()
+            response = await client.post(
+                final_url, headers=headers, **request_body(message)
+            )
+            response.raise_for_status()
+            result = response.json()
+            errcode = result.get("errcode", 0)
+            if errcode in self._retry_policy.retry_errcodes:
+                # 发送太快等临时性错误码交给重试策略处理，其余错误码与以前一样直接返回响应
+                raise HttpError(f"发送钉钉消息失败: {result.get('errmsg')}", errcode=errcode)
+            if errcode != 0:
+                self.logger.error(f"🔥 钉钉消息发送失败: {result}")
                 return result
+            self.logger.info(f"🎉 钉钉消息发送成功: {result}")
+            return result
+        except HttpError:
+            # 可重试的错误码由重试策略记录日志，不当作未知错误
+            raise
         except httpx.HTTPStatusError as e:
             self.logger.error(f"🔥 钉钉消息发送失败: {e.response.text}")
-            raise HttpError(
-                f"发送钉钉消息失败: {e.response.text}", e.response.status_code)
+            raise http_error(f"发送钉钉消息失败: {e.response.text}", e.response)
         except Exception as e:
             self.logger.error(f"🔥 发送钉钉消息时发生未知错误: {e}")
             raise
@@ -0,0 +1,81 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T16:30:00.000Z
+# 文件描述：钉钉 Webhook 地址预解析和加签缓存，签名在安全期内复用，到期前重新生成。
+# 文件路径：xqcsendmessage/dingtalk/signing.py
+
+import base64
+import hashlib
+import hmac
+import time
+from typing import Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from ..core.exceptions import ValidationError
+
+# 钉钉接受与服务器时间相差一小时以内的签名
+SIGNATURE_MAX_AGE = 3600
+# 签名默认复用 30 分钟，为客户端与服务器的时钟偏差留出余量
+DEFAULT_SIGNATURE_TTL = 1800
+
+
+def sign(secret_enc: bytes, secret: str, timestamp: str) -> str:
+    """
+    生成钉钉加签所需的签名。
+
+    :param secret_enc: UTF-8 编码后的密钥。
+    :param secret: 密钥。
+    :param timestamp: 毫秒时间戳。
+    :return: base64 编码的 HMAC-SHA256 签名。
+    """
+    string_to_sign = f"{timestamp}\n{secret}".encode("utf-8")
+    hmac_code = hmac.new(secret_enc, string_to_sign, digestmod=hashlib.sha256).digest()
+    return base64.b64encode(hmac_code).decode("utf-8")
+
+
+class SignedWebhook:
+    """
+    钉钉 Webhook 请求地址。地址在初始化时解析一次，密钥只编码一次；
+    带签名的地址在 `signature_ttl` 秒内复用，之后重新签名。
+    """
+
+    def __init__(self, webhook: str, secret: Optional[str] = None,
+                 signature_ttl: float = DEFAULT_SIGNATURE_TTL):
+        """
+        初始化钉钉 Webhook 请求地址。
+
+        :param webhook: 钉钉机器人的 Webhook 地址。
+        :param secret: 钉钉机器人的密钥，为空时不加签。
+        :param signature_ttl: 签名的复用时间（秒），需小于 3600，为 0 时每次请求都重新签名。
+        """
+        if not 0 <= signature_ttl < SIGNATURE_MAX_AGE:
+            raise ValidationError(f"❌ signature_ttl 必须在 0 到 {SIGNATURE_MAX_AGE} 秒之间。")
+        parsed = urlparse(webhook)
+        # Webhook 中已有的签名参数会被新签名替换
+        query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                 if not (secret and k in ("timestamp", "sign"))]
+        self.base_url = urlunparse(parsed._replace(query=urlencode(query)))
+        self._separator = "&" if query else "?"
+        self.secret = secret
+        self._secret_enc = secret.encode("utf-8") if secret else b""
+        self.signature_ttl = signature_ttl
+        # (带签名的地址, 过期时间)，整体替换以保证多线程读取的一致性
+        self._cached: Tuple[str, float] = ("", 0.0)
+
+    def url(self) -> str:
+        """
+        获取请求地址，需要时重新签名。
+
+        :return: 带签名参数的请求地址。
+        """
+        if not self.secret:
+            return self.base_url
+        now = time.time()
+        url, expires_at = self._cached
+        if now < expires_at:
+            return url
+        timestamp = str(round(now * 1000))
+        signature = sign(self._secret_enc, self.secret, timestamp)
+        url = f"{self.base_url}{self._separator}{urlencode({'timestamp': timestamp, 'sign': signature})}"
+        self._cached = (url, now + self.signature_ttl)
+        return url
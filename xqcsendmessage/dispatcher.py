@@ -0,0 +1,304 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T20:00:00.000Z
+# 文件描述：后台分发器，在常驻线程的事件循环中运行异步发送函数，同步调用方提交后立即拿到 Future 返回。
+# 文件路径：xqcsendmessage/dispatcher.py
+
+import asyncio
+import atexit
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .api import SEND_FUNCTIONS
+from .core.exceptions import QueueFullError, ValidationError
+from .core.logger import default_logger
+
+# 默认最多排队的任务数和同时发送的任务数
+DEFAULT_MAX_QUEUE_SIZE = 1000
+DEFAULT_DISPATCH_CONCURRENCY = 16
+# 队列已满时的处理方式：等待空位、立即抛出 QueueFullError、丢弃最早排队的任务
+OVERFLOW_POLICIES = ("block", "raise", "drop_oldest")
+
+
+class _Job:
+    __slots__ = ("func", "args", "kwargs", "future")
+
+    def __init__(self, func: Callable[..., Awaitable[Any]], args: tuple, kwargs: Dict[str, Any], future: Future):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+
+
+class Dispatcher:
+    """
+    后台分发器。
+
+    首次提交时启动一个后台线程，在其中运行常驻的事件循环，由 `max_concurrency` 个工作协程调用
+    `send_dingtalk_async` 等异步发送函数，HTTP 和 SMTP 连接在该事件循环中复用。`submit` 只把任务放入队列，
+    立即返回 `concurrent.futures.Future`，调用方不会被网络请求阻塞。
+
+    排队的任务数达到 `max_queue_size` 时按 `overflow` 处理：'block' 等待空位（最多 `block_timeout` 秒），
+    'raise' 立即抛出 `QueueFullError`，'drop_oldest' 取消最早排队的任务。
+    """
+
+    def __init__(self, max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE, overflow: str = "block",
+                 max_concurrency: int = DEFAULT_DISPATCH_CONCURRENCY, block_timeout: Optional[float] = None):
+        """
+        初始化后台分发器。
+
+        :param max_queue_size: 最多排队（尚未开始发送）的任务数。
+        :param overflow: 队列已满时的处理方式，'block'、'raise' 或 'drop_oldest'。
+        :param max_concurrency: 同时发送的任务数。
+        :param block_timeout: `overflow='block'` 时最长等待时间（秒），超时抛出 `QueueFullError`，默认一直等待。
+        """
+        if max_queue_size < 1 or max_concurrency < 1:
+            raise ValidationError("❌ max_queue_size 和 max_concurrency 必须大于 0。")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValidationError(f"❌ 无效的 overflow: {overflow}，支持 {', '.join(OVERFLOW_POLICIES)}。")
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+        self.max_concurrency = max_concurrency
+        self.block_timeout = block_timeout
+        self.logger = default_logger
+        self.dropped = 0
+        self._pending: Deque[_Job] = deque()
+        self._unfinished = 0
+        self._cond = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _start_locked(self) -> None:
+        """
+        启动后台线程和事件循环，调用方需持有锁。
+        """
+        if self._thread is not None:
+            return
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="xqc-dispatcher", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._wake = asyncio.Event()
+        workers = [loop.create_task(self._worker()) for _ in range(self.max_concurrency)]
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+            # 只有发送过钉钉或企业微信消息时才需要关闭 HTTP 连接池
+            http = sys.modules.get(f"{__package__}.core.http")
+            if http is not None:
+                loop.run_until_complete(http.aclose_http_clients())
+            loop.close()
+
+    def _take(self) -> Optional[_Job]:
+        with self._cond:
+            if not self._pending:
+                return None
+            job = self._pending.popleft()
+            self._cond.notify_all()
+            return job
+
+    def _done(self) -> None:
+        with self._cond:
+            self._unfinished -= 1
+            self._cond.notify_all()
+
+    async def _worker(self) -> None:
+        while True:
+            job = self._take()
+            if job is None:
+                self._wake.clear()
+                # 清除信号后再检查一次，避免错过清除前提交的任务
+                job = self._take()
+                if job is None:
+                    await self._wake.wait()
+                    continue
+            try:
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = await job.func(*job.args, **job.kwargs)
+                except BaseException as e:
+                    # 正在运行的 Future 无法取消，事件循环停止时以 CancelledError 结束
+                    job.future.set_exception(e)
+                    if isinstance(e, asyncio.CancelledError):
+                        raise
+                else:
+                    job.future.set_result(result)
+            finally:
+                self._done()
+
+    def submit(self, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Future:
+        """
+        提交一个异步函数到后台事件循环执行。
+
+        :param func: 异步函数，例如 `send_dingtalk_async`。
+        :param args: 位置参数。
+        :param kwargs: 关键字参数。
+        :return: 任务的 Future，可通过 `result()` 等待发送结果。
+        """
+        future: Future = Future()
+        job = _Job(func, args, kwargs, future)
+        with self._cond:
+            if self._closed:
+                raise ValidationError("❌ 后台分发器已关闭。")
+            self._start_locked()
+            deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+            while len(self._pending) >= self.max_queue_size:
+                if self.overflow == "raise":
+                    raise QueueFullError(f"❌ 后台发送队列已满（{self.max_queue_size}）。")
+                if self.overflow == "drop_oldest":
+                    dropped = self._pending.popleft()
+                    dropped.future.cancel()
+                    self._unfinished -= 1
+                    self.dropped += 1
+                    self.logger.warning("⚠️ 后台发送队列已满，丢弃最早排队的消息。")
+                    continue
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise QueueFullError(f"❌ 后台发送队列已满（{self.max_queue_size}），等待超时。")
+                self._cond.wait(remaining)
+            self._pending.append(job)
+            self._unfinished += 1
+            self._cond.notify_all()
+        self._loop.call_soon_threadsafe(self._wake.set)
+        return future
+
+    def send(self, platform: str, **kwargs: Any) -> Future:
+        """
+        按平台提交一条消息。
+
+        :param platform: 平台，"email", "dingtalk", "wecom_webhook" 或 "wecom_app"。
+        :param kwargs: 对应顶层发送函数（如 `send_dingtalk`）的参数。
+        :return: 任务的 Future，结果为发送函数的返回值。
+        """
+        if platform not in SEND_FUNCTIONS:
+            raise ValidationError(f"❌ 不支持的平台: {platform}，支持 {', '.join(SEND_FUNCTIONS)}。")
+        return self.submit(SEND_FUNCTIONS[platform][1], **kwargs)
+
+    def qsize(self) -> int:
+        """
+        返回排队（尚未开始发送）的任务数。
+        """
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有已提交的任务完成。
+
+        :param timeout: 最长等待时间（秒），默认一直等待。
+        :return: 是否在超时前全部完成。
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> None:
+        """
+        关闭分发器，之后不能再提交任务。
+
+        :param wait: 是否先等待已提交的任务完成，为 False 时取消排队的任务。
+        :param timeout: 等待的最长时间（秒），默认一直等待。
+        """
+        with self._cond:
+            self._closed = True
+            if not wait:
+                cancelled: List[_Job] = list(self._pending)
+                self._pending.clear()
+                self._unfinished -= len(cancelled)
+                for job in cancelled:
+                    job.future.cancel()
+        if wait and not self.flush(timeout):
+            self.logger.warning("⚠️ 后台分发器关闭时仍有未完成的消息。")
+        thread, loop = self._thread, self._loop
+        if thread is not None and loop is not None and thread is not threading.current_thread():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+
+
+# 顶层 `dispatch` 使用的分发器，首次使用时创建
+_dispatcher: Optional[Dispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> Dispatcher:
+    """
+    获取默认的后台分发器，首次调用时创建。
+
+    :return: 后台分发器。
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = Dispatcher()
+    return _dispatcher
+
+
+def configure_dispatcher(max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE, overflow: str = "block",
+                         max_concurrency: int = DEFAULT_DISPATCH_CONCURRENCY,
+                         block_timeout: Optional[float] = None) -> Dispatcher:
+    """
+    使用新参数替换默认的后台分发器，旧分发器中的任务发送完成后关闭。
+
+    :param max_queue_size: 最多排队的任务数，默认 1000。
+    :param overflow: 队列已满时的处理方式，'block'（默认）、'raise' 或 'drop_oldest'。
+    :param max_concurrency: 同时发送的任务数，默认 16。
+    :param block_timeout: `overflow='block'` 时最长等待时间（秒），默认一直等待。
+    :return: 新的后台分发器。
+    """
+    global _dispatcher
+    dispatcher = Dispatcher(max_queue_size, overflow, max_concurrency, block_timeout)
+    with _dispatcher_lock:
+        previous, _dispatcher = _dispatcher, dispatcher
+    if previous is not None:
+        previous.shutdown()
+    return dispatcher
+
+
+def dispatch(platform: str, **kwargs: Any) -> Future:
+    """
+    在后台发送一条消息，立即返回，不等待网络请求。
+
+    :param platform: 平台，"email", "dingtalk", "wecom_webhook" 或 "wecom_app"。
+    :param kwargs: 对应顶层发送函数（如 `send_dingtalk`）的参数。
+    :return: `concurrent.futures.Future`，结果为发送函数的返回值。
+    """
+    return get_dispatcher().send(platform, **kwargs)
+
+
+def flush_dispatcher(timeout: Optional[float] = None) -> bool:
+    """
+    等待默认后台分发器中已提交的消息全部发送完成。
+
+    :param timeout: 最长等待时间（秒），默认一直等待。
+    :return: 是否在超时前全部完成。
+    """
+    dispatcher = _dispatcher
+    return True if dispatcher is None else dispatcher.flush(timeout)
+
+
+def _shutdown_dispatcher() -> None:
+    global _dispatcher
+    with _dispatcher_lock:
+        previous, _dispatcher = _dispatcher, None
+    if previous is not None:
+        previous.shutdown()
+
+
+# 进程退出时发送完队列中的消息
+atexit.register(_shutdown_dispatcher)
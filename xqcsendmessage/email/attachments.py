@@ -0,0 +1,143 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T12:30:00.000Z
+# 文件描述：邮件附件缓存，附件只读取和 base64 编码一次，在多封邮件之间复用。
+# 文件路径：xqcsendmessage/email/attachments.py
+
+import base64
+import os
+import threading
+from collections import OrderedDict
+from email.mime.base import MIMEBase
+from typing import Tuple
+
+from ..core.exceptions import ValidationError
+
+# 默认最多缓存 64 MB 已编码的附件
+DEFAULT_ATTACHMENT_CACHE_BYTES = 64 * 1024 * 1024
+
+# (绝对路径, 修改时间, 文件大小)，文件被修改后自动失效
+AttachmentKey = Tuple[str, int, int]
+
+
+def build_attachment_part(filename: str, encoded: str) -> MIMEBase:
+    """
+    使用已编码的 base64 内容构建附件 MIME 部分，与 `MIMEApplication` 生成的结构一致。
+
+    :param filename: 附件文件名。
+    :param encoded: base64 编码后的附件内容（每行 76 个字符）。
+    :return: 附件 MIME 部分。
+    """
+    part = MIMEBase("application", "octet-stream", Name=filename)
+    part.set_payload(encoded)
+    part["Content-Transfer-Encoding"] = "base64"
+    part["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return part
+
+
+class AttachmentCache:
+    """
+    按 (路径, 修改时间, 大小) 缓存已 base64 编码的附件，按总字节数进行 LRU 淘汰。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_ATTACHMENT_CACHE_BYTES):
+        """
+        初始化附件缓存。
+
+        :param max_bytes: 缓存的最大字节数（按编码后的大小计算），为 0 时关闭缓存。
+        """
+        if max_bytes < 0:
+            raise ValidationError("❌ 附件缓存大小不能为负数。")
+        self.max_bytes = max_bytes
+        self._parts: "OrderedDict[AttachmentKey, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(file_path: str) -> AttachmentKey:
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._parts:
+            _, encoded = self._parts.popitem(last=False)
+            self._size -= len(encoded)
+
+    def get_encoded(self, file_path: str) -> str:
+        """
+        获取附件的 base64 编码内容，未命中时读取文件并编码。
+
+        :param file_path: 附件文件路径。
+        :return: base64 编码后的内容。
+        """
+        key = self._make_key(file_path)
+        with self._lock:
+            encoded = self._parts.get(key)
+            if encoded is not None:
+                self._parts.move_to_end(key)
+                return encoded
+
+        with open(file_path, "rb") as f:
+            encoded = base64.encodebytes(f.read()).decode("ascii")
+
+        if len(encoded) <= self.max_bytes:
+            with self._lock:
+                if key not in self._parts:
+                    self._parts[key] = encoded
+                    self._size += len(encoded)
+                    self._evict()
+        return encoded
+
+    def get_part(self, file_path: str) -> MIMEBase:
+        """
+        获取附件的 MIME 部分。每次返回新的 MIME 对象，但共享已编码的内容。
+
+        :param file_path: 附件文件路径。
+        :return: 附件 MIME 部分。
+        """
+        return build_attachment_part(os.path.basename(file_path), self.get_encoded(file_path))
+
+    def resize(self, max_bytes: int) -> None:
+        """
+        调整缓存容量，超出部分按 LRU 顺序淘汰。
+
+        :param max_bytes: 新的最大字节数，为 0 时关闭缓存。
+        """
+        if max_bytes < 0:
+            raise ValidationError("❌ 附件缓存大小不能为负数。")
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        清空缓存。
+        """
+        with self._lock:
+            self._parts.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        """当前缓存占用的字节数。"""
+        return self._size
+
+
+# 所有邮件发送器共享的附件缓存
+attachment_cache = AttachmentCache()
+
+
+def clear_attachment_cache() -> None:
+    """
+    清空邮件附件缓存。
+    """
+    attachment_cache.clear()
+
+
+def set_attachment_cache_size(max_bytes: int) -> None:
+    """
+    设置邮件附件缓存的最大字节数。
+
+    :param max_bytes: 最大字节数，为 0 时关闭缓存。
+    """
+    attachment_cache.resize(max_bytes)
@@ -0,0 +1,445 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T11:30:00.000Z
+# 文件描述：已认证 SMTP 会话的连接池，供同步和异步邮件发送器复用。
+# 文件路径：xqcsendmessage/email/pool.py
+
+import asyncio
+import atexit
+import smtplib
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+import aiosmtplib
+
+from ..core.logger import default_logger
+from .streaming import ChunkFactory, stream_sendmail, stream_sendmail_async
+
+# 每个连接池默认最多保持的连接数
+DEFAULT_POOL_SIZE = 4
+# 空闲超过该秒数的连接直接关闭，不再复用
+DEFAULT_IDLE_TIMEOUT = 60.0
+# 单个连接最多发送的邮件数，超过后关闭重建，避免被服务商断开
+DEFAULT_MAX_MESSAGES = 100
+# 空闲超过该秒数的连接在复用前先发送 NOOP 检查是否存活
+HEALTH_CHECK_AFTER = 5.0
+# SMTP 连接超时（秒）
+DEFAULT_SMTP_TIMEOUT = 30.0
+
+# 连接断开类错误：在复用的旧连接上出现时，换一个新连接重试一次
+SMTP_DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+ASYNC_SMTP_DISCONNECT_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError,
+                                ConnectionError, TimeoutError)
+
+PoolKey = Tuple[str, int, str, str, bool]
+
+
+class _PooledConnection:
+    """
+    连接池中的单个 SMTP 会话。
+    """
+    __slots__ = ("smtp", "created_at", "last_used", "messages_sent")
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages_sent = 0
+
+    @property
+    def is_fresh(self) -> bool:
+        """是否为新建且尚未使用的连接。"""
+        return self.messages_sent == 0
+
+
+class SMTPConnectionPool:
+    """
+    同步 SMTP 连接池，保存已完成 TLS 握手和登录的会话。
+    """
+
+    def __init__(self, smtp_server: str, smtp_port: int, sender_email: str, sender_password: str,
+                 use_tls: bool = True, max_size: int = DEFAULT_POOL_SIZE,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, max_messages: int = DEFAULT_MAX_MESSAGES,
+                 timeout: float = DEFAULT_SMTP_TIMEOUT):
+        """
+        初始化同步 SMTP 连接池。
+
+        :param smtp_server: SMTP 服务器地址。
+        :param smtp_port: SMTP 服务器端口。
+        :param sender_email: 发件人邮箱。
+        :param sender_password: 发件人邮箱密码或授权码。
+        :param use_tls: 是否使用 TLS 加密。
+        :param max_size: 最多同时存在的连接数。
+        :param idle_timeout: 连接空闲超时（秒）。
+        :param max_messages: 单个连接最多发送的邮件数。
+        :param timeout: 连接超时（秒）。
+        """
+        self.smtp_server = smtp_server
+        self.smtp_port = int(smtp_port)
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.logger = default_logger
+        self._idle: List[_PooledConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self) -> _PooledConnection:
+        """
+        建立新的 SMTP 会话并登录。
+        """
+        # 对于端口 465，通常直接使用 SMTP_SSL
+        if self.smtp_port == 465:
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            # STARTTLS 失败时同样需要关闭已建立的连接
+            if self.smtp_port != 465 and self.use_tls:
+                server.starttls()
+            server.login(self.sender_email, self.sender_password)
+        except BaseException:
+            self._close_quietly(server)
+            raise
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close_quietly(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _is_healthy(self, conn: _PooledConnection) -> bool:
+        """
+        检查空闲连接是否仍然可用。
+        """
+        idle = time.monotonic() - conn.last_used
+        if idle > self.idle_timeout:
+            return False
+        if idle > HEALTH_CHECK_AFTER:
+            try:
+                return conn.smtp.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def _checkout(self) -> _PooledConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._is_healthy(conn):
+                return conn
+            self._close_quietly(conn.smtp)
+
+    def _checkin(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        if conn.messages_sent >= self.max_messages:
+            self._close_quietly(conn.smtp)
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[_PooledConnection]:
+        """
+        借出一个已登录的 SMTP 会话，使用完毕后自动归还。出现异常时该会话会被关闭而不是归还。
+
+        :return: 连接池中的会话，`conn.smtp` 为 `smtplib.SMTP` 实例。
+        """
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+            except BaseException:
+                self._close_quietly(conn.smtp)
+                raise
+            self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def sendmail(self, from_addr: str, to_addrs: List[str], msg: str | bytes) -> Dict[str, Tuple[int, bytes]]:
+        """
+        通过连接池发送一封邮件。复用的连接已被服务端断开时，换新连接重试一次。
+
+        :param from_addr: 发件人。
+        :param to_addrs: 收件人列表。
+        :param msg: 邮件内容。
+        :return: `smtplib.SMTP.sendmail` 的返回值。
+        """
+        return self._send(lambda smtp: smtp.sendmail(from_addr, to_addrs, msg))
+
+    def sendmail_stream(self, from_addr: str, to_addrs: List[str],
+                        chunk_factory: ChunkFactory) -> Dict[str, Tuple[int, bytes]]:
+        """
+        通过连接池流式发送一封邮件，DATA 阶段逐块写入内容。
+
+        :param from_addr: 发件人。
+        :param to_addrs: 收件人列表。
+        :param chunk_factory: 生成邮件内容分块的函数，重连重试时会再次调用。
+        :return: 被拒绝的收件人，与 `smtplib.SMTP.sendmail` 的返回值一致。
+        """
+        return self._send(lambda smtp: stream_sendmail(smtp, from_addr, to_addrs, chunk_factory()))
+
+    def _send(self, action: Callable[[smtplib.SMTP], Any]) -> Any:
+        """
+        借出连接执行发送操作。复用的连接已被服务端断开时，换新连接重试一次。
+        """
+        for attempt in range(2):
+            reused = False
+            try:
+                with self.connection() as conn:
+                    reused = not conn.is_fresh
+                    result = action(conn.smtp)
+                    conn.messages_sent += 1
+                    return result
+            except SMTP_DISCONNECT_ERRORS:
+                if not reused or attempt:
+                    raise
+                self.logger.warning("⚠️ SMTP 连接已断开，正在重新连接。")
+                # 同一时间建立的其他空闲连接很可能也已失效
+                self.close()
+
+    def close(self) -> None:
+        """
+        关闭所有空闲连接。
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close_quietly(conn.smtp)
+
+
+class AsyncSMTPConnectionPool:
+    """
+    异步 SMTP 连接池，保存已完成 TLS 握手和登录的会话。连接绑定在创建它的事件循环上。
+    """
+
+    def __init__(self, smtp_server: str, smtp_port: int, sender_email: str, sender_password: str,
+                 use_tls: bool = True, max_size: int = DEFAULT_POOL_SIZE,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, max_messages: int = DEFAULT_MAX_MESSAGES,
+                 timeout: float = DEFAULT_SMTP_TIMEOUT):
+        """
+        初始化异步 SMTP 连接池。
+
+        :param smtp_server: SMTP 服务器地址。
+        :param smtp_port: SMTP 服务器端口。
+        :param sender_email: 发件人邮箱。
+        :param sender_password: 发件人邮箱密码或授权码。
+        :param use_tls: 是否使用 TLS 加密。
+        :param max_size: 最多同时存在的连接数。
+        :param idle_timeout: 连接空闲超时（秒）。
+        :param max_messages: 单个连接最多发送的邮件数。
+        :param timeout: 连接超时（秒）。
+        """
+        self.smtp_server = smtp_server
+        self.smtp_port = int(smtp_port)
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.logger = default_logger
+        self._idle: List[_PooledConnection] = []
+        self._slots = asyncio.Semaphore(max_size)
+
+    async def _connect(self) -> _PooledConnection:
+        """
+        建立新的 SMTP 会话并登录。
+        """
+        # 对于端口 465，aiosmtplib 的 use_tls 应该设置为 True
+        if self.smtp_port == 465:
+            server = aiosmtplib.SMTP(
+                hostname=self.smtp_server, port=self.smtp_port, use_tls=True, timeout=self.timeout)
+        else:
+            server = aiosmtplib.SMTP(
+                hostname=self.smtp_server, port=self.smtp_port, use_tls=self.use_tls, timeout=self.timeout)
+        await server.connect()
+        try:
+            await server.login(self.sender_email, self.sender_password)
+        except BaseException:
+            await self._close_quietly(server)
+            raise
+        return _PooledConnection(server)
+
+    @staticmethod
+    async def _close_quietly(server: aiosmtplib.SMTP) -> None:
+        try:
+            await server.quit()
+        except Exception:
+            server.close()
+
+    async def _is_healthy(self, conn: _PooledConnection) -> bool:
+        """
+        检查空闲连接是否仍然可用。
+        """
+        idle = time.monotonic() - conn.last_used
+        if idle > self.idle_timeout or not conn.smtp.is_connected:
+            return False
+        if idle > HEALTH_CHECK_AFTER:
+            try:
+                return (await conn.smtp.noop()).code == 250
+            except Exception:
+                return False
+        return True
+
+    async def _checkout(self) -> _PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if await self._is_healthy(conn):
+                return conn
+            await self._close_quietly(conn.smtp)
+        return await self._connect()
+
+    async def _checkin(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        if conn.messages_sent >= self.max_messages:
+            await self._close_quietly(conn.smtp)
+            return
+        self._idle.append(conn)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[_PooledConnection]:
+        """
+        借出一个已登录的 SMTP 会话，使用完毕后自动归还。出现异常时该会话会被关闭而不是归还。
+
+        :return: 连接池中的会话，`conn.smtp` 为 `aiosmtplib.SMTP` 实例。
+        """
+        async with self._slots:
+            conn = await self._checkout()
+            try:
+                yield conn
+            except BaseException:
+                await self._close_quietly(conn.smtp)
+                raise
+            await self._checkin(conn)
+
+    async def sendmail(self, from_addr: str, to_addrs: List[str], msg: str | bytes) -> Tuple[Dict, str]:
+        """
+        通过连接池异步发送一封邮件。复用的连接已被服务端断开时，换新连接重试一次。
+
+        :param from_addr: 发件人。
+        :param to_addrs: 收件人列表。
+        :param msg: 邮件内容。
+        :return: `aiosmtplib.SMTP.sendmail` 的返回值。
+        """
+        return await self._send(lambda smtp: smtp.sendmail(from_addr, to_addrs, msg))
+
+    async def sendmail_stream(self, from_addr: str, to_addrs: List[str],
+                              chunk_factory: ChunkFactory) -> Dict[str, Tuple[int, str]]:
+        """
+        通过连接池异步流式发送一封邮件，DATA 阶段逐块写入内容。
+
+        :param from_addr: 发件人。
+        :param to_addrs: 收件人列表。
+        :param chunk_factory: 生成邮件内容分块的函数，重连重试时会再次调用。
+        :return: 被拒绝的收件人 -> (响应码, 响应内容)。
+        """
+        return await self._send(lambda smtp: stream_sendmail_async(smtp, from_addr, to_addrs, chunk_factory()))
+
+    async def _send(self, action: Callable[[aiosmtplib.SMTP], Awaitable[Any]]) -> Any:
+        """
+        借出连接执行发送操作。复用的连接已被服务端断开时，换新连接重试一次。
+        """
+        for attempt in range(2):
+            reused = False
+            try:
+                async with self.connection() as conn:
+                    reused = not conn.is_fresh
+                    result = await action(conn.smtp)
+                    conn.messages_sent += 1
+                    return result
+            except ASYNC_SMTP_DISCONNECT_ERRORS:
+                if not reused or attempt:
+                    raise
+                self.logger.warning("⚠️ SMTP 连接已断开，正在重新连接。")
+                # 同一时间建立的其他空闲连接很可能也已失效
+                await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        关闭所有空闲连接。
+        """
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._close_quietly(conn.smtp)
+
+
+_pools: Dict[PoolKey, SMTPConnectionPool] = {}
+# 异步连接池按事件循环分别维护：{(id(loop), key): (loop, pool)}
+_async_pools: Dict[Tuple[int, PoolKey], Tuple[asyncio.AbstractEventLoop, AsyncSMTPConnectionPool]] = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(smtp_server: str, smtp_port: int, sender_email: str, sender_password: str,
+                  use_tls: bool = True) -> SMTPConnectionPool:
+    """
+    获取指定账号共享的同步 SMTP 连接池。
+
+    :return: `SMTPConnectionPool` 实例。
+    """
+    key = (smtp_server, int(smtp_port), sender_email, sender_password, use_tls)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SMTPConnectionPool(*key)
+        return pool
+
+
+def get_async_smtp_pool(smtp_server: str, smtp_port: int, sender_email: str, sender_password: str,
+                        use_tls: bool = True) -> AsyncSMTPConnectionPool:
+    """
+    获取当前事件循环上指定账号共享的异步 SMTP 连接池。必须在事件循环中调用。
+
+    :return: `AsyncSMTPConnectionPool` 实例。
+    """
+    loop = asyncio.get_running_loop()
+    key = (smtp_server, int(smtp_port), sender_email, sender_password, use_tls)
+    entry = _async_pools.get((id(loop), key))
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+    with _pools_lock:
+        # 清理已关闭事件循环上遗留的连接池
+        for pool_key, (old_loop, _) in list(_async_pools.items()):
+            if old_loop.is_closed():
+                del _async_pools[pool_key]
+        pool = AsyncSMTPConnectionPool(*key)
+        _async_pools[(id(loop), key)] = (loop, pool)
+        return pool
+
+
+def close_smtp_pools() -> None:
+    """
+    关闭所有同步 SMTP 连接池中的空闲连接。进程退出时会自动调用。
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+async def aclose_smtp_pools() -> None:
+    """
+    关闭当前事件循环上所有异步 SMTP 连接池中的空闲连接。
+    """
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        keys = [k for k, (pool_loop, _) in _async_pools.items() if pool_loop is loop]
+        pools = [_async_pools.pop(k)[1] for k in keys]
+    for pool in pools:
+        await pool.aclose()
+
+
+atexit.register(close_smtp_pools)
@@ -4,17 +4,90 @@
 # 文件描述：邮件发送器
 # 文件路径：xqcsendmessage/email/sender.py
 
-import smtplib
-import aiosmtplib
+import asyncio
+import logging
+import os
 from email.header import Header
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncContextManager, ContextManager, Dict, List, Optional, Tuple
 
 from ..core.abc import Sender, AsyncSender
-from ..core.exceptions import SendMessageError
+from ..core.exceptions import SendMessageError, CircuitOpenError, ValidationError
 from ..core.logger import default_logger
+from ..core.dedup import Notify, asuppress_duplicate, suppress_duplicate
+from ..core.circuit import CircuitBreaker, circuit_breakers, guarded, guarded_async
+from ..core.retry import RetryPolicy, default_retry_policy
+from .pool import SMTPConnectionPool, AsyncSMTPConnectionPool, get_smtp_pool, get_async_smtp_pool
+from .attachments import attachment_cache
+from .streaming import (
+    DEFAULT_MAX_ATTACHMENT_SIZE,
+    DEFAULT_STREAM_THRESHOLD,
+    iter_message_chunks,
+    message_to_bytes,
+)
+
+
+def _build_message(sender_email: str, message: str, email_subject: str, email_recipients: List[str],
+                   email_subtype: str, email_attachments: Optional[List[str]], max_attachment_size: int,
+                   stream_threshold: int, logger: logging.Logger) -> Tuple[MIMEMultipart, List[str]]:
+    """
+    构建邮件。小附件使用附件缓存直接放入邮件，大附件只返回路径，发送时再流式编码。
+    附件超过 `max_attachment_size` 时抛出 `ValidationError`，无法读取的附件记录警告后跳过。
+
+    :return: (邮件对象, 需要流式发送的附件路径列表)。
+    """
+    msg_root = MIMEMultipart()
+    msg_root["From"] = sender_email
+    msg_root["To"] = ", ".join(email_recipients)
+    if email_subject is None:
+        raise SendMessageError("发送邮件失败: 邮件主题 (email_subject) 不能为空。")
+    msg_root["Subject"] = str(Header(email_subject, "utf-8"))
+    msg_root.attach(MIMEText(message, email_subtype, "utf-8"))
+
+    streamed: List[str] = []
+    if email_attachments:
+        for file_path in email_attachments:
+            try:
+                size = os.path.getsize(file_path)
+                if size > max_attachment_size:
+                    raise ValidationError(f"❌ 附件 {file_path} 大小 {size} 字节超过上限 {max_attachment_size} 字节。")
+                if size > stream_threshold:
+                    streamed.append(file_path)
+                else:
+                    # 相同文件只读取和编码一次，在多封邮件之间复用
+                    msg_root.attach(attachment_cache.get_part(file_path))
+            except ValidationError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ 添加附件 {file_path} 失败: {e}")
+    return msg_root, streamed
+
+
+def _dedup_args(sender: Any, message: str, email_subject: str, email_recipients: List[str],
+                email_subtype: str, email_attachments: Optional[List[str]]) -> Tuple[str, Dict[str, Any], Notify]:
+    """
+    返回邮件去重使用的目标、消息和汇总函数，汇总通过同一发送器发给原收件人。
+    """
+    return (
+        f"smtp:{sender.smtp_server}:{sender.smtp_port}:{sender.sender_email}",
+        {"subject": email_subject, "recipients": email_recipients, "body": message, "subtype": email_subtype,
+         "attachments": email_attachments},
+        lambda text: sender.send(text, f"[重复汇总] {email_subject}", email_recipients))
+
+
+def _suppress_duplicate(*args: Any) -> ContextManager[Optional[Dict[str, Any]]]:
+    """
+    去重启用时检查邮件是否重复，参数同 `_dedup_args`。发送失败时撤销记录。
+    """
+    return suppress_duplicate(*_dedup_args(*args))
+
+
+def _asuppress_duplicate(*args: Any) -> AsyncContextManager[Optional[Dict[str, Any]]]:
+    """
+    `_suppress_duplicate` 的异步版本，等待正在发送的相同邮件时不阻塞事件循环。
+    """
+    return asuppress_duplicate(*_dedup_args(*args))
 
 
 class EmailSender(Sender):
@@ -22,7 +95,10 @@ class EmailSender(Sender):
     邮件同步发送器。
     """
 
-    def __init__(self, smtp_server: str, smtp_port: int, sender_email: str, sender_password: str, use_tls: bool = True):
+    def __init__(self, smtp_server: str, smtp_port: int, sender_email: str, sender_password: str, use_tls: bool = True,
+                 pool: Optional[SMTPConnectionPool] = None, max_attachment_size: int = DEFAULT_MAX_ATTACHMENT_SIZE,
+                 stream_threshold: int = DEFAULT_STREAM_THRESHOLD, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         """
         初始化邮件同步发送器。
 
@@ -31,13 +107,23 @@ class EmailSender(Sender):
         :param sender_email: 发件人邮箱。
         :param sender_password: 发件人邮箱密码或授权码。
         :param use_tls: 是否使用 TLS 加密。
+        :param pool: 自定义的 SMTP 连接池，默认使用按账号共享的连接池。
+        :param max_attachment_size: 单个附件的大小上限（字节），超过时抛出 `ValidationError`，不发送邮件。
+        :param stream_threshold: 超过该大小（字节）的附件在发送时流式编码，不整体载入内存。
+        :param retry_policy: 自定义的重试策略，默认使用共享的重试策略。
+        :param circuit_breaker: 自定义的熔断器，默认使用按发送目标共享的熔断器。
         """
         self.smtp_server = smtp_server
         self.smtp_port = int(smtp_port)
         self.sender_email = sender_email
         self.sender_password = sender_password
         self.use_tls = use_tls
+        self.max_attachment_size = max_attachment_size
+        self.stream_threshold = stream_threshold
         self.logger = default_logger
+        self._pool = pool
+        self._retry_policy = retry_policy or default_retry_policy
+        self._breaker = circuit_breaker or circuit_breakers.get(f"smtp:{smtp_server}:{self.smtp_port}")
 
     def send(self, message: str,  email_subject: str, email_recipients: List[str], email_subtype: str = "plain", email_attachments: Optional[List[str]] = None, **kwargs: Any) -> Dict[str, Any]:
         """
@@ -51,43 +137,35 @@ class EmailSender(Sender):
         :param kwargs: 其他可选参数。
         :return: 发送结果。
         """
-        msg_root = MIMEMultipart()
-        msg_root["From"] = self.sender_email
-        msg_root["To"] = ", ".join(email_recipients)
-        if email_subject is None:
-            raise SendMessageError("发送邮件失败: 邮件主题 (email_subject) 不能为空。")
-        msg_root["Subject"] = str(Header(email_subject, "utf-8"))
-        msg_root.attach(MIMEText(message, email_subtype, "utf-8"))
-
-        if email_attachments:
-            for file_path in email_attachments:
-                try:
-                    with open(file_path, "rb") as f:
-                        part = MIMEApplication(
-                            f.read(), Name=file_path.split("/")[-1])
-                    part["Content-Disposition"] = f'attachment; filename="{file_path.split("/")[-1]}"'
-                    msg_root.attach(part)
-                except Exception as e:
-                    self.logger.warning(f"⚠️ 添加附件 {file_path} 失败: {e}")
-
-        try:
-            # 对于端口 465，通常直接使用 SMTP_SSL
-            if self.smtp_port == 465:
-                server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port)
-            else:
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                if self.use_tls:
-                    server.starttls()
-
-            with server:
-                server.login(self.sender_email, self.sender_password)
-                server.sendmail(self.sender_email, email_recipients,
-                                msg_root.as_string())
+        with _suppress_duplicate(self, message, email_subject, email_recipients, email_subtype,
+                                 email_attachments) as duplicate:
+            if duplicate is not None:
+                return duplicate
+            msg_root, streamed = _build_message(
+                self.sender_email, message, email_subject, email_recipients, email_subtype, email_attachments,
+                self.max_attachment_size, self.stream_threshold, self.logger)
+
+            try:
+                self._retry_policy.call(guarded, self._breaker, self._deliver, msg_root, streamed, email_recipients)
                 self.logger.info(f"🎉 邮件发送成功至: {email_recipients}")
                 return {"status": "success", "recipients": email_recipients}
-        except Exception as e:
-            self.logger.error(f"🔥 发送邮件时发生错误: {e}")
-            raise SendMessageError(f"发送邮件失败: {e}")
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                self.logger.error(f"🔥 发送邮件时发生错误: {e}")
+                raise SendMessageError(f"发送邮件失败: {e}") from e
+
+    def _deliver(self, msg_root: MIMEMultipart, streamed: List[str], email_recipients: List[str]) -> None:
+        """
+        通过 SMTP 连接池投递一封邮件，失败时不重试。
+        """
+        pool = self._pool or get_smtp_pool(
+            self.smtp_server, self.smtp_port, self.sender_email, self.sender_password, self.use_tls)
+        if streamed:
+            pool.sendmail_stream(self.sender_email, email_recipients,
+                                 lambda: iter_message_chunks(msg_root, streamed))
+        else:
+            pool.sendmail(self.sender_email, email_recipients, message_to_bytes(msg_root))
 
 
 class AsyncEmailSender(AsyncSender):
@@ -95,7 +173,10 @@ class AsyncEmailSender(AsyncSender):
     邮件异步发送器。
     """
 
-    def __init__(self, smtp_server: str, smtp_port: int, sender_email: str, sender_password: str, use_tls: bool = True):
+    def __init__(self, smtp_server: str, smtp_port: int, sender_email: str, sender_password: str, use_tls: bool = True,
+                 pool: Optional[AsyncSMTPConnectionPool] = None, max_attachment_size: int = DEFAULT_MAX_ATTACHMENT_SIZE,
+                 stream_threshold: int = DEFAULT_STREAM_THRESHOLD, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         """
         初始化邮件异步发送器。
 
@@ -104,13 +185,23 @@ class AsyncEmailSender(AsyncSender):
         :param sender_email: 发件人邮箱。
         :param sender_password: 发件人邮箱密码或授权码。
         :param use_tls: 是否使用 TLS 加密。
+        :param pool: 自定义的 SMTP 连接池，默认使用按账号共享的连接池。
+        :param max_attachment_size: 单个附件的大小上限（字节），超过时抛出 `ValidationError`，不发送邮件。
+        :param stream_threshold: 超过该大小（字节）的附件在发送时流式编码，不整体载入内存。
+        :param retry_policy: 自定义的重试策略，默认使用共享的重试策略。
+        :param circuit_breaker: 自定义的熔断器，默认使用按发送目标共享的熔断器。
         """
         self.smtp_server = smtp_server
         self.smtp_port = int(smtp_port)
         self.sender_email = sender_email
         self.sender_password = sender_password
         self.use_tls = use_tls
+        self.max_attachment_size = max_attachment_size
+        self.stream_threshold = stream_threshold
         self.logger = default_logger
+        self._pool = pool
+        self._retry_policy = retry_policy or default_retry_policy
+        self._breaker = circuit_breaker or circuit_breakers.get(f"smtp:{smtp_server}:{self.smtp_port}")
 
     async def send(self, message: str, email_subject: str, email_recipients: List[str],  email_subtype: str = "plain", email_attachments: Optional[List[str]] = None, **kwargs: Any) -> Dict[str, Any]:
         """
@@ -124,39 +215,37 @@ class AsyncEmailSender(AsyncSender):
         :param kwargs: 其他可选参数，将传递给底层的 `AsyncEmailSender`。
         :return: 发送结果。
         """
-        msg_root = MIMEMultipart()
-        msg_root["From"] = self.sender_email
-        msg_root["To"] = ", ".join(email_recipients)
-        if email_subject is None:
-            raise SendMessageError("发送邮件失败: 邮件主题 (email_subject) 不能为空。")
-        msg_root["Subject"] = str(Header(email_subject, "utf-8"))
-        msg_root.attach(MIMEText(message, email_subtype, "utf-8"))
-
-        if email_attachments:
-            for file_path in email_attachments:
-                try:
-                    with open(file_path, "rb") as f:
-                        part = MIMEApplication(
-                            f.read(), Name=file_path.split("/")[-1])
-                    part["Content-Disposition"] = f'attachment; filename="{file_path.split("/")[-1]}"'
-                    msg_root.attach(part)
-                except Exception as e:
-                    self.logger.warning(f"⚠️ 添加附件 {file_path} 失败: {e}")
-
-        try:
-            # 对于端口 465，aiosmtplib 的 use_tls 应该设置为 True
-            if self.smtp_port == 465:
-                server = aiosmtplib.SMTP(
-                    hostname=self.smtp_server, port=self.smtp_port, use_tls=True)
+        async with _asuppress_duplicate(self, message, email_subject, email_recipients, email_subtype,
+                                        email_attachments) as duplicate:
+            if duplicate is not None:
+                return duplicate
+            # 附件的读取和编码在工作线程中进行，避免慢速磁盘阻塞事件循环
+            build_args = (self.sender_email, message, email_subject, email_recipients, email_subtype,
+                          email_attachments, self.max_attachment_size, self.stream_threshold, self.logger)
+            if email_attachments:
+                msg_root, streamed = await asyncio.to_thread(_build_message, *build_args)
             else:
-                server = aiosmtplib.SMTP(
-                    hostname=self.smtp_server, port=self.smtp_port, use_tls=self.use_tls)
+                msg_root, streamed = _build_message(*build_args)
 
-            async with server:
-                await server.login(self.sender_email, self.sender_password)
-                await server.sendmail(self.sender_email, email_recipients, msg_root.as_string())
+            try:
+                await self._retry_policy.call_async(guarded_async, self._breaker, self._deliver,
+                                                    msg_root, streamed, email_recipients)
                 self.logger.info(f"🎉 邮件发送成功至: {email_recipients}")
                 return {"status": "success", "recipients": email_recipients}
-        except Exception as e:
-            self.logger.error(f"🔥 发送邮件时发生错误: {e}")
-            raise SendMessageError(f"发送邮件失败: {e}")
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                self.logger.error(f"🔥 发送邮件时发生错误: {e}")
+                raise SendMessageError(f"发送邮件失败: {e}") from e
+
+    async def _deliver(self, msg_root: MIMEMultipart, streamed: List[str], email_recipients: List[str]) -> None:
+        """
+        通过 SMTP 连接池异步投递一封邮件，失败时不重试。
+        """
+        pool = self._pool or get_async_smtp_pool(
+            self.smtp_server, self.smtp_port, self.sender_email, self.sender_password, self.use_tls)
+        if streamed:
+            await pool.sendmail_stream(self.sender_email, email_recipients,
+                                       lambda: iter_message_chunks(msg_root, streamed))
+        else:
+            await pool.sendmail(self.sender_email, email_recipients, message_to_bytes(msg_root))
@@ -0,0 +1,221 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T13:00:00.000Z
+# 文件描述：大附件的流式编码，边读取文件边进行 base64 编码并直接写入 SMTP DATA 阶段。
+# 文件路径：xqcsendmessage/email/streaming.py
+
+import asyncio
+import base64
+import io
+import os
+import smtplib
+from email.generator import BytesGenerator
+from email.message import Message
+from email.mime.base import MIMEBase
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    import aiosmtplib
+
+CRLF = b"\r\n"
+# 每次从磁盘读取的字节数，为 57 的整数倍，保证每块都编码为完整的 76 字符行
+STREAM_CHUNK_SIZE = 57 * 1024
+# 超过该大小的附件不进入附件缓存，而是在发送时流式编码
+DEFAULT_STREAM_THRESHOLD = 8 * 1024 * 1024
+# 单个附件的默认大小上限
+DEFAULT_MAX_ATTACHMENT_SIZE = 100 * 1024 * 1024
+
+# 生成邮件分块的工厂函数，重试时需要重新生成
+ChunkFactory = Callable[[], Iterable[bytes]]
+# 异步流式写入 DATA 依赖的 aiosmtplib `SMTPProtocol` 接口（5.x），其中 `_drain_helper` 为私有方法
+_STREAM_PROTOCOL_METHODS = ("write", "_drain_helper", "read_response")
+
+
+def message_to_bytes(msg: Message) -> bytes:
+    """
+    将邮件序列化为使用 CRLF 换行的字节串，可直接用于 SMTP 发送。
+
+    :param msg: 邮件对象。
+    :return: 邮件字节串。
+    """
+    buf = io.BytesIO()
+    BytesGenerator(buf, policy=msg.policy.clone(linesep="\r\n")).flatten(msg)
+    return buf.getvalue()
+
+
+def _part_header_bytes(filename: str, policy) -> bytes:
+    """
+    生成附件 MIME 部分的头部（含结尾空行），与 `MIMEApplication` 的头部一致。
+    """
+    part = MIMEBase("application", "octet-stream", Name=filename)
+    part["Content-Transfer-Encoding"] = "base64"
+    part["Content-Disposition"] = f'attachment; filename="{filename}"'
+    part.set_payload("")
+    buf = io.BytesIO()
+    BytesGenerator(buf, policy=policy.clone(linesep="\r\n")).flatten(part)
+    return buf.getvalue()
+
+
+def _iter_base64_file(file_path: str) -> Iterator[bytes]:
+    """
+    分块读取文件并进行 base64 编码，内存占用与文件大小无关。
+    """
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield base64.encodebytes(chunk).replace(b"\n", CRLF)
+
+
+def iter_message_chunks(msg_root: Message, file_paths: List[str]) -> Iterator[bytes]:
+    """
+    生成带流式附件的完整邮件内容。`msg_root` 中已有的部分先整体序列化，
+    随后逐个追加流式编码的附件，最后写入结束分隔符。
+
+    :param msg_root: 不含流式附件的 multipart 邮件。
+    :param file_paths: 需要流式发送的附件路径列表。
+    :return: 邮件内容分块（CRLF 换行，未做点号转义）。
+    """
+    # 序列化时会为邮件分配分隔符
+    skeleton = message_to_bytes(msg_root)
+    boundary = msg_root.get_boundary().encode("ascii")
+    closing = b"--" + boundary + b"--"
+    index = skeleton.rfind(closing)
+    yield skeleton[:index]
+
+    for file_path in file_paths:
+        yield b"--" + boundary + CRLF + _part_header_bytes(os.path.basename(file_path), msg_root.policy)
+        yield from _iter_base64_file(file_path)
+        yield CRLF
+
+    yield skeleton[index:]
+
+
+def _quote_periods(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    对分块内容进行 SMTP 点号转义（行首的 "." 变为 ".."），正确处理跨分块的行首。
+    """
+    at_line_start = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if at_line_start and chunk.startswith(b"."):
+            chunk = b"." + chunk
+        chunk = chunk.replace(b"\n.", b"\n..")
+        at_line_start = chunk.endswith(b"\n")
+        yield chunk
+
+
+def stream_sendmail(smtp: smtplib.SMTP, from_addr: str, to_addrs: List[str],
+                    chunks: Iterable[bytes]) -> Dict[str, Tuple[int, bytes]]:
+    """
+    使用已登录的 SMTP 会话发送邮件，DATA 阶段逐块写入内容，不在内存中拼接完整邮件。
+
+    :param smtp: 已登录的 `smtplib.SMTP` 会话。
+    :param from_addr: 发件人。
+    :param to_addrs: 收件人列表。
+    :param chunks: 邮件内容分块（CRLF 换行）。
+    :return: 被拒绝的收件人，与 `smtplib.SMTP.sendmail` 的返回值一致。
+    """
+    smtp.ehlo_or_helo_if_needed()
+    code, resp = smtp.mail(from_addr)
+    if code != 250:
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+
+    refused: Dict[str, Tuple[int, bytes]] = {}
+    for addr in to_addrs:
+        code, resp = smtp.rcpt(addr)
+        if code not in (250, 251):
+            refused[addr] = (code, resp)
+    if len(refused) == len(to_addrs):
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    smtp.putcmd("data")
+    code, resp = smtp.getreply()
+    if code != 354:
+        raise smtplib.SMTPDataError(code, resp)
+
+    last = CRLF
+    for chunk in _quote_periods(chunks):
+        smtp.send(chunk)
+        last = chunk
+    smtp.send(b"." + CRLF if last.endswith(CRLF) else CRLF + b"." + CRLF)
+    code, resp = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
+
+
+def supports_async_streaming(smtp: "aiosmtplib.SMTP") -> bool:
+    """
+    判断 aiosmtplib 会话是否提供流式写入 DATA 所需的协议接口。aiosmtplib 调整内部实现后返回 False，
+    `stream_sendmail_async` 会退回到一次性发送。
+
+    :param smtp: `aiosmtplib.SMTP` 会话。
+    :return: 是否支持流式发送。
+    """
+    protocol = getattr(smtp, "protocol", None)
+    return protocol is not None and all(callable(getattr(protocol, name, None)) for name in _STREAM_PROTOCOL_METHODS)
+
+
+async def _sendmail_buffered(smtp: "aiosmtplib.SMTP", from_addr: str, to_addrs: List[str],
+                             chunks: Iterable[bytes]) -> Dict[str, Tuple[int, str]]:
+    """
+    在工作线程中拼接完整邮件后通过 `aiosmtplib.SMTP.sendmail` 一次性发送，内存占用与邮件大小相同。
+    """
+    data = await asyncio.to_thread(b"".join, chunks)
+    errors, _ = await smtp.sendmail(from_addr, to_addrs, data)
+    return {addr: (response.code, response.message) for addr, response in errors.items()}
+
+
+async def stream_sendmail_async(smtp: "aiosmtplib.SMTP", from_addr: str, to_addrs: List[str],
+                                chunks: Iterable[bytes]) -> Dict[str, Tuple[int, str]]:
+    """
+    `stream_sendmail` 的异步版本。分块在工作线程中生成，读取和编码附件不阻塞事件循环；
+    每块写入后等待写缓冲区排空，内存占用与附件大小无关。当前 aiosmtplib 不提供所需的协议接口时
+    （见 `supports_async_streaming`），退回到拼接完整邮件后一次性发送。
+
+    :param smtp: 已登录的 `aiosmtplib.SMTP` 会话。
+    :param from_addr: 发件人。
+    :param to_addrs: 收件人列表。
+    :param chunks: 邮件内容分块（CRLF 换行）。
+    :return: 被拒绝的收件人 -> (响应码, 响应内容)。
+    """
+    import aiosmtplib
+
+    if not supports_async_streaming(smtp):
+        return await _sendmail_buffered(smtp, from_addr, to_addrs, chunks)
+
+    await smtp.mail(from_addr)
+    refused: Dict[str, Tuple[int, str]] = {}
+    errors: List[aiosmtplib.SMTPRecipientRefused] = []
+    for addr in to_addrs:
+        try:
+            await smtp.rcpt(addr)
+        except aiosmtplib.SMTPRecipientRefused as e:
+            refused[addr] = (e.code, e.message)
+            errors.append(e)
+    if len(refused) == len(to_addrs):
+        raise aiosmtplib.SMTPRecipientsRefused(errors)
+
+    response = await smtp.execute_command(b"DATA")
+    if response.code != 354:
+        raise aiosmtplib.SMTPDataError(response.code, response.message)
+
+    protocol = smtp.protocol
+    pieces = _quote_periods(chunks)
+    last = CRLF
+    while True:
+        chunk = await asyncio.to_thread(next, pieces, None)
+        if chunk is None:
+            break
+        protocol.write(chunk)
+        last = chunk
+        # 连接的写缓冲区超过上限时等待数据发出，避免整封邮件堆积在内存中
+        await protocol._drain_helper()
+    protocol.write(b"." + CRLF if last.endswith(CRLF) else CRLF + b"." + CRLF)
+    response = await protocol.read_response(timeout=smtp.timeout)
+    if response.code != 250:
+        raise aiosmtplib.SMTPDataError(response.code, response.message)
+    return refused
@@ -0,0 +1,433 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T19:00:00.000Z
+# 文件描述：基于 SQLite（WAL 模式）的持久化发件箱，消息先写入本地文件，再由后台工作线程或协程至少投递一次。
+# 文件路径：xqcsendmessage/outbox.py
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .api import SEND_FUNCTIONS
+from .core.aggregator import bypass_aggregation
+from .core.exceptions import CircuitOpenError, HttpError, RateLimitError, SendMessageError, ValidationError
+from .core.logger import default_logger
+from .core.retry import default_retry_policy
+
+# 发件箱支持的平台：(同步发送函数, 异步发送函数)
+OUTBOX_PLATFORMS: Dict[str, Tuple[Callable[..., Any], Callable[..., Any]]] = SEND_FUNCTIONS
+
+# 消息被取出后的不可见时间（秒），超时未确认的消息会被重新投递
+DEFAULT_VISIBILITY_TIMEOUT = 300.0
+# 每条消息最多投递次数，超过后移入死信
+DEFAULT_OUTBOX_MAX_ATTEMPTS = 8
+# 投递失败后的重试等待时间（秒），按 2 的指数增长，不超过 `max_delay`
+DEFAULT_OUTBOX_BASE_DELAY = 5.0
+DEFAULT_OUTBOX_MAX_DELAY = 600.0
+# 每次取出并在同一事务中确认的消息数
+DEFAULT_OUTBOX_BATCH_SIZE = 20
+# 队列为空时工作线程的轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 1.0
+
+PENDING = "pending"
+DEAD = "dead"
+
+
+class OutboxMessage(NamedTuple):
+    """
+    从发件箱取出的一条消息。
+    """
+    id: int
+    platform: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class _Suppressed(SendMessageError):
+    """
+    消息被去重跳过，没有实际发送，需要在去重窗口结束后重新投递。
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _check_result(result: Any) -> None:
+    """
+    检查发送函数的返回值，只有实际送达时才视为成功：被去重跳过时抛出 `_Suppressed`，
+    平台返回非 0 错误码时抛出 `HttpError`（可重试的错误码会重新排期）。
+    """
+    if not isinstance(result, dict):
+        return
+    if result.get("status") == "duplicate":
+        raise _Suppressed("消息被去重跳过，未实际发送", result.get("retry_after"))
+    for response in [result, *result.get("parts", [])]:
+        errcode = response.get("errcode", 0) if isinstance(response, dict) else 0
+        if errcode not in (0, None):
+            raise HttpError(f"投递失败: {response.get('errmsg')}", errcode=errcode)
+
+
+def _is_transient(error: BaseException) -> bool:
+    """
+    判断投递错误是否值得稍后重试。邮件发送器会把底层错误包装为 `SendMessageError`，同时检查原始错误。
+    """
+    for e in (error, error.__cause__):
+        if e is not None and (isinstance(e, (CircuitOpenError, RateLimitError, _Suppressed))
+                              or default_retry_policy.is_retryable(e)):
+            return True
+    return False
+
+
+class Outbox:
+    """
+    持久化发件箱。
+
+    `enqueue` 只在本地 SQLite 文件中写入一行并提交（WAL 模式，进程崩溃不会丢失），随后立即返回；
+    工作线程（`start`）或协程（`run_async`）按批取出到期的消息，通过 `send_email`、`send_dingtalk` 等
+    顶层函数投递，并在一个事务中确认整批结果：成功的消息被删除，临时性错误按指数退避重新排期，
+    超过 `max_attempts` 次或不可重试的错误移入死信。
+
+    取出的消息在 `visibility_timeout` 秒内对其他工作者不可见，工作者中途退出时消息会在超时后被重新投递，
+    因此同一条消息可能被投递多次（至少一次）。同一文件可以被多个进程同时使用。
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+                 max_attempts: int = DEFAULT_OUTBOX_MAX_ATTEMPTS, base_delay: float = DEFAULT_OUTBOX_BASE_DELAY,
+                 max_delay: float = DEFAULT_OUTBOX_MAX_DELAY, batch_size: int = DEFAULT_OUTBOX_BATCH_SIZE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        初始化发件箱。
+
+        :param path: SQLite 数据库文件路径。
+        :param visibility_timeout: 消息被取出后的不可见时间（秒），应大于投递一批消息所需的时间。
+        :param max_attempts: 每条消息最多投递次数。
+        :param base_delay: 第一次重试前的等待时间（秒）。
+        :param max_delay: 重试等待时间的上限（秒）。
+        :param batch_size: 每次取出并确认的消息数。
+        :param poll_interval: 队列为空时工作线程的轮询间隔（秒）。
+        """
+        if visibility_timeout <= 0 or max_attempts < 1 or batch_size < 1 or poll_interval <= 0:
+            raise ValidationError("❌ visibility_timeout、max_attempts、batch_size、poll_interval 必须大于 0。")
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.logger = default_logger
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._workers: List[threading.Thread] = []
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, platform TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, "
+            "lease TEXT, last_error TEXT, created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (status, available_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # 每个线程复用一个连接，fork 出的子进程重新建立连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        在一个 `BEGIN IMMEDIATE` 事务中执行 `work`。
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    @staticmethod
+    def _encode(item: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        校验并序列化一条消息，返回 (平台, JSON 参数)。
+        """
+        kwargs = {k: v for k, v in item.items() if k != "platform"}
+        platform = item.get("platform")
+        if platform not in OUTBOX_PLATFORMS:
+            raise ValidationError(f"❌ 不支持的平台: {platform}，支持 {', '.join(OUTBOX_PLATFORMS)}。")
+        try:
+            return platform, json.dumps(kwargs, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            raise ValidationError(f"❌ 发件箱消息的参数必须可以 JSON 序列化: {e}")
+
+    def enqueue(self, platform: str, **kwargs: Any) -> int:
+        """
+        将一条消息写入发件箱。
+
+        :param platform: 平台，"email", "dingtalk", "wecom_webhook" 或 "wecom_app"。
+        :param kwargs: 对应顶层发送函数（如 `send_email`、`send_wecom_app`）的参数，必须可以 JSON 序列化。
+        :return: 消息 ID。
+        """
+        return self.enqueue_many([dict(kwargs, platform=platform)])[0]
+
+    def enqueue_many(self, items: List[Dict[str, Any]]) -> List[int]:
+        """
+        在一个事务中写入多条消息。
+
+        :param items: 消息列表，每项为字典，`platform` 为平台，其余键为对应顶层发送函数的参数。
+        :return: 各消息的 ID。
+        """
+        rows = [self._encode(item) for item in items]
+        now = time.time()
+
+        def insert(conn: sqlite3.Connection) -> List[int]:
+            ids = []
+            for platform, payload in rows:
+                cursor = conn.execute(
+                    "INSERT INTO outbox (platform, payload, status, available_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (platform, payload, PENDING, now, now))
+                ids.append(cursor.lastrowid)
+            return ids
+
+        ids = self._transaction(insert)
+        self._wakeup.set()
+        return ids
+
+    def claim(self, limit: Optional[int] = None) -> Tuple[str, List[OutboxMessage]]:
+        """
+        取出最多 `limit` 条到期的消息，在 `visibility_timeout` 秒内不会被再次取出。
+
+        :param limit: 最多取出的消息数，默认为 `batch_size`。
+        :return: (租约 ID, 消息列表)，确认结果时需要提供租约 ID。
+        """
+        lease = uuid.uuid4().hex
+        now = time.time()
+
+        def take(conn: sqlite3.Connection) -> List[OutboxMessage]:
+            rows = conn.execute(
+                "SELECT id, platform, payload, attempts FROM outbox WHERE status = ? AND available_at <= ? "
+                "ORDER BY available_at, id LIMIT ?", (PENDING, now, limit or self.batch_size)).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET available_at = ?, lease = ?, attempts = attempts + 1 WHERE id = ?",
+                [(now + self.visibility_timeout, lease, row[0]) for row in rows])
+            return [OutboxMessage(row[0], row[1], json.loads(row[2]), row[3] + 1) for row in rows]
+
+        return lease, self._transaction(take)
+
+    def _retry_delay(self, attempts: int, error: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+        retry_after = getattr(error, "retry_after", None)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def complete(self, lease: str, results: List[Tuple[OutboxMessage, Optional[BaseException]]]) -> None:
+        """
+        在一个事务中确认一批消息的投递结果。租约已过期并被其他工作者取走的消息不会被修改。
+
+        :param lease: `claim` 返回的租约 ID。
+        :param results: (消息, 错误) 列表，错误为 None 表示投递成功。
+        """
+        now = time.time()
+        done, retry, dead = [], [], []
+        for message, error in results:
+            if error is None:
+                done.append((message.id, lease))
+            elif message.attempts < self.max_attempts and _is_transient(error):
+                retry.append((now + self._retry_delay(message.attempts, error), str(error), message.id, lease))
+            else:
+                self.logger.error(f"🔥 发件箱消息 {message.id} 投递 {message.attempts} 次后失败，移入死信: {error}")
+                dead.append((DEAD, str(error), message.id, lease))
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.executemany("DELETE FROM outbox WHERE id = ? AND lease = ?", done)
+            conn.executemany(
+                "UPDATE outbox SET available_at = ?, last_error = ?, lease = NULL WHERE id = ? AND lease = ?", retry)
+            conn.executemany(
+                "UPDATE outbox SET status = ?, last_error = ?, lease = NULL WHERE id = ? AND lease = ?", dead)
+
+        self._transaction(write)
+
+    def _deliver(self, message: OutboxMessage) -> Optional[BaseException]:
+        # 绕过消息合并：合并器只返回排队结果，无法确认消息已送达
+        try:
+            with bypass_aggregation():
+                _check_result(OUTBOX_PLATFORMS[message.platform][0](**message.payload))
+            return None
+        except Exception as e:
+            return e
+
+    async def _deliver_async(self, message: OutboxMessage, semaphore: asyncio.Semaphore) -> Optional[BaseException]:
+        async with semaphore:
+            try:
+                with bypass_aggregation():
+                    _check_result(await OUTBOX_PLATFORMS[message.platform][1](**message.payload))
+                return None
+            except Exception as e:
+                return e
+
+    def process_batch(self) -> int:
+        """
+        取出一批到期的消息并按顺序投递。
+
+        :return: 处理的消息数。
+        """
+        lease, messages = self.claim()
+        if messages:
+            self.complete(lease, [(message, self._deliver(message)) for message in messages])
+        return len(messages)
+
+    async def process_batch_async(self, concurrency: int = 4) -> int:
+        """
+        异步取出一批到期的消息并发投递。数据库读写在工作线程中进行，不阻塞事件循环。
+
+        :param concurrency: 同时投递的消息数。
+        :return: 处理的消息数。
+        """
+        lease, messages = await asyncio.to_thread(self.claim)
+        if messages:
+            semaphore = asyncio.Semaphore(concurrency)
+            errors = await asyncio.gather(*(self._deliver_async(m, semaphore) for m in messages))
+            await asyncio.to_thread(self.complete, lease, list(zip(messages, errors)))
+        return len(messages)
+
+    def drain(self) -> int:
+        """
+        在当前线程中投递所有到期的消息，直到没有到期的消息为止。
+
+        :return: 处理的消息数。
+        """
+        total = 0
+        while True:
+            count = self.process_batch()
+            if not count:
+                return total
+            total += count
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self.process_batch():
+                    continue
+            except Exception as e:
+                self.logger.error(f"🔥 发件箱工作线程出错: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self, workers: int = 2) -> None:
+        """
+        启动后台工作线程持续投递消息。
+
+        :param workers: 工作线程数。
+        """
+        self._stopping.clear()
+        self._workers = [w for w in self._workers if w.is_alive()]
+        for index in range(len(self._workers), workers):
+            worker = threading.Thread(target=self._run, name=f"xqc-outbox-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        停止后台工作线程，等待正在投递的一批消息完成。
+
+        :param timeout: 等待每个线程退出的最长时间（秒），默认一直等待。
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = [w for w in self._workers if w.is_alive()]
+
+    async def run_async(self, concurrency: int = 4) -> None:
+        """
+        在当前事件循环中持续投递消息，直到任务被取消。
+
+        :param concurrency: 同时投递的消息数。
+        """
+        while True:
+            try:
+                if await self.process_batch_async(concurrency):
+                    continue
+            except Exception as e:
+                self.logger.error(f"🔥 发件箱投递任务出错: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        统计发件箱中的消息数。
+
+        :return: `pending`（等待投递）、`inflight`（已取出未确认）、`dead`（死信）的数量。
+        """
+        now = time.time()
+        conn = self._connection()
+        pending, inflight, dead = conn.execute(
+            "SELECT "
+            "COALESCE(SUM(status = ? AND (lease IS NULL OR available_at <= ?)), 0), "
+            "COALESCE(SUM(status = ? AND lease IS NOT NULL AND available_at > ?), 0), "
+            "COALESCE(SUM(status = ?), 0) FROM outbox", (PENDING, now, PENDING, now, DEAD)).fetchone()
+        return {"pending": pending, "inflight": inflight, "dead": dead}
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        获取死信。
+
+        :param limit: 最多返回的条数。
+        :return: 死信列表，每项包含 `id`, `platform`, `payload`, `attempts`, `last_error`, `created_at`。
+        """
+        rows = self._connection().execute(
+            "SELECT id, platform, payload, attempts, last_error, created_at FROM outbox "
+            "WHERE status = ? ORDER BY id LIMIT ?", (DEAD, limit)).fetchall()
+        return [{"id": row[0], "platform": row[1], "payload": json.loads(row[2]), "attempts": row[3],
+                 "last_error": row[4], "created_at": row[5]} for row in rows]
+
+    def requeue_dead(self, ids: Optional[List[int]] = None) -> int:
+        """
+        将死信重新放回发件箱，投递次数清零。
+
+        :param ids: 要重新投递的消息 ID，默认为全部死信。
+        :return: 重新投递的消息数。
+        """
+        now = time.time()
+        conn = self._connection()
+        if ids is None:
+            cursor = conn.execute("UPDATE outbox SET status = ?, attempts = 0, available_at = ? WHERE status = ?",
+                                  (PENDING, now, DEAD))
+        else:
+            cursor = conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = 0, available_at = ? WHERE status = ? AND id = ?",
+                [(PENDING, now, DEAD, message_id) for message_id in ids])
+        self._wakeup.set()
+        return cursor.rowcount
+
+    def purge_dead(self) -> int:
+        """
+        删除所有死信。
+
+        :return: 删除的消息数。
+        """
+        return self._connection().execute("DELETE FROM outbox WHERE status = ?", (DEAD,)).rowcount
+
+    def close(self) -> None:
+        """
+        停止后台工作线程并关闭当前线程的数据库连接。
+        """
+        self.stop()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,255 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T20:30:00.000Z
+# 文件描述：按优先级调度异步发送，每个通道有独立的工作协程池，并为紧急消息预留工作协程，批量消息按等待时间逐步提升优先级。
+# 文件路径：xqcsendmessage/scheduler.py
+
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .api import SEND_FUNCTIONS
+from .core.exceptions import QueueFullError, ValidationError
+
+# 优先级：数值越小越先发送
+PRIORITIES = {"urgent": 0, "normal": 1, "bulk": 2}
+# 每个通道的工作协程数
+DEFAULT_CHANNEL_WORKERS = 4
+# 每个通道中只处理紧急消息的工作协程数
+DEFAULT_RESERVED_URGENT = 1
+# 优先级每低一级，排序时相当于晚提交的秒数；等待超过该时长的低优先级消息会排到新提交的高优先级消息前面
+DEFAULT_AGING = 10.0
+
+
+class _Task:
+    __slots__ = ("func", "args", "kwargs", "future")
+
+    def __init__(self, func: Callable[..., Awaitable[Any]], args: tuple, kwargs: Dict[str, Any],
+                 future: "asyncio.Future[Any]"):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+
+
+class _Channel:
+    """
+    一个通道的队列和工作协程。紧急消息和其他消息分别放在两个堆中，预留的工作协程只从紧急堆中取。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.urgent: List[Tuple[float, int, _Task]] = []
+        self.other: List[Tuple[float, int, _Task]] = []
+        # 空闲的工作协程等待的 Future，分为预留（只处理紧急任务）和普通两组
+        self.idle_reserved: Deque["asyncio.Future[None]"] = deque()
+        self.idle_general: Deque["asyncio.Future[None]"] = deque()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.unfinished = 0
+        self.running = 0
+        self.workers: List["asyncio.Task[None]"] = []
+
+    def has_work(self, reserved: bool) -> bool:
+        return bool(self.urgent) or (not reserved and bool(self.other))
+
+    def pop(self, reserved: bool) -> _Task:
+        """
+        取出排序值最小的任务，调用方需确认 `has_work(reserved)` 为真。
+        """
+        if reserved or not self.other or (self.urgent and self.urgent[0] <= self.other[0]):
+            return heapq.heappop(self.urgent)[2]
+        return heapq.heappop(self.other)[2]
+
+    def wake(self, urgent: bool) -> None:
+        """
+        唤醒一个能处理新任务的空闲工作协程，紧急任务优先交给预留的工作协程。
+        """
+        queues = (self.idle_reserved, self.idle_general) if urgent else (self.idle_general,)
+        for queue in queues:
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+
+
+class PriorityScheduler:
+    """
+    优先级发送调度器，放在异步发送函数之前使用。
+
+    每个通道（如 'email'、'dingtalk'）有独立的 `workers` 个工作协程，批量发送邮件时不会占用钉钉的发送能力。
+    通道内的消息按优先级 'urgent'、'normal'、'bulk' 排序，其中 `reserved_urgent` 个工作协程只处理紧急消息，
+    即使其他工作协程都在发送批量消息，紧急消息也能立即开始发送。排序值为“提交时间 + 优先级 × aging”，
+    低优先级消息等待 `aging` 秒后与新提交的高一级消息同等对待，因此批量消息不会一直得不到发送。
+
+    调度器绑定在第一次提交时所在的事件循环上。限流仍按 Webhook 生效，紧急消息与批量消息使用同一个 Webhook 时仍需等待令牌。
+    """
+
+    def __init__(self, workers: int = DEFAULT_CHANNEL_WORKERS, reserved_urgent: int = DEFAULT_RESERVED_URGENT,
+                 aging: float = DEFAULT_AGING, channel_workers: Optional[Dict[str, int]] = None,
+                 max_queue_size: Optional[int] = None):
+        """
+        初始化优先级调度器。
+
+        :param workers: 每个通道的工作协程数。
+        :param reserved_urgent: 每个通道中只处理紧急消息的工作协程数，必须小于该通道的工作协程数。
+        :param aging: 优先级每低一级相当于晚提交的秒数，越小批量消息越早被提升。
+        :param channel_workers: 按通道覆盖工作协程数，例如 {"email": 8}。
+        :param max_queue_size: 每个通道最多排队的消息数，超过时抛出 `QueueFullError`，默认不限制。
+        """
+        channel_workers = dict(channel_workers or {})
+        if reserved_urgent < 0 or aging < 0:
+            raise ValidationError("❌ reserved_urgent 和 aging 不能为负数。")
+        for count in [workers, *channel_workers.values()]:
+            if count <= reserved_urgent:
+                raise ValidationError("❌ 每个通道的工作协程数必须大于 reserved_urgent。")
+        if max_queue_size is not None and max_queue_size < 1:
+            raise ValidationError("❌ max_queue_size 必须大于 0。")
+        self.workers = workers
+        self.reserved_urgent = reserved_urgent
+        self.aging = aging
+        self.channel_workers = channel_workers
+        self.max_queue_size = max_queue_size
+        self._channels: Dict[str, _Channel] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counter = itertools.count()
+        self._closed = False
+
+    def _channel(self, name: str) -> _Channel:
+        """
+        获取通道，不存在时创建并启动其工作协程。
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop:
+            raise ValidationError("❌ 优先级调度器只能在创建工作协程的事件循环中使用。")
+        channel = self._channels.get(name)
+        if channel is None:
+            channel = self._channels[name] = _Channel(name)
+            count = self.channel_workers.get(name, self.workers)
+            channel.workers = [loop.create_task(self._worker(channel, i < self.reserved_urgent))
+                               for i in range(count)]
+        return channel
+
+    async def _worker(self, channel: _Channel, reserved: bool) -> None:
+        idle = channel.idle_reserved if reserved else channel.idle_general
+        while True:
+            if not channel.has_work(reserved):
+                waiter = self._loop.create_future()
+                idle.append(waiter)
+                try:
+                    await waiter
+                finally:
+                    if not waiter.done():
+                        idle.remove(waiter)
+                continue
+            task = channel.pop(reserved)
+            channel.running += 1
+            try:
+                # 调用方已取消的任务不再发送
+                if not task.future.done():
+                    try:
+                        result = await task.func(*task.args, **task.kwargs)
+                    except asyncio.CancelledError:
+                        task.future.cancel()
+                        raise
+                    except BaseException as e:
+                        if not task.future.done():
+                            task.future.set_exception(e)
+                    else:
+                        if not task.future.done():
+                            task.future.set_result(result)
+            finally:
+                channel.running -= 1
+                channel.unfinished -= 1
+                if channel.unfinished == 0:
+                    channel.idle.set()
+
+    def submit(self, channel: str, func: Callable[..., Awaitable[Any]], *args: Any, priority: str = "normal",
+               **kwargs: Any) -> "asyncio.Future[Any]":
+        """
+        提交一个异步函数到通道中排队执行，需要在事件循环中调用。
+
+        :param channel: 通道名称，同一通道的任务共用工作协程。
+        :param func: 异步函数，例如 `send_dingtalk_async`。
+        :param args: 位置参数。
+        :param priority: 优先级，'urgent'、'normal' 或 'bulk'。
+        :param kwargs: 关键字参数。
+        :return: 任务的 Future，可以 await 获取结果，取消后尚未开始的任务不再执行。
+        """
+        level = PRIORITIES.get(priority)
+        if level is None:
+            raise ValidationError(f"❌ 无效的优先级: {priority}，支持 {', '.join(PRIORITIES)}。")
+        if self._closed:
+            raise ValidationError("❌ 优先级调度器已关闭。")
+        lane = self._channel(channel)
+        heap = lane.urgent if level == 0 else lane.other
+        if self.max_queue_size is not None and len(lane.urgent) + len(lane.other) >= self.max_queue_size:
+            raise QueueFullError(f"❌ 通道 {channel} 的发送队列已满（{self.max_queue_size}）。")
+        future = self._loop.create_future()
+        key = self._loop.time() + level * self.aging
+        heapq.heappush(heap, (key, next(self._counter), _Task(func, args, kwargs, future)))
+        lane.unfinished += 1
+        lane.idle.clear()
+        lane.wake(level == 0)
+        return future
+
+    async def send(self, platform: str, priority: str = "normal", **kwargs: Any) -> Any:
+        """
+        按优先级发送一条消息并等待结果，通道即平台。
+
+        :param platform: 平台，"email", "dingtalk", "wecom_webhook" 或 "wecom_app"。
+        :param priority: 优先级，'urgent'、'normal' 或 'bulk'。
+        :param kwargs: 对应顶层发送函数（如 `send_dingtalk_async`）的参数。
+        :return: 发送函数的返回值。
+        """
+        if platform not in SEND_FUNCTIONS:
+            raise ValidationError(f"❌ 不支持的平台: {platform}，支持 {', '.join(SEND_FUNCTIONS)}。")
+        return await self.submit(platform, SEND_FUNCTIONS[platform][1], priority=priority, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取各通道的排队情况，用于监控。
+
+        :return: 通道名称 -> {"urgent": 排队的紧急任务数, "queued": 排队的其他任务数, "running": 正在执行的任务数}。
+        """
+        return {name: {"urgent": len(c.urgent), "queued": len(c.other), "running": c.running}
+                for name, c in self._channels.items()}
+
+    async def join(self) -> None:
+        """
+        等待所有已提交的任务完成。
+        """
+        for channel in list(self._channels.values()):
+            await channel.idle.wait()
+
+    async def close(self, wait: bool = True) -> None:
+        """
+        关闭调度器并停止工作协程。
+
+        :param wait: 是否先等待已提交的任务完成，为 False 时取消排队和正在执行的任务。
+        """
+        self._closed = True
+        if wait:
+            await self.join()
+        workers = []
+        for channel in self._channels.values():
+            for _, _, task in channel.urgent + channel.other:
+                task.future.cancel()
+            channel.unfinished -= len(channel.urgent) + len(channel.other)
+            channel.urgent.clear()
+            channel.other.clear()
+            workers.extend(channel.workers)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def __aenter__(self) -> "PriorityScheduler":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        await self.close()
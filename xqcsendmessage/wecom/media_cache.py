@@ -0,0 +1,180 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T14:00:00.000Z
+# 文件描述：企业微信临时素材 media_id 缓存，按文件内容哈希复用已上传的素材，支持可选的 SQLite 磁盘存储。
+# 文件路径：xqcsendmessage/wecom/media_cache.py
+
+import contextlib
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from ..core.exceptions import SendMessageError
+
+# 临时素材有效期为 3 天，缓存时间比有效期少 1 小时，避免使用即将失效的 media_id
+MEDIA_ID_TTL = 3 * 24 * 3600 - 3600
+# 企业微信返回的素材失效错误码：40007 不合法的媒体文件 id
+MEDIA_INVALID_ERRCODES = (40007,)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path: str) -> str:
+    """
+    分块计算文件内容的 SHA-256 摘要。
+
+    :param file_path: 文件路径。
+    :return: 十六进制摘要。
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        raise SendMessageError(f"❌ 图片文件未找到: {file_path}")
+    return digest.hexdigest()
+
+
+def make_media_key(corpid: str, media_type: str, digest: str) -> str:
+    """
+    生成缓存键。临时素材属于企业，同一企业下的应用共享缓存。
+
+    :param corpid: 企业 ID。
+    :param media_type: 素材类型，如 'image'。
+    :param digest: 文件内容摘要。
+    :return: 缓存键。
+    """
+    return f"{corpid}:{media_type}:{digest}"
+
+
+class MediaCache:
+    """
+    media_id 缓存。始终使用进程内存储，设置 `path` 后同时写入 SQLite 文件，
+    进程重启或同一主机上的其他进程也可以复用已上传的素材。
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = MEDIA_ID_TTL):
+        """
+        初始化 media_id 缓存。
+
+        :param path: SQLite 数据库文件路径，默认不使用磁盘存储。
+        :param ttl: media_id 的缓存时间（秒）。
+        """
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.path: Optional[str] = None
+        self.set_path(path)
+
+    def set_path(self, path: Optional[str]) -> None:
+        """
+        设置或取消 SQLite 磁盘存储。
+
+        :param path: SQLite 数据库文件路径，为 None 时只使用进程内存储。
+        """
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with contextlib.closing(sqlite3.connect(path, timeout=30)) as conn, conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS wecom_media ("
+                    "key TEXT PRIMARY KEY, media_id TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作使用新连接，兼容多线程和 fork 出的子进程
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        获取未过期的 media_id。
+
+        :param key: 缓存键。
+        :return: media_id，不存在或已过期时返回 None。
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry[1]:
+                    return entry[0]
+                del self._entries[key]
+
+        if self.path is None:
+            return None
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT media_id, expires_at FROM wecom_media WHERE key = ? AND expires_at > ?",
+                (key, now)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._entries[key] = (row[0], row[1])
+        return row[0]
+
+    def set(self, key: str, media_id: str) -> None:
+        """
+        保存新上传的 media_id。
+
+        :param key: 缓存键。
+        :param media_id: 企业微信返回的 media_id。
+        """
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._prune(expires_at - self.ttl)
+            self._entries[key] = (media_id, expires_at)
+        if self.path is not None:
+            with contextlib.closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO wecom_media (key, media_id, expires_at) VALUES (?, ?, ?)",
+                    (key, media_id, expires_at))
+                conn.execute("DELETE FROM wecom_media WHERE expires_at <= ?", (expires_at - self.ttl,))
+
+    def delete(self, key: str) -> None:
+        """
+        删除 media_id，用于企业微信提示素材失效时。
+
+        :param key: 缓存键。
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.path is not None:
+            with contextlib.closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM wecom_media WHERE key = ?", (key,))
+
+    def _prune(self, now: float) -> None:
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        """
+        清空进程内缓存，不影响磁盘存储中的数据。
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+# 所有企业微信应用发送器共享的 media_id 缓存
+media_cache = MediaCache()
+
+
+def set_media_cache_path(path: Optional[str]) -> None:
+    """
+    设置 media_id 缓存的 SQLite 磁盘存储路径。
+
+    :param path: SQLite 数据库文件路径，为 None 时只使用进程内存储。
+    """
+    media_cache.set_path(path)
+
+
+def clear_media_cache() -> None:
+    """
+    清空进程内的 media_id 缓存。
+    """
+    media_cache.clear()
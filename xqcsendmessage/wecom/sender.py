@@ -4,12 +4,37 @@
 # 文件描述：企业微信消息发送器
 # 文件路径：xqcsendmessage/wecom/sender.py
 
+import asyncio
+import threading
 import httpx
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
 from ..core.abc import Sender, AsyncSender
 from ..core.exceptions import HttpError, AuthError, SendMessageError
+from ..core.http import get_http_client, get_async_http_client
 from ..core.logger import default_logger
+from ..core.payload import request_body
+from ..core.chunker import split_payload, send_parts, send_parts_async
+from ..core.ratelimit import RateLimiter, webhook_rate_limiter
+from ..core.dedup import asuppress_duplicate, suppress_duplicate
+from ..core.circuit import CircuitBreaker, circuit_breakers, guarded, guarded_async
+from ..core.retry import RetryPolicy, default_retry_policy, http_error
+from ..core.utils import multipart_file_stream, redact_url
+from .token import token_cache, DEFAULT_TOKEN_EXPIRES_IN, TOKEN_EXPIRED_ERRCODES
+from .media_cache import media_cache, file_digest, make_media_key, MEDIA_INVALID_ERRCODES
+
+# 企业微信群机器人和应用消息内容的最大字节数
+WECOM_WEBHOOK_BYTE_LIMITS = {"text": 2048, "markdown": 4096}
+WECOM_APP_BYTE_LIMITS = {"text": 2048, "markdown": 2048}
+
+
+def _summary_message(message: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """
+    构建发给原消息接收人的重复消息汇总。
+    """
+    summary = {k: message[k] for k in ("touser", "toparty", "totag") if message.get(k) is not None}
+    summary.update(msgtype="text", text={"content": text})
+    return summary
 
 
 class WeComWebhookSender(Sender):
@@ -17,14 +42,26 @@ class WeComWebhookSender(Sender):
     企业微信 Webhook 同步消息发送器。
     """
 
-    def __init__(self, webhook: str):
+    MESSAGE_BYTE_LIMITS = WECOM_WEBHOOK_BYTE_LIMITS
+
+    def __init__(self, webhook: str, client: Optional[httpx.Client] = None,
+                 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         """
         初始化企业微信 Webhook 同步发送器。
 
         :param webhook: 企业微信机器人的 Webhook 地址。
+        :param client: 自定义的 HTTP 客户端，默认使用进程级共享连接池。
+        :param rate_limiter: 自定义的限流器，默认使用按 Webhook 限流的共享限流器。
+        :param retry_policy: 自定义的重试策略，默认使用共享的重试策略。
+        :param circuit_breaker: 自定义的熔断器，默认使用按发送目标共享的熔断器。
         """
         self.webhook = webhook
         self.logger = default_logger
+        self._client = client
+        self._rate_limiter = rate_limiter or webhook_rate_limiter
+        self._retry_policy = retry_policy or default_retry_policy
+        self._breaker = circuit_breaker or circuit_breakers.get(redact_url(webhook))
 
     def send(self, message: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
         """
@@ -35,21 +72,37 @@ class WeComWebhookSender(Sender):
         :return: API 响应。
         """
         message.update(kwargs) # 合并额外的关键字参数
+        with suppress_duplicate(self.webhook, message,
+                                lambda text: self.send({"msgtype": "text", "text": {"content": text}})) as duplicate:
+            if duplicate is not None:
+                return duplicate
+            parts = split_payload(message, self.MESSAGE_BYTE_LIMITS)
+            if len(parts) > 1:
+                return send_parts(self, parts)
+            return self._retry_policy.call(guarded, self._breaker, self._post, message)
+
+    def _post(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        发送一条企业微信 Webhook 消息，失败时不重试。
+
+        :param message: 消息内容。
+        :return: API 响应。
+        """
+        self._rate_limiter.acquire(self.webhook)
         headers = {"Content-Type": "application/json"}
         try:
-            with httpx.Client() as client:
-                response = client.post(
-                    self.webhook, headers=headers, json=message)
-                response.raise_for_status()
-                result = response.json()
-                if result.get("errcode") != 0:
-                    raise HttpError(f"发送企业微信消息失败: {result.get('errmsg')}")
-                self.logger.info(f"🎉 企业微信 Webhook 消息发送成功: {result}")
-                return result
+            client = self._client or get_http_client()
+            response = client.post(
+                self.webhook, headers=headers, **request_body(message))
+            response.raise_for_status()
+            result = response.json()
+            if result.get("errcode") != 0:
+                raise HttpError(f"发送企业微信消息失败: {result.get('errmsg')}", errcode=result.get("errcode"))
+            self.logger.info(f"🎉 企业微信 Webhook 消息发送成功: {result}")
+            return result
         except httpx.HTTPStatusError as e:
             self.logger.error(f"🔥 企业微信 Webhook 消息发送失败: {e.response.text}")
-            raise HttpError(
-                f"发送企业微信消息失败: {e.response.text}", e.response.status_code)
+            raise http_error(f"发送企业微信消息失败: {e.response.text}", e.response)
         except Exception as e:
             self.logger.error(f"🔥 发送企业微信 Webhook 消息时发生未知错误: {e}")
             raise
@@ -60,14 +113,26 @@ class AsyncWeComWebhookSender(AsyncSender):
     企业微信 Webhook 异步消息发送器。
     """
 
-    def __init__(self, webhook: str):
+    MESSAGE_BYTE_LIMITS = WECOM_WEBHOOK_BYTE_LIMITS
+
+    def __init__(self, webhook: str, client: Optional[httpx.AsyncClient] = None,
+                 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         """
         初始化企业微信 Webhook 异步发送器。
 
         :param webhook: 企业微信机器人的 Webhook 地址。
+        :param client: 自定义的异步 HTTP 客户端，默认使用当前事件循环的共享连接池。
+        :param rate_limiter: 自定义的限流器，默认使用按 Webhook 限流的共享限流器。
+        :param retry_policy: 自定义的重试策略，默认使用共享的重试策略。
+        :param circuit_breaker: 自定义的熔断器，默认使用按发送目标共享的熔断器。
         """
         self.webhook = webhook
         self.logger = default_logger
+        self._client = client
+        self._rate_limiter = rate_limiter or webhook_rate_limiter
+        self._retry_policy = retry_policy or default_retry_policy
+        self._breaker = circuit_breaker or circuit_breakers.get(redact_url(webhook))
 
     async def send(self, message: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
         """
@@ -78,20 +143,36 @@ class AsyncWeComWebhookSender(AsyncSender):
         :return: API 响应。
         """
         message.update(kwargs) # 合并额外的关键字参数
+        async with asuppress_duplicate(self.webhook, message,
+                                       lambda text: self.send({"msgtype": "text", "text": {"content": text}})) as duplicate:
+            if duplicate is not None:
+                return duplicate
+            parts = split_payload(message, self.MESSAGE_BYTE_LIMITS)
+            if len(parts) > 1:
+                return await send_parts_async(self, parts)
+            return await self._retry_policy.call_async(guarded_async, self._breaker, self._post, message)
+
+    async def _post(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        异步发送一条企业微信 Webhook 消息，失败时不重试。
+
+        :param message: 消息内容。
+        :return: API 响应。
+        """
+        await self._rate_limiter.acquire_async(self.webhook)
         headers = {"Content-Type": "application/json"}
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(self.webhook, headers=headers, json=message)
-                response.raise_for_status()
-                result = response.json()
-                if result.get("errcode") != 0:
-                    raise HttpError(f"发送企业微信消息失败: {result.get('errmsg')}")
-                self.logger.info(f"🎉 企业微信 Webhook 消息发送成功: {result}")
-                return result
+            client = self._client or get_async_http_client()
+            response = await client.post(self.webhook, headers=headers, **request_body(message))
+            response.raise_for_status()
+            result = response.json()
+            if result.get("errcode") != 0:
+                raise HttpError(f"发送企业微信消息失败: {result.get('errmsg')}", errcode=result.get("errcode"))
+            self.logger.info(f"🎉 企业微信 Webhook 消息发送成功: {result}")
+            return result
         except httpx.HTTPStatusError as e:
             self.logger.error(f"🔥 企业微信 Webhook 消息发送失败: {e.response.text}")
-            raise HttpError(
-                f"发送企业微信消息失败: {e.response.text}", e.response.status_code)
+            raise http_error(f"发送企业微信消息失败: {e.response.text}", e.response)
         except Exception as e:
             self.logger.error(f"🔥 发送企业微信 Webhook 消息时发生未知错误: {e}")
             raise
@@ -102,44 +183,92 @@ class WeComAppSender(Sender):
     企业微信应用同步消息发送器。
     """
 
-    def __init__(self, corpid: str, corpsecret: str, agentid: int):
+    MESSAGE_BYTE_LIMITS = WECOM_APP_BYTE_LIMITS
+
+    def __init__(self, corpid: str, corpsecret: str, agentid: int, client: Optional[httpx.Client] = None,
+                 prefetch_token: bool = False, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         """
         初始化企业微信应用同步发送器。
 
         :param corpid: 企业 ID。
         :param corpsecret: 应用的 Secret。
         :param agentid: 应用的 AgentId。
+        :param client: 自定义的 HTTP 客户端，默认使用进程级共享连接池。
+        :param prefetch_token: 是否在初始化时于后台线程中预先获取 Access Token。
+        :param retry_policy: 自定义的重试策略，默认使用共享的重试策略。
+        :param circuit_breaker: 自定义的熔断器，默认使用按发送目标共享的熔断器。
         """
         self.corpid = corpid
         self.corpsecret = corpsecret
         self.agentid = agentid
         self.logger = default_logger
-        self._access_token: Optional[str] = None
+        self._client = client
+        self._token_key = (corpid, corpsecret)
+        self._retry_policy = retry_policy or default_retry_policy
+        self._breaker = circuit_breaker or circuit_breakers.get(f"wecom_app:{corpid}:{agentid}")
+        self._closed = False
+        token_cache.acquire(self._token_key)
+
+        if prefetch_token:
+            threading.Thread(target=self._prefetch_token, daemon=True).start()
+
+    def _prefetch_token(self) -> None:
+        """
+        预先获取 Access Token，失败时仅记录日志。
+        """
+        try:
+            self._get_access_token()
+        except Exception as e:
+            self.logger.warning(f"⚠️ 预取 Access Token 失败: {e}")
 
-    def _get_access_token(self) -> str:
+    def _get_access_token(self, stale_token: Optional[str] = None) -> str:
         """
-        获取 Access Token。
+        获取 Access Token，优先使用共享缓存。同一应用并发获取时只会发起一个请求。
 
+        :param stale_token: 已确认失效的 Token，若与缓存一致则强制重新获取。
         :return: Access Token。
         """
-        if self._access_token:
-            return self._access_token
+        return token_cache.get_token(self._token_key, self._fetch_access_token, stale_token=stale_token)
+
+    def _fetch_access_token(self) -> Tuple[str, int]:
+        """
+        从企业微信获取新的 Access Token。
 
+        :return: (Access Token, 有效期秒数)。
+        """
         url = f"https://qyapi.weixin.qq.com/cgi-bin/gettoken?corpid={self.corpid}&corpsecret={self.corpsecret}"
         try:
-            with httpx.Client() as client:
-                response = client.get(url)
-                response.raise_for_status()
-                data = response.json()
-                if "access_token" in data:
-                    self._access_token = data["access_token"]
-                    return self._access_token
-                else:
-                    raise AuthError(
-                        f"获取 Access Token 失败: {data.get('errmsg')}")
+            client = self._client or get_http_client()
+            response = client.get(url)
+            response.raise_for_status()
+            data = response.json()
+            if "access_token" in data:
+                return data["access_token"], int(data.get("expires_in", DEFAULT_TOKEN_EXPIRES_IN))
+            else:
+                raise AuthError(
+                    f"获取 Access Token 失败: {data.get('errmsg')}")
         except httpx.HTTPStatusError as e:
             raise AuthError(f"获取 Access Token 请求失败: {e.response.text}")
 
+    def _request_with_token(self, request: Callable[[str], httpx.Response]) -> Dict[str, Any]:
+        """
+        使用 Access Token 调用接口，Token 过期或无效时刷新并重试一次。
+
+        :param request: 接收 Access Token 并发起请求的函数。
+        :return: 接口返回的 JSON 数据。
+        """
+        access_token = self._get_access_token()
+        response = request(access_token)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("errcode") in TOKEN_EXPIRED_ERRCODES:
+            self.logger.warning(f"⚠️ Access Token 已失效 ({data.get('errcode')})，刷新后重试。")
+            response = request(self._get_access_token(stale_token=access_token))
+            response.raise_for_status()
+            data = response.json()
+        return data
+
     def _upload_media(self, image_path: str) -> str:
         """
         上传图片到企业微信临时素材。
@@ -147,30 +276,48 @@ class WeComAppSender(Sender):
         :param image_path: 图片文件的路径。
         :return: media_id。
         """
-        access_token = self._get_access_token()
-        upload_url = f"https://qyapi.weixin.qq.com/cgi-bin/media/upload?access_token={access_token}&type=image"
-        
-        try:
+        client = self._client or get_http_client()
+
+        def upload(access_token: str) -> httpx.Response:
+            upload_url = f"https://qyapi.weixin.qq.com/cgi-bin/media/upload?access_token={access_token}&type=image"
             with open(image_path, "rb") as f:
                 files = {"media": (image_path, f, "image/jpeg")}
-                with httpx.Client() as client:
-                    response = client.post(upload_url, files=files)
-                    response.raise_for_status()
-                    data = response.json()
-                    if data.get("media_id"):
-                        self.logger.info(f"🎉 图片上传成功: {data['media_id']}")
-                        return data["media_id"]
-                    else:
-                        raise HttpError(f"上传图片失败: {data.get('errmsg')}")
+                return client.post(upload_url, files=files)
+
+        try:
+            data = self._request_with_token(upload)
+            if data.get("media_id"):
+                self.logger.info(f"🎉 图片上传成功: {data['media_id']}")
+                return data["media_id"]
+            else:
+                raise HttpError(f"上传图片失败: {data.get('errmsg')}", errcode=data.get("errcode"))
         except FileNotFoundError:
             raise SendMessageError(f"❌ 图片文件未找到: {image_path}")
         except httpx.HTTPStatusError as e:
             self.logger.error(f"🔥 上传图片失败: {e.response.text}")
-            raise HttpError(f"上传图片失败: {e.response.text}", e.response.status_code)
+            raise http_error(f"上传图片失败: {e.response.text}", e.response)
         except Exception as e:
             self.logger.error(f"🔥 上传图片时发生未知错误: {e}")
             raise
 
+    def _get_media_id(self, image_path: str, refresh: bool = False) -> str:
+        """
+        获取图片的 media_id。内容相同的图片在临时素材有效期内只上传一次。
+
+        :param image_path: 图片文件的路径。
+        :param refresh: 是否忽略缓存重新上传。
+        :return: media_id。
+        """
+        key = make_media_key(self.corpid, "image", file_digest(image_path))
+        if not refresh:
+            media_id = media_cache.get(key)
+            if media_id is not None:
+                self.logger.info(f"🎉 复用已上传的图片: {media_id}")
+                return media_id
+        media_id = self._upload_media(image_path)
+        media_cache.set(key, media_id)
+        return media_id
+
     def send(self, message: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
         """
         发送企业微信应用消息。
@@ -180,9 +327,29 @@ class WeComAppSender(Sender):
         :return: API 响应。
         """
         image_path = kwargs.pop("image_path", None)
-        
+        if not image_path:
+            message.update(kwargs)
+        with suppress_duplicate(
+            f"wecom_app:{self.corpid}:{self.agentid}", dict(message, image_path=image_path) if image_path else message,
+            lambda text: self.send(_summary_message(message, text))) as duplicate:
+            if duplicate is not None:
+                return duplicate
+            if not image_path:
+                parts = split_payload(message, self.MESSAGE_BYTE_LIMITS)
+                if len(parts) > 1:
+                    return send_parts(self, parts)
+            return self._retry_policy.call(guarded, self._breaker, self._send_once, message, image_path)
+
+    def _send_once(self, message: Dict[str, Any], image_path: Optional[str]) -> Dict[str, Any]:
+        """
+        发送一条企业微信应用消息，失败时不重试。
+
+        :param message: 消息内容。
+        :param image_path: 要发送的图片路径，为空时发送 `message`。
+        :return: API 响应。
+        """
         if image_path:
-            media_id = self._upload_media(image_path)
+            media_id = self._get_media_id(image_path)
             final_payload = {
                 "msgtype": "image",
                 "image": {"media_id": media_id},
@@ -193,75 +360,138 @@ class WeComAppSender(Sender):
             final_payload = {k: v for k, v in final_payload.items() if v is not None}
         else:
             final_payload = message
-            final_payload.update(kwargs)
-
-        access_token = self._get_access_token()
-        url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={access_token}"
 
         final_payload["agentid"] = self.agentid
 
         headers = {"Content-Type": "application/json"}
+        client = self._client or get_http_client()
+
+        def post(access_token: str) -> httpx.Response:
+            url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={access_token}"
+            return client.post(url, headers=headers, json=final_payload)
+
         try:
-            with httpx.Client() as client:
-                response = client.post(url, headers=headers, json=final_payload)
-                response.raise_for_status()
-                result = response.json()
-                if result.get("errcode") != 0:
-                    raise HttpError(f"发送企业微信应用消息失败: {result.get('errmsg')}")
-                self.logger.info(f"🎉 企业微信应用消息发送成功: {result}")
-                return result
+            result = self._request_with_token(post)
+            if image_path and result.get("errcode") in MEDIA_INVALID_ERRCODES:
+                self.logger.warning("⚠️ 缓存的 media_id 已失效，重新上传图片后重试。")
+                final_payload["image"] = {"media_id": self._get_media_id(image_path, refresh=True)}
+                result = self._request_with_token(post)
+            if result.get("errcode") != 0:
+                raise HttpError(f"发送企业微信应用消息失败: {result.get('errmsg')}", errcode=result.get("errcode"))
+            self.logger.info(f"🎉 企业微信应用消息发送成功: {result}")
+            return result
         except httpx.HTTPStatusError as e:
             self.logger.error(f"🔥 企业微信应用消息发送失败: {e.response.text}")
-            raise HttpError(
-                f"发送企业微信应用消息失败: {e.response.text}", e.response.status_code)
+            raise http_error(f"发送企业微信应用消息失败: {e.response.text}", e.response)
         except Exception as e:
             self.logger.error(f"🔥 发送企业微信应用消息时发生未知错误: {e}")
             raise
 
+    def close(self) -> None:
+        """
+        注销该发送器。同一应用没有其他未关闭的发送器时，停止 Access Token 的后台刷新。
+        """
+        if self._closed:
+            return
+        self._closed = True
+        token_cache.release(self._token_key)
+
 
 class AsyncWeComAppSender(AsyncSender):
     """
     企业微信应用异步消息发送器。
     """
 
-    def __init__(self, corpid: str, corpsecret: str, agentid: int):
+    MESSAGE_BYTE_LIMITS = WECOM_APP_BYTE_LIMITS
+
+    def __init__(self, corpid: str, corpsecret: str, agentid: int, client: Optional[httpx.AsyncClient] = None,
+                 prefetch_token: bool = False, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         """
         初始化企业微信应用异步发送器。
 
         :param corpid: 企业 ID。
         :param corpsecret: 应用的 Secret。
         :param agentid: 应用的 AgentId。
+        :param client: 自定义的异步 HTTP 客户端，默认使用当前事件循环的共享连接池。
+        :param prefetch_token: 是否在初始化时预先获取 Access Token，仅在事件循环中创建时生效。
+        :param retry_policy: 自定义的重试策略，默认使用共享的重试策略。
+        :param circuit_breaker: 自定义的熔断器，默认使用按发送目标共享的熔断器。
         """
         self.corpid = corpid
         self.corpsecret = corpsecret
         self.agentid = agentid
         self.logger = default_logger
-        self._access_token: Optional[str] = None
+        self._client = client
+        self._token_key = (corpid, corpsecret)
+        self._retry_policy = retry_policy or default_retry_policy
+        self._breaker = circuit_breaker or circuit_breakers.get(f"wecom_app:{corpid}:{agentid}")
+        self._closed = False
+        token_cache.acquire(self._token_key)
+        self._prefetch_task: Optional[asyncio.Task] = None
+
+        if prefetch_token:
+            try:
+                self._prefetch_task = asyncio.get_running_loop().create_task(self._prefetch_token())
+            except RuntimeError:
+                self.logger.debug("当前没有运行中的事件循环，跳过 Access Token 预取。")
+
+    async def _prefetch_token(self) -> None:
+        """
+        预先获取 Access Token，失败时仅记录日志。
+        """
+        try:
+            await self._get_access_token()
+        except Exception as e:
+            self.logger.warning(f"⚠️ 预取 Access Token 失败: {e}")
 
-    async def _get_access_token(self) -> str:
+    async def _get_access_token(self, stale_token: Optional[str] = None) -> str:
         """
-        异步获取 Access Token。
+        异步获取 Access Token，优先使用共享缓存。同一应用并发获取时只会发起一个请求。
 
+        :param stale_token: 已确认失效的 Token，若与缓存一致则强制重新获取。
         :return: Access Token。
         """
-        if self._access_token:
-            return self._access_token
+        return await token_cache.get_token_async(self._token_key, self._fetch_access_token, stale_token=stale_token)
+
+    async def _fetch_access_token(self) -> Tuple[str, int]:
+        """
+        从企业微信异步获取新的 Access Token。
 
+        :return: (Access Token, 有效期秒数)。
+        """
         url = f"https://qyapi.weixin.qq.com/cgi-bin/gettoken?corpid={self.corpid}&corpsecret={self.corpsecret}"
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                data = response.json()
-                if "access_token" in data:
-                    self._access_token = data["access_token"]
-                    return self._access_token
-                else:
-                    raise AuthError(
-                        f"获取 Access Token 失败: {data.get('errmsg')}")
+            client = self._client or get_async_http_client()
+            response = await client.get(url)
+            response.raise_for_status()
+            data = response.json()
+            if "access_token" in data:
+                return data["access_token"], int(data.get("expires_in", DEFAULT_TOKEN_EXPIRES_IN))
+            else:
+                raise AuthError(
+                    f"获取 Access Token 失败: {data.get('errmsg')}")
         except httpx.HTTPStatusError as e:
             raise AuthError(f"获取 Access Token 请求失败: {e.response.text}")
 
+    async def _request_with_token(self, request: Callable[[str], Awaitable[httpx.Response]]) -> Dict[str, Any]:
+        """
+        使用 Access Token 异步调用接口，Token 过期或无效时刷新并重试一次。
+
+        :param request: 接收 Access Token 并发起请求的异步函数。
+        :return: 接口返回的 JSON 数据。
+        """
+        access_token = await self._get_access_token()
+        response = await request(access_token)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("errcode") in TOKEN_EXPIRED_ERRCODES:
+            self.logger.warning(f"⚠️ Access Token 已失效 ({data.get('errcode')})，刷新后重试。")
+            response = await request(await self._get_access_token(stale_token=access_token))
+            response.raise_for_status()
+            data = response.json()
+        return data
+
     async def _upload_media_async(self, image_path: str) -> str:
         """
         异步上传图片到企业微信临时素材。
@@ -269,31 +499,49 @@ class AsyncWeComAppSender(AsyncSender):
         :param image_path: 图片文件的路径。
         :return: media_id。
         """
-        access_token = await self._get_access_token()
-        upload_url = f"https://qyapi.weixin.qq.com/cgi-bin/media/upload?access_token={access_token}&type=image"
-        
+        client = self._client or get_async_http_client()
+
+        async def upload(access_token: str) -> httpx.Response:
+            upload_url = f"https://qyapi.weixin.qq.com/cgi-bin/media/upload?access_token={access_token}&type=image"
+            # 文件内容在发送请求体时异步分块读取，不阻塞事件循环；重试时重新构建请求体
+            headers, body = await multipart_file_stream("media", image_path, "image/jpeg")
+            return await client.post(upload_url, headers=headers, content=body)
+
         try:
-            # 注意：这里使用了同步文件读取，对于大文件可能会阻塞事件循环。
-            with open(image_path, "rb") as f:
-                files = {"media": (image_path, f, "image/jpeg")}
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(upload_url, files=files)
-                    response.raise_for_status()
-                    data = response.json()
-                    if data.get("media_id"):
-                        self.logger.info(f"🎉 图片上传成功: {data['media_id']}")
-                        return data["media_id"]
-                    else:
-                        raise HttpError(f"上传图片失败: {data.get('errmsg')}")
+            data = await self._request_with_token(upload)
+            if data.get("media_id"):
+                self.logger.info(f"🎉 图片上传成功: {data['media_id']}")
+                return data["media_id"]
+            else:
+                raise HttpError(f"上传图片失败: {data.get('errmsg')}", errcode=data.get("errcode"))
         except FileNotFoundError:
             raise SendMessageError(f"❌ 图片文件未找到: {image_path}")
         except httpx.HTTPStatusError as e:
             self.logger.error(f"🔥 上传图片失败: {e.response.text}")
-            raise HttpError(f"上传图片失败: {e.response.text}", e.response.status_code)
+            raise http_error(f"上传图片失败: {e.response.text}", e.response)
         except Exception as e:
             self.logger.error(f"🔥 上传图片时发生未知错误: {e}")
             raise
 
+    async def _get_media_id(self, image_path: str, refresh: bool = False) -> str:
+        """
+        异步获取图片的 media_id。内容相同的图片在临时素材有效期内只上传一次。
+
+        :param image_path: 图片文件的路径。
+        :param refresh: 是否忽略缓存重新上传。
+        :return: media_id。
+        """
+        # 计算摘要和访问磁盘缓存都在工作线程中进行
+        key = make_media_key(self.corpid, "image", await asyncio.to_thread(file_digest, image_path))
+        if not refresh:
+            media_id = await asyncio.to_thread(media_cache.get, key)
+            if media_id is not None:
+                self.logger.info(f"🎉 复用已上传的图片: {media_id}")
+                return media_id
+        media_id = await self._upload_media_async(image_path)
+        await asyncio.to_thread(media_cache.set, key, media_id)
+        return media_id
+
     async def send(self, message: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
         """
         异步发送企业微信应用消息。
@@ -303,9 +551,30 @@ class AsyncWeComAppSender(AsyncSender):
         :return: API 响应。
         """
         image_path = kwargs.pop("image_path", None)
-        
+        if not image_path:
+            message.update(kwargs)
+        async with asuppress_duplicate(
+            f"wecom_app:{self.corpid}:{self.agentid}", dict(message, image_path=image_path) if image_path else message,
+            lambda text: self.send(_summary_message(message, text))) as duplicate:
+            if duplicate is not None:
+                return duplicate
+            if not image_path:
+                parts = split_payload(message, self.MESSAGE_BYTE_LIMITS)
+                if len(parts) > 1:
+                    return await send_parts_async(self, parts)
+            return await self._retry_policy.call_async(guarded_async, self._breaker, self._send_once, message,
+                                                       image_path)
+
+    async def _send_once(self, message: Dict[str, Any], image_path: Optional[str]) -> Dict[str, Any]:
+        """
+        异步发送一条企业微信应用消息，失败时不重试。
+
+        :param message: 消息内容。
+        :param image_path: 要发送的图片路径，为空时发送 `message`。
+        :return: API 响应。
+        """
         if image_path:
-            media_id = await self._upload_media_async(image_path)
+            media_id = await self._get_media_id(image_path)
             final_payload = {
                 "msgtype": "image",
                 "image": {"media_id": media_id},
@@ -316,27 +585,41 @@ class AsyncWeComAppSender(AsyncSender):
             final_payload = {k: v for k, v in final_payload.items() if v is not None}
         else:
             final_payload = message
-            final_payload.update(kwargs)
-
-        access_token = await self._get_access_token()
-        url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={access_token}"
 
         final_payload["agentid"] = self.agentid
 
         headers = {"Content-Type": "application/json"}
+        client = self._client or get_async_http_client()
+
+        async def post(access_token: str) -> httpx.Response:
+            url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={access_token}"
+            return await client.post(url, headers=headers, json=final_payload)
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=final_payload)
-                response.raise_for_status()
-                result = response.json()
-                if result.get("errcode") != 0:
-                    raise HttpError(f"发送企业微信应用消息失败: {result.get('errmsg')}")
-                self.logger.info(f"🎉 企业微信应用消息发送成功: {result}")
-                return result
+            result = await self._request_with_token(post)
+            if image_path and result.get("errcode") in MEDIA_INVALID_ERRCODES:
+                self.logger.warning("⚠️ 缓存的 media_id 已失效，重新上传图片后重试。")
+                final_payload["image"] = {"media_id": await self._get_media_id(image_path, refresh=True)}
+                result = await self._request_with_token(post)
+            if result.get("errcode") != 0:
+                raise HttpError(f"发送企业微信应用消息失败: {result.get('errmsg')}", errcode=result.get("errcode"))
+            self.logger.info(f"🎉 企业微信应用消息发送成功: {result}")
+            return result
         except httpx.HTTPStatusError as e:
             self.logger.error(f"🔥 企业微信应用消息发送失败: {e.response.text}")
-            raise HttpError(
-                f"发送企业微信应用消息失败: {e.response.text}", e.response.status_code)
+            raise http_error(f"发送企业微信应用消息失败: {e.response.text}", e.response)
         except Exception as e:
             self.logger.error(f"🔥 发送企业微信应用消息时发生未知错误: {e}")
             raise
+
+    async def aclose(self) -> None:
+        """
+        停止 Access Token 的预取任务并注销该发送器。同一应用没有其他未关闭的发送器时，停止后台刷新。
+        """
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            self._prefetch_task = None
+        if self._closed:
+            return
+        self._closed = True
+        token_cache.release(self._token_key)
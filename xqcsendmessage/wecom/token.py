@@ -0,0 +1,402 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T09:30:00.000Z
+# 文件描述：企业微信 Access Token 缓存，按 (corpid, corpsecret) 共享，合并并发获取并在过期前后台刷新。
+# 文件路径：xqcsendmessage/wecom/token.py
+
+import asyncio
+import contextlib
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, ContextManager, Dict, Optional, Tuple, TypeVar, Union
+
+from ..core.logger import default_logger
+from .token_store import TokenStore, MemoryTokenStore, make_store_key
+
+# Access Token 默认有效期（秒），以接口返回的 expires_in 为准
+DEFAULT_TOKEN_EXPIRES_IN = 7200
+# 在 Token 过期前多少秒进行后台刷新
+TOKEN_REFRESH_MARGIN = 300
+# 热路径上认为 Token 即将过期、需要同步刷新的提前量（秒）
+TOKEN_EXPIRY_SKEW = 60
+# 企业微信返回的 Token 失效错误码：40014 不合法的 access_token，42001 access_token 已过期
+TOKEN_EXPIRED_ERRCODES = (40014, 42001)
+
+TokenKey = Tuple[str, str]
+# 获取 Token 的函数，返回 (access_token, expires_in)
+TokenFetcher = Callable[[], Tuple[str, int]]
+AsyncTokenFetcher = Callable[[], Awaitable[Tuple[str, int]]]
+
+T = TypeVar("T")
+
+
+@asynccontextmanager
+async def _hold_in_thread(lock: ContextManager) -> AsyncIterator[None]:
+    """
+    在专用线程中获取并持有同步锁，直到 `async with` 块结束，等待锁时不阻塞事件循环。
+
+    锁的获取和释放都在同一线程中进行，线程锁和文件锁都能正确释放；等待期间协程被取消时，
+    线程拿到锁后立即释放，不会一直占用。不加锁（`contextlib.nullcontext`）时不启动线程。
+    """
+    if isinstance(lock, contextlib.nullcontext):
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    acquired = loop.create_future()
+    release = threading.Event()
+
+    def settle(error: Optional[BaseException]) -> None:
+        if acquired.done():
+            return
+        if error is None:
+            acquired.set_result(None)
+        else:
+            acquired.set_exception(error)
+
+    def hold() -> None:
+        try:
+            with lock:
+                loop.call_soon_threadsafe(settle, None)
+                release.wait()
+        except Exception as e:
+            try:
+                loop.call_soon_threadsafe(settle, e)
+            except RuntimeError:
+                # 事件循环已关闭，没有协程在等待
+                pass
+
+    threading.Thread(target=hold, name="xqc-token-lock", daemon=True).start()
+    try:
+        await acquired
+        yield
+    finally:
+        release.set()
+
+
+class _TokenEntry:
+    """
+    单个应用的 Token 缓存条目。
+    """
+    __slots__ = ("token", "expires_at", "used", "refresh_handle")
+
+    def __init__(self, token: str, expires_at: float):
+        self.token = token
+        self.expires_at = expires_at
+        # 自上次刷新以来 Token 是否被使用过，未使用的 Token 不再后台续期
+        self.used = False
+        self.refresh_handle: Optional[Union[threading.Timer, asyncio.Task]] = None
+
+
+class AccessTokenCache:
+    """
+    进程级 Access Token 缓存。
+
+    同一 (corpid, corpsecret) 在任意时刻最多只有一个获取请求在进行，其余调用方（线程或协程）
+    等待并共享该请求的结果或异常。缓存未命中时会先查询 Token 存储后端，使用 `SQLiteTokenStore`
+    时同一主机上的多个进程共享同一份 Token。
+    """
+
+    def __init__(self, store: Optional[TokenStore] = None):
+        """
+        初始化 Token 缓存。
+
+        :param store: Token 存储后端，默认为进程内存储。
+        """
+        self.logger = default_logger
+        self.store = store or MemoryTokenStore()
+        self._entries: Dict[TokenKey, _TokenEntry] = {}
+        self._lock = threading.Lock()
+        self._inflight: Dict[TokenKey, Future] = {}
+        self._async_inflight: Dict[Tuple[int, TokenKey], asyncio.Task] = {}
+        # 每个应用仍在使用的发送器数量，最后一个发送器关闭时才停止后台刷新
+        self._users: Dict[TokenKey, int] = {}
+
+    def _valid_token(self, key: TokenKey, stale_token: Optional[str]) -> Optional[str]:
+        """
+        返回未过期且不等于 stale_token 的缓存 Token。
+        """
+        entry = self._entries.get(key)
+        if (entry is not None and entry.token != stale_token
+                and time.time() < entry.expires_at - TOKEN_EXPIRY_SKEW):
+            entry.used = True
+            return entry.token
+        return None
+
+    def _store(self, key: TokenKey, token: str, expires_at: float) -> _TokenEntry:
+        """
+        保存新获取的 Token，并取消旧条目上的后台刷新。
+        """
+        with self._lock:
+            old = self._entries.get(key)
+            entry = _TokenEntry(token, expires_at)
+            self._entries[key] = entry
+        if old is not None:
+            self._cancel_refresh(old)
+        return entry
+
+    @staticmethod
+    def _cancel_refresh(entry: _TokenEntry) -> None:
+        handle = entry.refresh_handle
+        entry.refresh_handle = None
+        if handle is None:
+            return
+        if isinstance(handle, asyncio.Task):
+            try:
+                handle.get_loop().call_soon_threadsafe(handle.cancel)
+            except RuntimeError:
+                # 事件循环已关闭，任务已随之结束
+                pass
+        else:
+            handle.cancel()
+
+    def get_token(self, key: TokenKey, fetcher: TokenFetcher, stale_token: Optional[str] = None) -> str:
+        """
+        获取 Access Token。缓存失效时由第一个调用方发起请求，其余线程等待其结果。
+
+        :param key: (corpid, corpsecret)。
+        :param fetcher: 实际请求 Token 的函数，返回 (access_token, expires_in)。
+        :param stale_token: 已确认失效的 Token，若与缓存一致则强制重新获取。
+        :return: Access Token。
+        """
+        return self._get_token(key, fetcher, stale_token, used=True)
+
+    def _get_token(self, key: TokenKey, fetcher: TokenFetcher, stale_token: Optional[str], used: bool) -> str:
+        token = self._valid_token(key, stale_token)
+        if token:
+            return token
+
+        with self._lock:
+            token = self._valid_token(key, stale_token)
+            if token:
+                return token
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            token, expires_at = self._load_or_fetch(key, fetcher, stale_token)
+            entry = self._store(key, token, expires_at)
+            entry.used = used
+            self._schedule_refresh(entry, key, fetcher)
+            future.set_result(token)
+            return token
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def get_token_async(self, key: TokenKey, fetcher: AsyncTokenFetcher,
+                              stale_token: Optional[str] = None) -> str:
+        """
+        异步获取 Access Token。缓存失效时同一事件循环内只发起一个请求，其余协程等待其结果。
+
+        :param key: (corpid, corpsecret)。
+        :param fetcher: 实际请求 Token 的异步函数，返回 (access_token, expires_in)。
+        :param stale_token: 已确认失效的 Token，若与缓存一致则强制重新获取。
+        :return: Access Token。
+        """
+        return await self._get_token_async(key, fetcher, stale_token, used=True)
+
+    async def _get_token_async(self, key: TokenKey, fetcher: AsyncTokenFetcher, stale_token: Optional[str],
+                               used: bool) -> str:
+        token = self._valid_token(key, stale_token)
+        if token:
+            return token
+
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        task = self._async_inflight.get(flight_key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._fetch_async(key, fetcher, stale_token, used))
+            self._async_inflight[flight_key] = task
+
+            def _done(t: asyncio.Task) -> None:
+                if self._async_inflight.get(flight_key) is t:
+                    del self._async_inflight[flight_key]
+
+            task.add_done_callback(_done)
+        # shield：单个等待方被取消时不影响共享的请求
+        return await asyncio.shield(task)
+
+    async def _fetch_async(self, key: TokenKey, fetcher: AsyncTokenFetcher, stale_token: Optional[str],
+                           used: bool) -> str:
+        token, expires_at = await self._load_or_fetch_async(key, fetcher, stale_token)
+        entry = self._store(key, token, expires_at)
+        entry.used = used
+        self._schedule_refresh_async(entry, key, fetcher)
+        return token
+
+    def _load_stored(self, store_key: str, stale_token: Optional[str]) -> Optional[Tuple[str, float]]:
+        """
+        从存储后端读取可用的 Token，读取失败时视为未命中。
+        """
+        try:
+            stored = self.store.get(store_key)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 读取 Token 存储失败: {e}")
+            return None
+        if stored is not None and stored[0] != stale_token and time.time() < stored[1] - TOKEN_EXPIRY_SKEW:
+            return stored
+        return None
+
+    def _save_stored(self, store_key: str, token: str, expires_at: float) -> None:
+        """
+        将 Token 写入存储后端，写入失败时仅记录日志。
+        """
+        try:
+            self.store.set(store_key, token, expires_at)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 写入 Token 存储失败: {e}")
+
+    def _load_or_fetch(self, key: TokenKey, fetcher: TokenFetcher,
+                       stale_token: Optional[str]) -> Tuple[str, float]:
+        """
+        优先使用存储后端中的 Token，否则在存储锁内请求新 Token 并写回。
+        """
+        store_key = make_store_key(*key)
+        stored = self._load_stored(store_key, stale_token)
+        if stored:
+            return stored
+        with self.store.lock(store_key):
+            # 等待锁期间其他进程可能已经刷新了 Token
+            stored = self._load_stored(store_key, stale_token)
+            if stored:
+                return stored
+            token, expires_in = fetcher()
+            expires_at = time.time() + expires_in
+            self._save_stored(store_key, token, expires_at)
+            return token, expires_at
+
+    async def _load_or_fetch_async(self, key: TokenKey, fetcher: AsyncTokenFetcher,
+                                   stale_token: Optional[str]) -> Tuple[str, float]:
+        """
+        `_load_or_fetch` 的异步版本，存储读写和锁等待放到线程中执行，避免阻塞事件循环。
+        默认的进程内存储直接读写，不启动线程。
+        """
+        store_key = make_store_key(*key)
+        stored = await self._call_store(self._load_stored, store_key, stale_token)
+        if stored:
+            return stored
+        async with _hold_in_thread(self.store.lock(store_key)):
+            # 等待锁期间其他进程可能已经刷新了 Token
+            stored = await self._call_store(self._load_stored, store_key, stale_token)
+            if stored:
+                return stored
+            token, expires_in = await fetcher()
+            expires_at = time.time() + expires_in
+            await self._call_store(self._save_stored, store_key, token, expires_at)
+            return token, expires_at
+
+    async def _call_store(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        调用存储读写方法：进程内存储直接调用，其他存储可能读写磁盘或网络，放到线程中执行。
+        """
+        if type(self.store) is MemoryTokenStore:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    def _schedule_refresh(self, entry: _TokenEntry, key: TokenKey, fetcher: TokenFetcher) -> None:
+        """
+        使用守护线程定时器在 Token 过期前刷新。
+        """
+        delay = max(entry.expires_at - time.time() - TOKEN_REFRESH_MARGIN, 0)
+        timer = threading.Timer(delay, self._background_refresh, args=(entry, key, fetcher))
+        timer.daemon = True
+        entry.refresh_handle = timer
+        timer.start()
+
+    def _schedule_refresh_async(self, entry: _TokenEntry, key: TokenKey, fetcher: AsyncTokenFetcher) -> None:
+        """
+        使用事件循环任务在 Token 过期前刷新。
+        """
+        delay = max(entry.expires_at - time.time() - TOKEN_REFRESH_MARGIN, 0)
+        entry.refresh_handle = asyncio.get_running_loop().create_task(
+            self._background_refresh_async(delay, entry, key, fetcher))
+
+    def _background_refresh(self, entry: _TokenEntry, key: TokenKey, fetcher: TokenFetcher) -> None:
+        if self._entries.get(key) is not entry or not entry.used:
+            return
+        try:
+            self._get_token(key, fetcher, stale_token=entry.token, used=False)
+            self.logger.debug("🔄 Access Token 已在后台刷新。")
+        except Exception as e:
+            self.logger.warning(f"⚠️ 后台刷新 Access Token 失败: {e}")
+
+    async def _background_refresh_async(self, delay: float, entry: _TokenEntry, key: TokenKey,
+                                        fetcher: AsyncTokenFetcher) -> None:
+        await asyncio.sleep(delay)
+        if self._entries.get(key) is not entry or not entry.used:
+            return
+        # 刷新任务即将被新条目替换，避免取消自身
+        entry.refresh_handle = None
+        try:
+            await self._get_token_async(key, fetcher, stale_token=entry.token, used=False)
+            self.logger.debug("🔄 Access Token 已在后台刷新。")
+        except Exception as e:
+            self.logger.warning(f"⚠️ 后台刷新 Access Token 失败: {e}")
+
+    def acquire(self, key: TokenKey) -> None:
+        """
+        登记一个使用该应用 Token 的发送器，与 `release` 成对调用。
+
+        :param key: (corpid, corpsecret)。
+        """
+        with self._lock:
+            self._users[key] = self._users.get(key, 0) + 1
+
+    def release(self, key: TokenKey) -> None:
+        """
+        注销一个发送器。同一应用的同步和异步发送器共用 Token 和后台刷新，最后一个发送器注销后才停止刷新。
+
+        :param key: (corpid, corpsecret)。
+        """
+        with self._lock:
+            remaining = self._users.get(key, 0) - 1
+            if remaining > 0:
+                self._users[key] = remaining
+                return
+            self._users.pop(key, None)
+        self.cancel_refresh(key)
+
+    def cancel_refresh(self, key: TokenKey) -> None:
+        """
+        停止指定应用的 Token 后台刷新。
+
+        :param key: (corpid, corpsecret)。
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._cancel_refresh(entry)
+
+    def clear(self) -> None:
+        """
+        清空进程内缓存的 Token 并停止后台刷新，不影响存储后端中的 Token。
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._cancel_refresh(entry)
+
+
+# 所有企业微信应用发送器共享的 Token 缓存
+token_cache = AccessTokenCache()
+
+
+def set_token_store(store: TokenStore) -> None:
+    """
+    设置企业微信 Access Token 的存储后端，并清空当前进程内的 Token 缓存。
+
+    :param store: Token 存储后端，例如 `SQLiteTokenStore("/tmp/xqc_wecom_tokens.db")`。
+    """
+    token_cache.clear()
+    token_cache.store = store
@@ -0,0 +1,138 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2026-10-18T10:40:00.000Z
+# 文件描述：企业微信 Access Token 存储后端，支持进程内存储和同一主机多进程共享的 SQLite 存储。
+# 文件路径：xqcsendmessage/wecom/token_store.py
+
+import contextlib
+import hashlib
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import ContextManager, Dict, Optional, Tuple
+
+from ..core.filelock import FileLock
+
+
+def make_store_key(corpid: str, corpsecret: str) -> str:
+    """
+    生成存储键。Secret 只以摘要形式出现，避免明文落盘。
+
+    :param corpid: 企业 ID。
+    :param corpsecret: 应用的 Secret。
+    :return: 存储键。
+    """
+    digest = hashlib.sha256(corpsecret.encode("utf-8")).hexdigest()[:16]
+    return f"{corpid}:{digest}"
+
+
+class TokenStore(ABC):
+    """
+    Access Token 存储后端的基类。
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """
+        读取 Token。
+
+        :param key: 存储键。
+        :return: (access_token, 过期时间戳)，不存在时返回 None。
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, token: str, expires_at: float) -> None:
+        """
+        保存 Token。
+
+        :param key: 存储键。
+        :param token: Access Token。
+        :param expires_at: 过期时间戳。
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        删除 Token。
+
+        :param key: 存储键。
+        """
+        raise NotImplementedError
+
+    def lock(self, key: str) -> ContextManager:
+        """
+        返回获取 Token 期间持有的锁，用于在多个进程之间只发起一次获取请求。默认不加锁。
+
+        :param key: 存储键。
+        :return: 上下文管理器。
+        """
+        return contextlib.nullcontext()
+
+
+class MemoryTokenStore(TokenStore):
+    """
+    进程内 Token 存储（默认）。
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        return self._tokens.get(key)
+
+    def set(self, key: str, token: str, expires_at: float) -> None:
+        self._tokens[key] = (token, expires_at)
+
+    def delete(self, key: str) -> None:
+        self._tokens.pop(key, None)
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    基于 SQLite 文件的 Token 存储，同一主机上的多个进程共享同一份 Token。
+
+    获取 Token 期间持有锁文件，保证同一时刻只有一个进程在请求 gettoken 接口。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化 SQLite Token 存储。
+
+        :param path: SQLite 数据库文件路径，锁文件为同目录下的 `<path>.lock`。
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = FileLock(f"{path}.lock")
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS wecom_tokens ("
+                "key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作使用新连接，兼容多线程和 fork 出的子进程
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT token, expires_at FROM wecom_tokens WHERE key = ?", (key,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, token: str, expires_at: float) -> None:
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO wecom_tokens (key, token, expires_at) VALUES (?, ?, ?)",
+                (key, token, expires_at),
+            )
+
+    def delete(self, key: str) -> None:
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM wecom_tokens WHERE key = ?", (key,))
+
+    def lock(self, key: str) -> ContextManager:
+        return self._lock